@@ -0,0 +1,15 @@
+# core/management/commands/calcular_relacionados.py
+from django.core.management.base import BaseCommand
+
+from core.services.relacionados_service import calcular_relacionados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os produtos relacionados por co-compra (ProdutoRelacionado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=None, help='Vizinhos guardados por produto')
+
+    def handle(self, *args, **options):
+        total = calcular_relacionados(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Relacionados calculados para {total} produtos.'))
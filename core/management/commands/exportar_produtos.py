@@ -0,0 +1,29 @@
+# core/management/commands/exportar_produtos.py
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.services import produtos_io
+
+
+class Command(BaseCommand):
+    help = 'Exporta os produtos em CSV ou JSONL (streaming, sem carregar a tabela em memória)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=produtos_io.FORMATOS, default='csv')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: stdout)')
+
+    def handle(self, *args, **options):
+        destino = open(options['saida'], 'w', encoding='utf-8', newline='') if options['saida'] else sys.stdout
+        total = 0
+        try:
+            for linha in produtos_io.exportar_produtos(options['formato']):
+                destino.write(linha)
+                total += 1
+        finally:
+            if destino is not sys.stdout:
+                destino.close()
+        if options['saida']:
+            if options['formato'] == 'csv':
+                total -= 1   # cabeçalho
+            self.stdout.write(self.style.SUCCESS(f"{total} produtos exportados para {options['saida']}."))
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import DerivadoImagem
+from core.services import imagens_service
+
+
+def _iniciar_worker():
+    # Processos criados por spawn/forkserver precisam configurar o Django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Gera os derivados responsivos (srcset) das imagens de produtos e galerias já existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                            help='Processos do pool (Pillow é CPU-bound)')
+        parser.add_argument('--forcar', action='store_true',
+                            help='Regera também as imagens que já têm derivados')
+        parser.add_argument('--limpar-orfaos', action='store_true',
+                            help='Remove derivados de arquivos que não são mais usados')
+
+    def handle(self, *args, **options):
+        originais = imagens_service.originais_em_uso()
+        if not options['forcar']:
+            originais -= set(DerivadoImagem.objects.values_list('original', flat=True).distinct())
+
+        if options['limpar_orfaos']:
+            em_uso = imagens_service.originais_em_uso()
+            orfaos = set(DerivadoImagem.objects.exclude(original__in=em_uso).values_list('original', flat=True))
+            removidos = sum(imagens_service.remover_derivados(nome) for nome in orfaos)
+            self.stdout.write(f'{removidos} derivados órfãos removidos.')
+
+        if not originais:
+            self.stdout.write(self.style.SUCCESS('Nenhuma imagem pendente.'))
+            return
+
+        self.stdout.write(f"Gerando derivados de {len(originais)} imagens "
+                          f"({', '.join(imagens_service.formatos_suportados())}) com {options['processos']} processos...")
+
+        # Conexões abertas não podem ser herdadas pelos processos filhos
+        connections.close_all()
+        gerados, falhas = 0, 0
+        with ProcessPoolExecutor(max_workers=max(options['processos'], 1), initializer=_iniciar_worker) as pool:
+            futuros = {pool.submit(imagens_service.gerar_arquivos, nome): nome for nome in sorted(originais)}
+            for futuro in as_completed(futuros):
+                nome = futuros[futuro]
+                try:
+                    linhas = futuro.result()
+                except Exception as e:
+                    falhas += 1
+                    self.stderr.write(f'Falha em {nome}: {e}')
+                    continue
+                # Gravação no banco só no processo principal
+                imagens_service.registrar_derivados(nome, linhas)
+                gerados += len(linhas)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{gerados} derivados gerados para {len(originais) - falhas} imagens ({falhas} falhas).'
+        ))
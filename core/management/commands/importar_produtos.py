@@ -0,0 +1,48 @@
+# core/management/commands/importar_produtos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import produtos_io
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos de um arquivo CSV ou JSONL (upsert por SKU, em lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .jsonl')
+        parser.add_argument('--formato', choices=produtos_io.FORMATOS, help='Padrão: pela extensão do arquivo')
+        parser.add_argument('--lote', type=int, default=produtos_io.TAMANHO_LOTE, help='Linhas por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Valida e conta sem gravar')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or produtos_io.formato_do_nome(options['arquivo'])
+        if formato is None:
+            raise CommandError('Não foi possível deduzir o formato; use --formato csv|jsonl')
+
+        def progresso(relatorio):
+            self.stdout.write(
+                f"{relatorio['lidas']} linhas: {relatorio['criados']} criados, "
+                f"{relatorio['atualizados']} atualizados, {relatorio['total_erros']} erros"
+            )
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                relatorio = produtos_io.importar_produtos(
+                    produtos_io.ler_arquivo(arquivo, formato),
+                    tamanho_lote=options['lote'],
+                    progresso=progresso,
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for erro in relatorio['erros']:
+            self.stderr.write(f"Linha {erro['linha']} (SKU {erro['sku'] or '-'}): {erro['erro']}")
+        if relatorio['total_erros'] > len(relatorio['erros']):
+            self.stderr.write(f"... e mais {relatorio['total_erros'] - len(relatorio['erros'])} erros")
+
+        estilo = self.style.SUCCESS if not relatorio['total_erros'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"{'[dry-run] ' if relatorio['dry_run'] else ''}{relatorio['lidas']} linhas lidas: "
+            f"{relatorio['criados']} criados, {relatorio['atualizados']} atualizados, "
+            f"{relatorio['inalterados']} inalterados, {relatorio['total_erros']} erros."
+        ))
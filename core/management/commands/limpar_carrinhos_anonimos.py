@@ -0,0 +1,28 @@
+# core/management/commands/limpar_carrinhos_anonimos.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Carrinho
+
+
+class Command(BaseCommand):
+    help = 'Apaga carrinhos de sessão antigos do banco (os anônimos agora ficam no Redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help='Sem alteração há N dias (padrão: 7)')
+        parser.add_argument('--lote', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        antigos = Carrinho.objects.filter(usuario__isnull=True, atualizado_em__lt=limite)
+        total = 0
+        # Em lotes: a tabela pode ter milhões de carrinhos órfãos
+        while True:
+            ids = list(antigos.values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            Carrinho.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'{total} carrinhos anônimos apagados.'))
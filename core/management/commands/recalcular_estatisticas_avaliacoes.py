@@ -0,0 +1,15 @@
+# core/management/commands/recalcular_estatisticas_avaliacoes.py
+from django.core.management.base import BaseCommand
+
+from core.models import EstatisticaAvaliacao
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os agregados denormalizados de avaliações (EstatisticaAvaliacao)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('produtos', nargs='*', type=int, help='IDs de produtos (padrão: todos)')
+
+    def handle(self, *args, **options):
+        total = EstatisticaAvaliacao.recalcular(options['produtos'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Estatísticas recalculadas para {total} produtos.'))
@@ -0,0 +1,15 @@
+# core/management/commands/reindexar_busca.py
+from django.core.management.base import BaseCommand
+
+from core.search import reindexar_tudo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca de produtos (DocumentoBusca/TermoBusca)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Tamanho dos lotes de inserção')
+
+    def handle(self, *args, **options):
+        total = reindexar_tudo(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} produtos indexados.'))
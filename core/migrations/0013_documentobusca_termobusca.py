@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_remove_avaliacao_unique_avaliacao_produto_usuario_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusca',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento_busca', serialize=False, to='core.produto')),
+                ('tamanho', models.PositiveIntegerField(default=0)),
+                ('categoria', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de Busca',
+                'verbose_name_plural': 'Documentos de Busca',
+            },
+        ),
+        migrations.CreateModel(
+            name='TermoBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=64)),
+                ('frequencia', models.PositiveSmallIntegerField(default=1)),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termos', to='core.documentobusca')),
+            ],
+            options={
+                'verbose_name': 'Termo de Busca',
+                'verbose_name_plural': 'Termos de Busca',
+                'unique_together': {('termo', 'documento')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_documentobusca_termobusca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaAvaliacao',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatistica_avaliacao', serialize=False, to='core.produto')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('soma_notas', models.PositiveIntegerField(default=0)),
+                ('estrelas_1', models.PositiveIntegerField(default=0)),
+                ('estrelas_2', models.PositiveIntegerField(default=0)),
+                ('estrelas_3', models.PositiveIntegerField(default=0)),
+                ('estrelas_4', models.PositiveIntegerField(default=0)),
+                ('estrelas_5', models.PositiveIntegerField(default=0)),
+                ('recomendacoes', models.PositiveIntegerField(default=0)),
+                ('com_midia', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estatística de Avaliações',
+                'verbose_name_plural': 'Estatísticas de Avaliações',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_estatisticaavaliacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProdutoRelacionado',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='relacionados_calculados', serialize=False, to='core.produto')),
+                ('vizinhos', models.JSONField(default=list)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Produtos Relacionados',
+                'verbose_name_plural': 'Produtos Relacionados',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_produtorelacionado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VelocidadeProduto',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='velocidade', serialize=False, to='core.produto')),
+                ('score_vendas', models.FloatField(default=0)),
+                ('score_visualizacoes', models.FloatField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Velocidade do Produto',
+                'verbose_name_plural': 'Velocidade dos Produtos',
+            },
+        ),
+    ]
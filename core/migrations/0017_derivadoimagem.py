@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_velocidadeproduto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivadoImagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(db_index=True, max_length=255)),
+                ('formato', models.CharField(choices=[('avif', 'AVIF'), ('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=10)),
+                ('largura', models.PositiveIntegerField()),
+                ('altura', models.PositiveIntegerField()),
+                ('arquivo', models.CharField(max_length=255)),
+                ('tamanho_bytes', models.PositiveIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Derivado de Imagem',
+                'verbose_name_plural': 'Derivados de Imagens',
+                'constraints': [models.UniqueConstraint(fields=('original', 'formato', 'largura'), name='unique_derivado_imagem')],
+            },
+        ),
+    ]
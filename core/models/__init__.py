@@ -8,7 +8,10 @@ from .orders import Pedido, ItemPedido, StatusPedido
 from .payments import Pagamento, MetodoPagamento
 from .shipping import Envio, Transportadora
 from .inventory import Estoque, MovimentacaoEstoque
-from .avaliacoes import Avaliacao, MidiaAvaliacao, AvaliacaoLike, AvaliacaoUtil, DenunciaAvaliacao
+from .avaliacoes import Avaliacao, MidiaAvaliacao, AvaliacaoLike, AvaliacaoUtil, DenunciaAvaliacao, EstatisticaAvaliacao
+from .busca import DocumentoBusca, TermoBusca
+from .recomendacao import ProdutoRelacionado, VelocidadeProduto
+from .imagens import DerivadoImagem
 
 __all__ = [
     'BaseModel',
@@ -32,4 +35,10 @@ __all__ = [
     'AvaliacaoLike',
     'AvaliacaoUtil',
     'DenunciaAvaliacao',
+    'EstatisticaAvaliacao',
+    'DocumentoBusca',
+    'TermoBusca',
+    'ProdutoRelacionado',
+    'VelocidadeProduto',
+    'DerivadoImagem',
 ]
\ No newline at end of file
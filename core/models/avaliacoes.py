@@ -3,16 +3,18 @@ import uuid
 import hashlib
 import logging
 
+from collections import Counter
 from datetime import timedelta
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db import models, transaction, IntegrityError
-from django.db.models import Q, Avg, Count, Sum, FloatField
+from django.db.models import Q, F, Avg, Count, Sum, FloatField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError  # ADICIONAR ESSA LINHA
 from django.utils import timezone
 
+from core.services import cache_swr, chaves
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +27,23 @@ def upload_to_avaliacao(instance, filename):
     return f'avaliacoes/prod_{produto_id}/{timezone.now().strftime("%Y/%m")}/{filename}'
 
 
+def _calcular_stats(produto_ids):
+    """{ produto_id: stats } a partir de EstatisticaAvaliacao (uma query)."""
+    por_produto = {
+        stats.produto_id: stats for stats in EstatisticaAvaliacao.objects.filter(produto_id__in=produto_ids)
+    }
+    resultado = {}
+    for pk in produto_ids:
+        stats = por_produto.get(pk) or EstatisticaAvaliacao(produto_id=pk)
+        resultado[pk] = {
+            'total': stats.total,
+            'media': stats.media,
+            'soma_notas': stats.soma_notas,
+            'por_estrela': stats.por_estrela,
+        }
+    return resultado
+
+
 # -----------------------
 # Avaliação (QuerySet/Manager)
 # -----------------------
@@ -43,39 +62,28 @@ class AvaliacaoQuerySet(models.QuerySet):
         return self.filter(produto_id=produto_id, usuario_id=usuario_id).first()
 
     # ---------- Estatísticas / Agregações ----------
-    def stats_for_product(self, produto_id, cache_ttl=60):
+    def stats_for_product(self, produto_id, cache_ttl=None):
         """
         Retorna dict: { total, media, soma_notas, por_estrela: {1:cnt,...} }
-        Cache curto por produto (ajustável via cache_ttl).
+        Cache curto por produto (TTL do registro de chaves, ou cache_ttl), com
+        expiração suave: ao expirar, um único processo recalcula e os demais
+        servem o valor anterior. A chave leva a versão das avaliações do
+        produto, então uma avaliação nova já lê outra chave.
         """
-        cache_key = f"avaliacao_stats_prod_{produto_id}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+        return self.stats_for_products([produto_id], cache_ttl=cache_ttl)[produto_id]
 
-        qs = self.filter(produto_id=produto_id, status='aprovado')
-        agg = qs.aggregate(
-            total=Count('id'),
-            media=Avg('nota_geral'),
-            soma_notas=Sum('nota_geral')
+    def stats_for_products(self, produto_ids, cache_ttl=None):
+        """
+        Versão em lote para listagens: { produto_id: stats }.
+        Um cache.get_many, uma query para os misses/expirados (agregados
+        denormalizados em EstatisticaAvaliacao) e um cache.set_many,
+        independente do nº de produtos.
+        """
+        produto_ids = list(dict.fromkeys(produto_ids))
+        nomes = chaves.montar_muitos('avaliacao_stats', [{'produto_id': pk} for pk in produto_ids])
+        return cache_swr.obter_muitos(
+            dict(zip(nomes, produto_ids)), _calcular_stats, cache_ttl or chaves.ttl('avaliacao_stats')
         )
-        # distribuição por estrela (1..5)
-        dist_qs = qs.values('nota_geral').annotate(count=Count('id')).order_by('nota_geral')
-        por_estrela = {i: 0 for i in range(1, 6)}
-        for row in dist_qs:
-            try:
-                por_estrela[int(row['nota_geral'])] = row['count']
-            except Exception:
-                continue
-
-        result = {
-            'total': int(agg['total'] or 0),
-            'media': float(agg['media']) if agg['media'] is not None else None,
-            'soma_notas': int(agg['soma_notas'] or 0),
-            'por_estrela': por_estrela
-        }
-        cache.set(cache_key, result, cache_ttl)
-        return result
 
     def rating_distribution(self, produto_id):
         """Retorna lista de tuples (nota, count) ordenada por nota asc."""
@@ -126,9 +134,12 @@ class AvaliacaoManager(models.Manager):
         return self.get_queryset().por_produto_usuario(produto_id, usuario_id)
 
     # Wrappers de estatísticas
-    def stats_for_product(self, produto_id, cache_ttl=60):
+    def stats_for_product(self, produto_id, cache_ttl=None):
         return self.get_queryset().stats_for_product(produto_id, cache_ttl=cache_ttl)
 
+    def stats_for_products(self, produto_ids, cache_ttl=None):
+        return self.get_queryset().stats_for_products(produto_ids, cache_ttl=cache_ttl)
+
     def rating_distribution(self, produto_id):
         return self.get_queryset().rating_distribution(produto_id)
 
@@ -145,6 +156,10 @@ class AvaliacaoManager(models.Manager):
 # -----------------------
 # Modelo Avaliacao
 # -----------------------
+# Campos que entram em EstatisticaAvaliacao, na ordem de estado_estatisticas()
+CAMPOS_ESTATISTICAS = ('status', 'nota_geral', 'recomendaria')
+
+
 class Avaliacao(models.Model):
     ESTRELAS_CHOICES = [(i, str(i)) for i in range(1, 6)]
     STATUS_CHOICES = [
@@ -295,6 +310,12 @@ class Avaliacao(models.Model):
         # Salva com atomic para reduzir risco de race em constraints
         try:
             with transaction.atomic():
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None and set(CAMPOS_ESTATISTICAS).isdisjoint(update_fields):
+                    # Likes, moderação de texto...: não mexe nos agregados
+                    self._estado_estatisticas = self.estado_estatisticas()
+                elif not self._state.adding:
+                    self._travar_estado_estatisticas()
                 super().save(*args, **kwargs)
         except IntegrityError as exc:
             # Captura violação de unicidade produto+usuario
@@ -308,6 +329,25 @@ class Avaliacao(models.Model):
                 # Outro erro de integridade
                 raise
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._travar_estado_estatisticas()
+            return super().delete(*args, **kwargs)
+
+    def _travar_estado_estatisticas(self):
+        """
+        Relê (status, nota, recomendaria) com a linha travada: o delta das
+        estatísticas (signals) parte do estado confirmado no banco, e não do
+        que este objeto viu ao ser carregado. Dois requests aprovando a mesma
+        avaliação pendente contam uma vez só; já apagada, não desconta nada.
+        """
+        self._estado_estatisticas = (
+            Avaliacao.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list(*CAMPOS_ESTATISTICAS)
+            .first()
+        )
+
     def delete_soft(self, motivo="Removido pelo usuário"):
         """Soft delete para conformidade com LGPD"""
         self.status = 'rejeitado'
@@ -325,22 +365,157 @@ class Avaliacao(models.Model):
         return (self.likes or 0) + (self.dislikes or 0) + (self.util or 0) + (self.nao_util or 0)
 
     # ---------- helpers para estatísticas / cache ----------
+    def estado_estatisticas(self):
+        """(status, nota, recomendaria) lidos do __dict__ para não disparar query em campos adiados"""
+        return (self.__dict__.get('status'), self.__dict__.get('nota_geral'), self.__dict__.get('recomendaria'))
+
     def to_stat_record(self):
         """Retorna representação curta para agregação incremental (produto+nota)"""
         return {'produto_id': self.produto_id, 'nota': int(self.nota_geral), 'publicado_em': self.publicado_em}
 
     @classmethod
-    def recalc_cache_for_produto(cls, produto_id, cache_ttl=300):
+    def recalc_cache_for_produto(cls, produto_id, cache_ttl=None):
         """
-        Helper que força recalculo e atualiza cache/métodos derivados.
-        Pode ser chamado por task Celery após aprovar/editar/excluir avaliações.
+        Helper que força recalculo e aquece o cache da versão atual.
+        Não é preciso para invalidar (os signals incrementam a versão após o
+        commit); serve para aquecer o cache fora da requisição (task Celery).
         """
-        stats = cls.objects.stats_for_product(produto_id, cache_ttl=cache_ttl)
-        cache_key = f"avaliacao_stats_prod_{produto_id}"
-        cache.set(cache_key, stats, cache_ttl)
+        stats = _calcular_stats([produto_id])[produto_id]
+        cache_swr.gravar(
+            chaves.montar('avaliacao_stats', produto_id=produto_id), stats,
+            cache_ttl or chaves.ttl('avaliacao_stats'),
+        )
         return stats
 
 
+# -----------------------
+# Estatísticas denormalizadas por produto
+# -----------------------
+class EstatisticaAvaliacao(models.Model):
+    """
+    Agregados das avaliações APROVADAS de um produto, mantidos de forma
+    incremental (UPDATE com F() nos signals) para que cards e páginas de
+    detalhe nunca façam GROUP BY sobre as avaliações.
+    """
+    produto = models.OneToOneField('core.Produto', on_delete=models.CASCADE, primary_key=True,
+                                   related_name='estatistica_avaliacao')
+    total = models.PositiveIntegerField(default=0)
+    soma_notas = models.PositiveIntegerField(default=0)
+    estrelas_1 = models.PositiveIntegerField(default=0)
+    estrelas_2 = models.PositiveIntegerField(default=0)
+    estrelas_3 = models.PositiveIntegerField(default=0)
+    estrelas_4 = models.PositiveIntegerField(default=0)
+    estrelas_5 = models.PositiveIntegerField(default=0)
+    recomendacoes = models.PositiveIntegerField(default=0)
+    com_midia = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estatística de Avaliações'
+        verbose_name_plural = 'Estatísticas de Avaliações'
+
+    def __str__(self):
+        return f"Estatísticas de avaliações do produto {self.produto_id}"
+
+    @property
+    def media(self):
+        return round(self.soma_notas / self.total, 2) if self.total else None
+
+    @property
+    def por_estrela(self):
+        return {i: getattr(self, f'estrelas_{i}') for i in range(1, 6)}
+
+    @property
+    def distribuicao(self):
+        """Lista (5 -> 1 estrelas) de dicts {nota, total, percentual}"""
+        return [
+            {
+                'nota': nota,
+                'total': getattr(self, f'estrelas_{nota}'),
+                'percentual': round(100 * getattr(self, f'estrelas_{nota}') / self.total) if self.total else 0,
+            }
+            for nota in range(5, 0, -1)
+        ]
+
+    @property
+    def percentual_recomendacao(self):
+        return round(100 * self.recomendacoes / self.total) if self.total else None
+
+    def como_contexto(self):
+        """Formato de `estatisticas` usado no template de detalhes do produto"""
+        percentual = self.percentual_recomendacao
+        return {
+            'media': self.media or 0.0,
+            'total': self.total,
+            'distribuicao': self.distribuicao,
+            'recomendacao_percent': 100 if percentual is None else percentual,
+            'com_midia': self.com_midia,
+        }
+
+    # ---------- manutenção incremental ----------
+    @staticmethod
+    def contribuicao(estado):
+        """Quanto uma avaliação no `estado` (status, nota, recomendaria) soma nos agregados."""
+        if not estado or estado[0] != 'aprovado' or not estado[1]:
+            return {}
+        _, nota, recomendaria = estado
+        return {'total': 1, 'soma_notas': int(nota), f'estrelas_{int(nota)}': 1, 'recomendacoes': int(bool(recomendaria))}
+
+    @classmethod
+    def aplicar_delta(cls, produto_id, delta):
+        """UPDATE atômico com F(); cria a linha na primeira avaliação do produto."""
+        delta = {campo: valor for campo, valor in delta.items() if valor}
+        if not delta:
+            return
+        alteracoes = {campo: F(campo) + valor for campo, valor in delta.items()}
+        alteracoes['atualizado_em'] = timezone.now()
+        if not cls.objects.filter(produto_id=produto_id).update(**alteracoes):
+            cls.objects.get_or_create(produto_id=produto_id)
+            cls.objects.filter(produto_id=produto_id).update(**alteracoes)
+
+    @classmethod
+    def registrar_mudanca(cls, avaliacao, antes, depois):
+        """Aplica a diferença entre o estado anterior e o atual de uma avaliação."""
+        delta = Counter(cls.contribuicao(depois))
+        delta.subtract(cls.contribuicao(antes))
+        aprovada_antes = bool(antes) and antes[0] == 'aprovado'
+        aprovada_depois = bool(depois) and depois[0] == 'aprovado'
+        # Mídias só existem depois do primeiro save; a checagem é um EXISTS pela FK
+        if aprovada_antes != aprovada_depois and avaliacao.pk and avaliacao.midias.aprovadas().exists():
+            delta['com_midia'] += 1 if aprovada_depois else -1
+        cls.aplicar_delta(avaliacao.produto_id, delta)
+
+    @classmethod
+    def recalcular(cls, produto_ids=None):
+        """
+        Reconstrói os agregados a partir das avaliações (backfill/reparo).
+        Retorna o número de produtos com estatísticas.
+        """
+        aprovadas = Avaliacao.objects.filter(status='aprovado')
+        if produto_ids is not None:
+            aprovadas = aprovadas.filter(produto_id__in=produto_ids)
+
+        agregados = {}
+        linhas = aprovadas.values('produto_id', 'nota_geral').annotate(
+            n=Count('id'), rec=Count('id', filter=Q(recomendaria=True))
+        )
+        for row in linhas:
+            stats = agregados.setdefault(row['produto_id'], cls(produto_id=row['produto_id']))
+            stats.total += row['n']
+            stats.soma_notas += row['n'] * row['nota_geral']
+            stats.recomendacoes += row['rec']
+            setattr(stats, f"estrelas_{row['nota_geral']}", getattr(stats, f"estrelas_{row['nota_geral']}") + row['n'])
+        com_midia = aprovadas.filter(midias__aprovado=True).values('produto_id').annotate(n=Count('id', distinct=True))
+        for row in com_midia:
+            agregados[row['produto_id']].com_midia = row['n']
+
+        with transaction.atomic():
+            existentes = cls.objects.all() if produto_ids is None else cls.objects.filter(produto_id__in=produto_ids)
+            existentes.delete()
+            cls.objects.bulk_create(agregados.values(), batch_size=500)
+        return len(agregados)
+
+
 # -----------------------
 # MidiaAvaliacao
 # -----------------------
@@ -417,7 +592,33 @@ class MidiaAvaliacao(models.Model):
                 # fail-safe: não bloquear o save principal
                 self.hash_arquivo = None
 
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'aprovado' not in update_fields:
+            # Hash, thumbnail, metadados...: não mexe em com_midia
+            self._aprovada_antes = self.aprovado
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            self._travar_avaliacao()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._travar_avaliacao()
+            return super().delete(*args, **kwargs)
+
+    def _travar_avaliacao(self):
+        """
+        Trava a linha da avaliação (a mesma de Avaliacao.save) e relê o status
+        dela e se esta mídia já estava aprovada: as mídias de uma avaliação
+        passam uma por vez, e com_midia (signals) parte do que está no banco.
+        """
+        self._avaliacao_travada = (
+            Avaliacao.objects.select_for_update()
+            .filter(pk=self.avaliacao_id)
+            .values_list('produto_id', 'status')
+            .first()
+        )
+        self._aprovada_antes = bool(self.pk) and MidiaAvaliacao.objects.filter(pk=self.pk, aprovado=True).exists()
 
 
 # -----------------------
@@ -0,0 +1,39 @@
+# core/models/busca.py
+from django.db import models
+from .produto import Produto
+
+
+class DocumentoBusca(models.Model):
+    """Entrada do índice invertido por produto (apenas produtos ativos são indexados)."""
+    produto = models.OneToOneField(
+        Produto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='documento_busca'
+    )
+    # Soma das frequências ponderadas dos termos (comprimento do documento no BM25)
+    tamanho = models.PositiveIntegerField(default=0)
+    categoria = models.CharField(max_length=50, blank=True, db_index=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Documento de Busca'
+        verbose_name_plural = 'Documentos de Busca'
+
+    def __str__(self):
+        return f'Documento de busca do produto {self.produto_id}'
+
+
+class TermoBusca(models.Model):
+    """Posting do índice invertido: termo -> documento com frequência ponderada."""
+    termo = models.CharField(max_length=64)
+    documento = models.ForeignKey(DocumentoBusca, on_delete=models.CASCADE, related_name='termos')
+    frequencia = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = 'Termo de Busca'
+        verbose_name_plural = 'Termos de Busca'
+        unique_together = ['termo', 'documento']
+
+    def __str__(self):
+        return f'{self.termo} -> {self.documento_id} ({self.frequencia})'
@@ -23,7 +23,13 @@ class Carrinho(models.Model):
 
     @property
     def total_preco(self):
-        return sum(item.subtotal for item in self.itens.all())
+        total = self.itens.aggregate(
+            total=models.Sum(
+                models.F('quantidade') * models.F('preco_unitario'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )['total']
+        return total or 0
 
 
 class ItemCarrinho(models.Model):
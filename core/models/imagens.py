@@ -0,0 +1,68 @@
+# core/models/imagens.py
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db import models
+
+
+class DerivadoImagemManager(models.Manager):
+    def srcsets(self, originais):
+        """
+        `srcset` de vários arquivos originais em uma query:
+        {nome_original: {formato: 'url 320w, url 640w'}} (só os que já têm derivados).
+        """
+        nomes = {nome for nome in originais if nome}
+        if not nomes:
+            return {}
+        por_original = defaultdict(lambda: defaultdict(list))
+        for original, formato, largura, arquivo in (
+            self.filter(original__in=nomes)
+            .order_by('largura')
+            .values_list('original', 'formato', 'largura', 'arquivo')
+        ):
+            por_original[original][formato].append(f'{self.model.url_arquivo(arquivo)} {largura}w')
+        return {
+            original: {formato: ', '.join(itens) for formato, itens in formatos.items()}
+            for original, formatos in por_original.items()
+        }
+
+
+class DerivadoImagem(models.Model):
+    """
+    Versão redimensionada (largura fixa) e recodificada de uma imagem enviada,
+    gerada em background (ver core.services.imagens_service). Indexada pelo nome
+    do arquivo original, então serve tanto para Produto.imagem quanto para a galeria.
+    """
+    FORMATOS = [
+        ('avif', 'AVIF'),
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    original = models.CharField(max_length=255, db_index=True)
+    formato = models.CharField(max_length=10, choices=FORMATOS)
+    largura = models.PositiveIntegerField()
+    altura = models.PositiveIntegerField()
+    arquivo = models.CharField(max_length=255)
+    tamanho_bytes = models.PositiveIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    objects = DerivadoImagemManager()
+
+    class Meta:
+        verbose_name = 'Derivado de Imagem'
+        verbose_name_plural = 'Derivados de Imagens'
+        constraints = [
+            models.UniqueConstraint(fields=['original', 'formato', 'largura'], name='unique_derivado_imagem'),
+        ]
+
+    def __str__(self):
+        return f'{self.original} ({self.formato}, {self.largura}w)'
+
+    @staticmethod
+    def url_arquivo(nome):
+        return default_storage.url(nome)
+
+    @property
+    def url(self):
+        return self.url_arquivo(self.arquivo)
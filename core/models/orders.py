@@ -1,10 +1,14 @@
 # core/models/orders.py
+import logging
+
 from django.db import models
 from django.utils import timezone
 from .base import BaseModel
 from .user import User
 from .produto import Produto
 
+logger = logging.getLogger(__name__)
+
 class StatusPedido(models.Model):
     nome = models.CharField(max_length=50)
     cor = models.CharField(max_length=7, default='#6B7280')
@@ -40,7 +44,7 @@ class StatusPedido(models.Model):
                 criados.append(obj.nome)
         
         if criados:
-            print(f"✅ Status criados: {', '.join(criados)}")
+            logger.info(f"Status criados: {', '.join(criados)}")
         return criados
 
 
@@ -109,7 +113,7 @@ class Pedido(BaseModel):
             # Em caso de erro, define valores seguros
             self.total_produtos = 0
             self.total_final = 0
-            print(f"Erro ao calcular totais do pedido: {e}")
+            logger.error(f"Erro ao calcular totais do pedido: {e}")
 
     @property
     def endereco_completo(self):
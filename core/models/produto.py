@@ -1,7 +1,9 @@
 # models/produto.py
 from django.db import models, transaction
 from django.db.models import Q
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, ObjectDoesNotExist
+
+from core.services.rastreio import span
 
 class Produto(models.Model):
     nome = models.CharField(max_length=255)
@@ -54,17 +56,42 @@ class Produto(models.Model):
         return f"{self.nome} ({self.sku or 'Sem SKU'})"
     
     def get_galeria_imagens(self):
-        """Método para debug - verificar se há imagens"""
-        try:
-            imagens = self.imagens.all().order_by('ordem')
-            print(f"🔍 DEBUG GALERIA - Produto {self.id}: {imagens.count()} imagens")
-            for img in imagens:
-                print(f"   - Imagem {img.id}: {img.imagem.name}, ordem: {img.ordem}, produto_id: {img.produto_id}")
+        """Imagens da galeria na ordem de exibição (Meta.ordering; aproveita o prefetch de 'imagens')"""
+        with span('produto.galeria_imagens', produto=self.pk) as s:
+            imagens = self.imagens.all()
+            s.anotar(imagens=len(imagens))
             return imagens
-        except Exception as e:
-            print(f"❌ DEBUG GALERIA ERRO: {e}")
-            return self.imagens.none()
     
+    # ---------- avaliações (agregados denormalizados em EstatisticaAvaliacao) ----------
+    @property
+    def estatisticas_avaliacoes(self):
+        """Agregados das avaliações aprovadas; instância zerada se o produto ainda não tem avaliações"""
+        try:
+            return self.estatistica_avaliacao
+        except ObjectDoesNotExist:
+            from .avaliacoes import EstatisticaAvaliacao
+            return EstatisticaAvaliacao(produto=self)
+
+    @property
+    def media_avaliacoes(self):
+        return self.estatisticas_avaliacoes.media
+
+    @property
+    def total_avaliacoes(self):
+        return self.estatisticas_avaliacoes.total
+
+    @property
+    def distribuicao_avaliacoes(self):
+        return self.estatisticas_avaliacoes.distribuicao
+
+    @property
+    def percentual_recomendacao(self):
+        return self.estatisticas_avaliacoes.percentual_recomendacao
+
+    @property
+    def avaliacoes_com_midia(self):
+        return self.estatisticas_avaliacoes.com_midia
+
     @property
     def dimensoes_formatadas(self):
         """Retorna as dimensões formatadas para exibição"""
@@ -0,0 +1,47 @@
+# core/models/recomendacao.py
+from django.db import models
+from .produto import Produto
+
+
+class ProdutoRelacionado(models.Model):
+    """Top-K produtos comprados junto (pré-calculado offline a partir dos pedidos)."""
+    produto = models.OneToOneField(
+        Produto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='relacionados_calculados'
+    )
+    # IDs dos vizinhos em ordem decrescente de score
+    vizinhos = models.JSONField(default=list)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Produtos Relacionados'
+        verbose_name_plural = 'Produtos Relacionados'
+
+    def __str__(self):
+        return f'Relacionados do produto {self.produto_id}: {len(self.vizinhos)}'
+
+
+class VelocidadeProduto(models.Model):
+    """
+    Contadores de vendas/visualizações com decaimento exponencial (forward decay):
+    cada evento soma peso * exp(λ·(t - marco)), então o ranking nunca precisa
+    reescrever os valores antigos (ver core.services.destaque_service).
+    """
+    produto = models.OneToOneField(
+        Produto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='velocidade'
+    )
+    score_vendas = models.FloatField(default=0)
+    score_visualizacoes = models.FloatField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Velocidade do Produto'
+        verbose_name_plural = 'Velocidade dos Produtos'
+
+    def __str__(self):
+        return f'Velocidade do produto {self.produto_id}'
@@ -0,0 +1,10 @@
+# core/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class ProdutoCursorPagination(CursorPagination):
+    """Paginação por cursor (keyset) sobre a PK: custo constante em qualquer página, sem OFFSET/COUNT"""
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 60
@@ -0,0 +1,17 @@
+# core/search/__init__.py
+from .texto import tokenizar, dobrar_acentos
+from .versao import versao_indice
+from .indice import buscar, indexar_produto, indexar_produtos, remover_produto, reindexar_tudo
+from .fuzzy import expandir_consulta
+
+__all__ = [
+    'tokenizar',
+    'dobrar_acentos',
+    'buscar',
+    'indexar_produto',
+    'indexar_produtos',
+    'remover_produto',
+    'reindexar_tudo',
+    'versao_indice',
+    'expandir_consulta',
+]
@@ -0,0 +1,115 @@
+# core/search/autocomplete.py
+"""
+Autocomplete da caixa de busca.
+
+Array ordenado de chaves (nome completo, nome a partir de cada palavra e SKU)
+consultado com bisect; prefixos de 1-2 caracteres têm o top-N pré-calculado
+para não varrer metade do catálogo. Mantido em memória por processo e
+reconstruído em segundo plano quando a versão do índice de busca muda
+(EstruturaVersionada). A popularidade (GROUP BY sobre os itens de pedido)
+fica no cache compartilhado por uma hora: não muda com edições de produto e
+não precisa ser refeita por cada processo a cada reconstrução.
+"""
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Sum
+
+from core.models import Produto, ItemPedido
+from core.services import cache_swr, chaves
+from .texto import STOPWORDS, normalizar_chave
+from .versao import EstruturaVersionada
+
+logger = logging.getLogger(__name__)
+
+LIMITE_PADRAO = 8
+LIMITE_MAXIMO = 20
+# Máximo de chaves examinadas por prefixo (prefixos curtos usam o top pré-calculado)
+MAX_VARREDURA = 2000
+TAMANHO_PREFIXO_CURTO = 2
+
+
+class IndiceAutocomplete:
+    """Estrutura imutável: chaves ordenadas + produtos + popularidade."""
+
+    def __init__(self, produtos, popularidade):
+        self.produtos = {}
+        self.popularidade = popularidade
+        entradas = set()
+        for produto_id, nome, sku in produtos:
+            self.produtos[produto_id] = (nome, sku or '')
+            palavras = normalizar_chave(nome).split()
+            for i, palavra in enumerate(palavras):
+                if i == 0 or palavra not in STOPWORDS:
+                    entradas.add((' '.join(palavras[i:]), produto_id))
+            chave_sku = normalizar_chave(sku)
+            if chave_sku:
+                entradas.add((chave_sku, produto_id))
+                entradas.add((chave_sku.replace(' ', ''), produto_id))
+
+        ordenadas = sorted(entradas)
+        self.chaves = [chave for chave, _ in ordenadas]
+        self.ids = [produto_id for _, produto_id in ordenadas]
+
+        curtos = defaultdict(set)
+        for chave, produto_id in ordenadas:
+            for tamanho in range(1, TAMANHO_PREFIXO_CURTO + 1):
+                if len(chave) >= tamanho:
+                    curtos[chave[:tamanho]].add(produto_id)
+        self.curtos = {prefixo: self._ranquear(ids)[:LIMITE_MAXIMO] for prefixo, ids in curtos.items()}
+
+    @classmethod
+    def construir(cls):
+        produtos = Produto.objects.filter(status='Ativo').values_list('id', 'nome', 'sku')
+        return cls(produtos.iterator(chunk_size=2000), popularidade())
+
+    def _ranquear(self, ids):
+        return sorted(ids, key=lambda pk: (-self.popularidade.get(pk, 0), self.produtos[pk][0]))
+
+    def sugerir(self, prefixo, limite=LIMITE_PADRAO):
+        prefixo = normalizar_chave(prefixo)
+        if not prefixo:
+            return []
+        if len(prefixo) <= TAMANHO_PREFIXO_CURTO:
+            ids = self.curtos.get(prefixo, [])[:limite]
+        else:
+            encontrados = set()
+            inicio = bisect_left(self.chaves, prefixo)
+            for i in range(inicio, min(inicio + MAX_VARREDURA, len(self.chaves))):
+                if not self.chaves[i].startswith(prefixo):
+                    break
+                encontrados.add(self.ids[i])
+            ids = self._ranquear(encontrados)[:limite]
+        return [
+            {'id': pk, 'nome': self.produtos[pk][0], 'sku': self.produtos[pk][1]}
+            for pk in ids
+        ]
+
+
+def _calcular_popularidade():
+    vendas = (
+        ItemPedido.objects.values('produto_id')
+        .annotate(total=Sum('quantidade'))
+        .values_list('produto_id', 'total')
+    )
+    return dict(vendas)
+
+
+def popularidade():
+    """{produto_id: unidades vendidas}, compartilhado entre os processos."""
+    return cache_swr.obter(
+        chaves.montar('autocomplete_popularidade'), _calcular_popularidade, chaves.ttl('autocomplete_popularidade'),
+    )
+
+
+_indice = EstruturaVersionada('Autocomplete', IndiceAutocomplete.construir, lambda i: f'{len(i.chaves)} chaves')
+
+
+def indice_autocomplete():
+    """Índice do processo (o anterior serve enquanto o novo é construído)."""
+    return _indice.obter()
+
+
+def sugerir(prefixo, limite=LIMITE_PADRAO):
+    return indice_autocomplete().sugerir(prefixo, min(max(int(limite), 1), LIMITE_MAXIMO))
@@ -0,0 +1,198 @@
+# core/search/facetas.py
+"""
+Navegação facetada (categoria, faixa de preço, estoque e avaliação).
+
+Todas as contagens saem de um único `aggregate()` com COUNT condicional, em
+vez de um COUNT por valor de faceta. Cada faceta é contada com todos os
+filtros ativos menos o dela: com categoria=X&preco=Y, as categorias mostram
+quantos produtos há na faixa Y e as faixas de preço quantos há na categoria X.
+
+A busca textual restringe o conjunto por subquery nas postings dos termos
+(TermoBusca), e não por uma lista de ids; a avaliação vem de
+EstatisticaAvaliacao (agregados incrementais), sem AVG sobre as avaliações.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from core.models import Produto, TermoBusca
+from . import indice
+from .fuzzy import expandir_consulta
+
+# Limites das faixas de preço (R$); a última faixa é aberta
+FAIXAS_PRECO_PADRAO = (50, 100, 200)
+# Buckets de avaliação: "N estrelas ou mais"
+FAIXAS_AVALIACAO = (4, 3, 2, 1)
+
+
+def _choices(campo):
+    return Produto._meta.get_field(campo).choices
+
+
+def faixas_preco():
+    """Lista de (chave, rótulo, mínimo, máximo) a partir de BUSCA_CONFIG['FAIXAS_PRECO']."""
+    limites = getattr(settings, 'BUSCA_CONFIG', {}).get('FAIXAS_PRECO', FAIXAS_PRECO_PADRAO)
+    faixas = []
+    anterior = None
+    for limite in list(limites) + [None]:
+        if anterior is None:
+            faixas.append((f'ate-{limite}', f'Até R$ {limite}', None, limite))
+        elif limite is None:
+            faixas.append((f'{anterior}-mais', f'Acima de R$ {anterior}', anterior, None))
+        else:
+            faixas.append((f'{anterior}-{limite}', f'R$ {anterior} a R$ {limite}', anterior, limite))
+        anterior = limite
+    return faixas
+
+
+def _q_faixa(minimo, maximo):
+    q = Q()
+    if minimo is not None:
+        q &= Q(preco__gte=minimo)
+    if maximo is not None:
+        q &= Q(preco__lt=maximo)
+    return q
+
+
+def _q_avaliacao(nota):
+    """Média das avaliações aprovadas >= nota, sem divisão: soma_notas >= nota * total."""
+    return Q(
+        estatistica_avaliacao__total__gt=0,
+        estatistica_avaliacao__soma_notas__gte=F('estatistica_avaliacao__total') * nota,
+    )
+
+
+def filtros_da_requisicao(params):
+    """Extrai os filtros de faceta dos query params (valores inválidos são ignorados)."""
+    filtros = {}
+    categoria = params.get('categoria', '')
+    if categoria in dict(_choices('categoria')):
+        filtros['categoria'] = categoria
+    preco = params.get('preco', '')
+    if preco in {chave for chave, *_ in faixas_preco()}:
+        filtros['preco'] = preco
+    if params.get('em_estoque') in ('1', 'true'):
+        filtros['em_estoque'] = True
+    try:
+        avaliacao = int(params.get('avaliacao', 0))
+        if avaliacao in FAIXAS_AVALIACAO:
+            filtros['avaliacao'] = avaliacao
+    except (TypeError, ValueError):
+        pass
+    return filtros
+
+
+def _condicoes(filtros):
+    """{faceta: Q} de cada filtro ativo."""
+    condicoes = {}
+    if 'categoria' in filtros:
+        condicoes['categoria'] = Q(categoria=filtros['categoria'])
+    if 'preco' in filtros:
+        for chave, _, minimo, maximo in faixas_preco():
+            if chave == filtros['preco']:
+                condicoes['preco'] = _q_faixa(minimo, maximo)
+    if filtros.get('em_estoque'):
+        condicoes['estoque'] = Q(estoque__gt=0)
+    if 'avaliacao' in filtros:
+        condicoes['avaliacao'] = _q_avaliacao(filtros['avaliacao'])
+    return condicoes
+
+
+def _exceto(condicoes, faceta=None):
+    """Todos os filtros ativos menos o de `faceta`."""
+    q = Q()
+    for nome, condicao in condicoes.items():
+        if nome != faceta:
+            q &= condicao
+    return q
+
+
+def aplicar_filtros(queryset, filtros):
+    return queryset.filter(_exceto(_condicoes(filtros)))
+
+
+def contar_facetas(queryset, filtros=None):
+    """
+    Contagens de todas as facetas em uma única query agregada, cada uma com os
+    demais filtros aplicados. `total` ignora só a categoria (link "Todos");
+    `total_filtrado` aplica todos.
+    """
+    condicoes = _condicoes(filtros or {})
+    agregados = {
+        'total_filtrado': Count('id', filter=_exceto(condicoes)),
+        'total': Count('id', filter=_exceto(condicoes, 'categoria')),
+    }
+    for i, (valor, _) in enumerate(_choices('categoria')):
+        agregados[f'categoria_{i}'] = Count('id', filter=_exceto(condicoes, 'categoria') & Q(categoria=valor))
+    faixas = faixas_preco()
+    for i, (_, _, minimo, maximo) in enumerate(faixas):
+        agregados[f'preco_{i}'] = Count('id', filter=_exceto(condicoes, 'preco') & _q_faixa(minimo, maximo))
+    agregados['em_estoque'] = Count('id', filter=_exceto(condicoes, 'estoque') & Q(estoque__gt=0))
+    for nota in FAIXAS_AVALIACAO:
+        agregados[f'avaliacao_{nota}'] = Count('id', filter=_exceto(condicoes, 'avaliacao') & _q_avaliacao(nota))
+
+    r = queryset.aggregate(**agregados)
+    return {
+        'total': r['total'],
+        'total_filtrado': r['total_filtrado'],
+        'categoria': [
+            {'valor': valor, 'rotulo': rotulo, 'total': r[f'categoria_{i}']}
+            for i, (valor, rotulo) in enumerate(_choices('categoria'))
+        ],
+        'preco': [
+            {'valor': chave, 'rotulo': rotulo, 'total': r[f'preco_{i}']}
+            for i, (chave, rotulo, _, _) in enumerate(faixas)
+        ],
+        'estoque': [
+            {'valor': '1', 'rotulo': 'Em estoque', 'total': r['em_estoque']},
+        ],
+        'avaliacao': [
+            {'valor': nota, 'rotulo': f'{nota} estrelas ou mais', 'total': r[f'avaliacao_{nota}']}
+            for nota in FAIXAS_AVALIACAO
+        ],
+    }
+
+
+def busca_facetada(query='', filtros=None, pagina=1, por_pagina=None, base=None):
+    """
+    Busca (opcionalmente textual) + facetas + página de resultados.
+    Retorna dict: { ids, total, pagina, por_pagina, facetas, correcoes }.
+    Sem `query`, ordena pelos mais recentes.
+    """
+    filtros = filtros or {}
+    por_pagina = min(int(por_pagina or indice.config('PAGINACAO_ITEMS')), indice.config('MAX_PAGINACAO_ITEMS'))
+    pagina = max(int(pagina or 1), 1)
+    inicio = (pagina - 1) * por_pagina
+
+    if base is None:
+        base = Produto.objects.filter(status='Ativo')
+
+    correcoes = {}
+    if query:
+        termos, correcoes = expandir_consulta(query)
+        scores = indice.pontuar(termos)
+        # Os candidatos são os documentos com algum dos termos (as chaves de
+        # `scores`): subquery nas postings, do tamanho da consulta e não do resultado
+        base = base.filter(pk__in=TermoBusca.objects.filter(termo__in=list(termos)).values('documento_id'))
+
+    facetas = contar_facetas(base, filtros)
+
+    filtrado = aplicar_filtros(base, filtros)
+    total = facetas['total_filtrado']
+    if query:
+        # Mesmo critério de desempate de indice.buscar; só ordena até o fim da página
+        candidatos = filtrado.values_list('id', flat=True)
+        ranking = heapq.nlargest(inicio + por_pagina, candidatos, key=lambda pk: (scores.get(pk, 0), pk))
+        ids = ranking[inicio:]
+    else:
+        ids = list(filtrado.order_by('-id').values_list('id', flat=True)[inicio:inicio + por_pagina])
+
+    return {
+        'ids': ids,
+        'total': total,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'facetas': facetas,
+        'correcoes': correcoes,
+    }
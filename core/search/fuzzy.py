@@ -0,0 +1,173 @@
+# core/search/fuzzy.py
+"""
+Tolerância a erros de digitação e sinônimos para a busca de produtos.
+
+O vocabulário (palavras de nome, sku e categoria dos produtos ativos) fica em
+memória no processo, com um índice de trigramas para gerar candidatos e
+Levenshtein limitado para confirmar a correção. É reconstruído em segundo
+plano quando a versão do índice de busca muda (EstruturaVersionada), então a
+consulta não faz SQL.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from core.models import Produto
+from .texto import dobrar_acentos, palavras, radical, tokenizar_sku
+from .versao import EstruturaVersionada
+
+logger = logging.getLogger(__name__)
+
+# Grupos de sinônimos (jargão automotivo); qualquer palavra do grupo expande para as demais.
+# Pode ser sobrescrito em settings.BUSCA_CONFIG['SINONIMOS'].
+SINONIMOS_PADRAO = (
+    ('shampoo', 'xampu', 'shampu', 'champu'),
+    ('cera', 'wax'),
+    ('vitrificacao', 'vitrificador', 'coating'),
+    ('selante', 'sealant'),
+    ('politriz', 'polidora', 'polimentadora'),
+    ('boina', 'pad'),
+    ('microfibra', 'flanela'),
+    ('pretinho', 'renovador', 'revitalizador'),
+    ('descontaminante', 'clay', 'claybar'),
+    ('apc', 'multiuso', 'desengraxante'),
+    ('composto', 'polidor'),
+)
+
+# Peso das palavras derivadas (correção/sinônimo) em relação ao termo digitado
+PESO_EXPANSAO = 0.8
+SIMILARIDADE_MINIMA = 0.3
+
+
+def _trigramas(palavra):
+    p = f'  {palavra} '
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+def distancia_levenshtein(a, b, limite):
+    """Distância de edição com corte: retorna limite + 1 se passar do limite."""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        menor = i
+        for j, cb in enumerate(b, 1):
+            custo = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb))
+            atual.append(custo)
+            menor = min(menor, custo)
+        if menor > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+def _max_erros(palavra):
+    if len(palavra) <= 3:
+        return 0
+    return 1 if len(palavra) <= 6 else 2
+
+
+class Vocabulario:
+    """Palavras do catálogo + índice de trigramas + sinônimos (estrutura imutável)."""
+
+    def __init__(self, frequencias, grupos_sinonimos):
+        self.palavras = list(frequencias)
+        self.frequencias = frequencias
+        self.radicais = {radical(p) for p in self.palavras}
+        self.trigramas = defaultdict(list)
+        for idx, palavra in enumerate(self.palavras):
+            for tri in _trigramas(palavra):
+                self.trigramas[tri].append(idx)
+
+        self.sinonimos = defaultdict(set)
+        for grupo in grupos_sinonimos:
+            grupo = {dobrar_acentos(p) for p in grupo}
+            for palavra in grupo:
+                self.sinonimos[palavra] |= grupo - {palavra}
+
+    @classmethod
+    def construir(cls):
+        frequencias = Counter()
+        produtos = Produto.objects.filter(status='Ativo').values_list('nome', 'sku', 'categoria')
+        for nome, sku, categoria in produtos.iterator(chunk_size=2000):
+            frequencias.update(palavras(nome))
+            frequencias.update(palavras(categoria))
+            frequencias.update(tokenizar_sku(sku))
+        grupos = getattr(settings, 'BUSCA_CONFIG', {}).get('SINONIMOS', SINONIMOS_PADRAO)
+        return cls(frequencias, grupos)
+
+    def conhece(self, palavra):
+        return palavra in self.frequencias or radical(palavra) in self.radicais
+
+    def corrigir(self, palavra):
+        """Palavra do vocabulário mais próxima (ou None)."""
+        limite = _max_erros(palavra)
+        if not limite:
+            return None
+
+        tri_consulta = _trigramas(palavra)
+        coincidencias = Counter()
+        for tri in tri_consulta:
+            coincidencias.update(self.trigramas.get(tri, ()))
+
+        melhor, melhor_chave = None, None
+        for idx, comuns in coincidencias.items():
+            candidata = self.palavras[idx]
+            # Dice sobre trigramas como filtro barato antes do Levenshtein
+            dice = 2 * comuns / (len(tri_consulta) + len(candidata) + 1)
+            if dice < SIMILARIDADE_MINIMA:
+                continue
+            distancia = distancia_levenshtein(palavra, candidata, limite)
+            if distancia > limite:
+                continue
+            chave = (distancia, -self.frequencias[candidata], candidata)
+            if melhor_chave is None or chave < melhor_chave:
+                melhor, melhor_chave = candidata, chave
+        return melhor
+
+
+_vocabulario = EstruturaVersionada(
+    'Vocabulário de busca', Vocabulario.construir, lambda v: f'{len(v.palavras)} palavras',
+)
+
+
+def vocabulario():
+    """Vocabulário do processo (o anterior serve enquanto o novo é construído)."""
+    return _vocabulario.obter()
+
+
+def expandir_consulta(query):
+    """
+    Converte a consulta em termos ponderados para o BM25.
+    Retorna (dict termo -> peso, dict palavra digitada -> correção aplicada).
+    """
+    vocab = vocabulario()
+    pesos = {}
+    correcoes = {}
+
+    def adicionar(palavra, peso):
+        termo = radical(palavra)
+        pesos[termo] = max(pesos.get(termo, 0), peso)
+
+    for palavra in palavras(query):
+        adicionar(palavra, 1.0)
+
+        base = palavra
+        if not vocab.conhece(palavra) and palavra not in vocab.sinonimos:
+            corrigida = vocab.corrigir(palavra)
+            if corrigida:
+                correcoes[palavra] = corrigida
+                adicionar(corrigida, PESO_EXPANSAO)
+                base = corrigida
+
+        for sinonimo in vocab.sinonimos.get(base, ()):
+            for parte in palavras(sinonimo):
+                adicionar(parte, PESO_EXPANSAO)
+
+    # SKU digitado com separador (ex.: CER-001) também vira um termo único
+    if len(query.split()) == 1:
+        for termo in tokenizar_sku(query)[:1]:
+            pesos.setdefault(termo, 1.0)
+    return pesos, correcoes
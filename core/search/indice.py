@@ -0,0 +1,225 @@
+# core/search/indice.py
+"""
+Índice invertido de produtos persistido no banco (DocumentoBusca/TermoBusca)
+com ranking BM25.
+
+A consulta lê apenas as postings dos termos pesquisados (uma query indexada
+por `termo`), então o custo depende do número de documentos que contêm os
+termos, e não do tamanho do catálogo.
+"""
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from core.models import Produto, DocumentoBusca, TermoBusca
+from core.services import chaves
+from .texto import tokenizar, tokenizar_sku
+from .versao import incrementar_versao
+from . import fuzzy
+
+logger = logging.getLogger(__name__)
+
+# Campos do Produto que alteram o índice (save com update_fields fora disso não reindexa)
+CAMPOS_INDEXADOS = frozenset({'nome', 'sku', 'descricao', 'categoria', 'status'})
+
+_CONFIG_PADRAO = {
+    'BM25_K1': 1.2,
+    'BM25_B': 0.75,
+    'PESOS_CAMPOS': {'nome': 3, 'sku': 3, 'categoria': 2, 'descricao': 1},
+    'PAGINACAO_ITEMS': 20,
+    'MAX_PAGINACAO_ITEMS': 60,
+    'BATCH_SIZE': 500,
+}
+
+
+def config(chave):
+    return getattr(settings, 'BUSCA_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+# ---------- indexação ----------
+def _termos_do_produto(produto):
+    """Counter termo -> frequência ponderada pelo peso do campo."""
+    pesos = config('PESOS_CAMPOS')
+    termos = Counter()
+    for termo in tokenizar(produto.nome):
+        termos[termo] += pesos['nome']
+    for termo in tokenizar_sku(produto.sku):
+        termos[termo] += pesos['sku']
+    for termo in tokenizar(produto.categoria):
+        termos[termo] += pesos['categoria']
+    for termo in tokenizar(produto.descricao):
+        termos[termo] += pesos['descricao']
+    return termos
+
+
+def _montar_documento(produto):
+    termos = _termos_do_produto(produto)
+    documento = DocumentoBusca(
+        produto_id=produto.pk,
+        tamanho=sum(termos.values()),
+        categoria=produto.categoria or '',
+    )
+    postings = [
+        TermoBusca(termo=termo, documento_id=produto.pk, frequencia=min(freq, 32767))
+        for termo, freq in termos.items()
+    ]
+    return documento, postings
+
+
+def indexar_produto(produto):
+    """(Re)indexa um produto. Produtos que não estão ativos saem do índice."""
+    if produto.status != 'Ativo':
+        remover_produto(produto.pk)
+        return
+
+    documento, postings = _montar_documento(produto)
+    with transaction.atomic():
+        DocumentoBusca.objects.update_or_create(
+            produto_id=produto.pk,
+            defaults={'tamanho': documento.tamanho, 'categoria': documento.categoria},
+        )
+        TermoBusca.objects.filter(documento_id=produto.pk).delete()
+        TermoBusca.objects.bulk_create(postings, batch_size=config('BATCH_SIZE'))
+    incrementar_versao()
+
+
+def remover_produto(produto_id):
+    removidos, _ = DocumentoBusca.objects.filter(produto_id=produto_id).delete()
+    if removidos:
+        incrementar_versao()
+
+
+def indexar_produtos(produto_ids, batch_size=None):
+    """
+    (Re)indexa vários produtos em lotes — para cargas com bulk_create/bulk_update,
+    que não disparam os signals. Retorna o número de produtos ativos indexados.
+    """
+    batch_size = batch_size or config('BATCH_SIZE')
+    ids = sorted(set(produto_ids))
+    total = 0
+    with transaction.atomic():
+        for inicio in range(0, len(ids), batch_size):
+            lote = ids[inicio:inicio + batch_size]
+            TermoBusca.objects.filter(documento_id__in=lote).delete()
+            DocumentoBusca.objects.filter(produto_id__in=lote).delete()
+            documentos, postings = [], []
+            for produto in Produto.objects.filter(pk__in=lote, status='Ativo').only(
+                'id', 'nome', 'sku', 'descricao', 'categoria', 'status'
+            ):
+                documento, termos = _montar_documento(produto)
+                documentos.append(documento)
+                postings.extend(termos)
+            DocumentoBusca.objects.bulk_create(documentos, batch_size=batch_size)
+            TermoBusca.objects.bulk_create(postings, batch_size=batch_size)
+            total += len(documentos)
+    if ids:
+        incrementar_versao()
+    return total
+
+
+def reindexar_tudo(batch_size=None):
+    """Reconstrói o índice completo. Retorna o número de produtos indexados."""
+    batch_size = batch_size or config('BATCH_SIZE')
+    produtos = Produto.objects.filter(status='Ativo').only(
+        'id', 'nome', 'sku', 'descricao', 'categoria', 'status'
+    ).order_by('id')
+
+    total = 0
+    with transaction.atomic():
+        DocumentoBusca.objects.all().delete()
+        documentos, postings = [], []
+        for produto in produtos.iterator(chunk_size=batch_size):
+            documento, termos = _montar_documento(produto)
+            documentos.append(documento)
+            postings.extend(termos)
+            if len(documentos) >= batch_size:
+                DocumentoBusca.objects.bulk_create(documentos, batch_size=batch_size)
+                TermoBusca.objects.bulk_create(postings, batch_size=batch_size)
+                total += len(documentos)
+                documentos, postings = [], []
+        if documentos:
+            DocumentoBusca.objects.bulk_create(documentos, batch_size=batch_size)
+            TermoBusca.objects.bulk_create(postings, batch_size=batch_size)
+            total += len(documentos)
+
+    incrementar_versao()
+    logger.info(f"Índice de busca reconstruído: {total} produtos")
+    return total
+
+
+# ---------- consulta ----------
+def _estatisticas_corpus():
+    """(N, avgdl) do índice, em cache até a próxima alteração do índice."""
+    cache_key = chaves.montar('busca_corpus_stats')
+    stats = cache.get(cache_key)
+    if stats is None:
+        agg = DocumentoBusca.objects.aggregate(total=Count('produto_id'), media=Avg('tamanho'))
+        stats = (int(agg['total'] or 0), float(agg['media'] or 0.0))
+        cache.set(cache_key, stats, chaves.ttl('busca_corpus_stats'))
+    return stats
+
+
+def pontuar(termos, categoria=None):
+    """
+    Retorna dict produto_id -> score BM25 para os termos informados.
+    `termos` pode ser uma lista ou um dict termo -> peso (termos expandidos pesam menos).
+    `categoria` restringe o resultado sem alterar o IDF (calculado sobre o corpus todo).
+    """
+    if not isinstance(termos, dict):
+        termos = dict.fromkeys(termos, 1.0)
+    if not termos:
+        return {}
+
+    total_docs, media_tamanho = _estatisticas_corpus()
+    if not total_docs:
+        return {}
+
+    k1 = config('BM25_K1')
+    b = config('BM25_B')
+
+    postings = defaultdict(list)
+    rows = TermoBusca.objects.filter(termo__in=termos).values_list(
+        'termo', 'documento_id', 'frequencia', 'documento__tamanho', 'documento__categoria'
+    )
+    for termo, produto_id, freq, tamanho, cat in rows:
+        postings[termo].append((produto_id, freq, tamanho, cat))
+
+    scores = defaultdict(float)
+    for termo, docs in postings.items():
+        df = len(docs)
+        idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5)) * termos[termo]
+        for produto_id, freq, tamanho, cat in docs:
+            if categoria and cat != categoria:
+                continue
+            norma = k1 * (1 - b + b * (tamanho / media_tamanho if media_tamanho else 1))
+            scores[produto_id] += idf * (freq * (k1 + 1)) / (freq + norma)
+    return scores
+
+
+def buscar(query, categoria=None, pagina=1, por_pagina=None):
+    """
+    Busca rankeada com correção de digitação e sinônimos.
+    Retorna dict: { ids: [...página...], total, pagina, por_pagina, correcoes }.
+    """
+    por_pagina = min(int(por_pagina or config('PAGINACAO_ITEMS')), config('MAX_PAGINACAO_ITEMS'))
+    pagina = max(int(pagina or 1), 1)
+
+    termos, correcoes = fuzzy.expandir_consulta(query)
+    scores = pontuar(termos, categoria=categoria)
+
+    # Só ordena o necessário até o fim da página pedida
+    inicio = (pagina - 1) * por_pagina
+    ranking = heapq.nlargest(inicio + por_pagina, scores.items(), key=lambda item: (item[1], item[0]))
+    return {
+        'ids': [produto_id for produto_id, _ in ranking[inicio:]],
+        'total': len(scores),
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'correcoes': correcoes,
+    }
@@ -0,0 +1,89 @@
+# core/search/texto.py
+"""
+Normalização de texto para a busca de produtos.
+
+Dobra acentos, remove stopwords e aplica um stemmer "leve" de português
+(plurais + vogal temática). O mesmo pipeline é usado na indexação e na
+consulta, então só precisa ser consistente, não linguisticamente perfeito.
+"""
+import re
+import unicodedata
+
+TAMANHO_MAXIMO_TERMO = 64
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos e em no na nos nas ao aos
+para pra por pelo pela pelos pelas com sem que se ou mais muito muita
+seu sua seus suas este esta esse essa isso isto aquele aquela ja nao
+ser sao foi tem ter como entre ate sobre sob the and for
+""".split())
+
+# (sufixo, substituto) - aplicada apenas a primeira regra que casar
+_REGRAS_PLURAL = (
+    ('oes', 'ao'),
+    ('aes', 'ao'),
+    ('ais', 'al'),
+    ('eis', 'el'),
+    ('ois', 'ol'),
+    ('ns', 'm'),
+    ('res', 'r'),
+    ('zes', 'z'),
+    ('ses', 's'),
+)
+
+
+def dobrar_acentos(texto):
+    """Minúsculas + remoção de diacríticos (ç -> c, ã -> a, ...)."""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def radical(palavra):
+    """Stemmer leve de português: reduz plural e remove a vogal temática."""
+    if len(palavra) <= 3 or palavra.isdigit():
+        return palavra
+
+    for sufixo, substituto in _REGRAS_PLURAL:
+        if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= 2:
+            palavra = palavra[:-len(sufixo)] + substituto
+            break
+    else:
+        if palavra.endswith('s') and not palavra.endswith('ss'):
+            palavra = palavra[:-1]
+
+    if len(palavra) > 3 and palavra[-1] in 'aeo':
+        palavra = palavra[:-1]
+    return palavra
+
+
+def normalizar_chave(texto):
+    """Texto dobrado com palavras separadas por um espaço (mantém stopwords)."""
+    return ' '.join(_TOKEN_RE.findall(dobrar_acentos(texto)))
+
+
+def palavras(texto):
+    """Palavras dobradas (sem stemming), sem stopwords."""
+    return [
+        p for p in _TOKEN_RE.findall(dobrar_acentos(texto))
+        if p not in STOPWORDS and (len(p) > 1 or p.isdigit())
+    ]
+
+
+def tokenizar(texto):
+    """Lista de termos (radicais) prontos para indexação/consulta."""
+    return [radical(p)[:TAMANHO_MAXIMO_TERMO] for p in palavras(texto)]
+
+
+def tokenizar_sku(sku):
+    """SKU inteiro sem separadores + suas partes (ex.: 'CER-001' -> cer001, cer, 001)."""
+    partes = _TOKEN_RE.findall(dobrar_acentos(sku))
+    if not partes:
+        return []
+    termos = [''.join(partes)[:TAMANHO_MAXIMO_TERMO]]
+    if len(partes) > 1:
+        termos.extend(p[:TAMANHO_MAXIMO_TERMO] for p in partes)
+    return termos
@@ -0,0 +1,88 @@
+# core/search/versao.py
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from core.services import chaves
+
+logger = logging.getLogger(__name__)
+
+VERSAO_CACHE_KEY = chaves.montar('busca_indice_versao')
+
+
+def versao_indice():
+    """Versão atual do índice; estruturas derivadas (cache/memória) usam como chave."""
+    versao = cache.get(VERSAO_CACHE_KEY)
+    if versao is None:
+        cache.add(VERSAO_CACHE_KEY, 1, None)
+        versao = cache.get(VERSAO_CACHE_KEY, 1)
+    return versao
+
+
+def incrementar_versao():
+    try:
+        return cache.incr(VERSAO_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSAO_CACHE_KEY, 1, None)
+        return cache.incr(VERSAO_CACHE_KEY)
+
+
+class EstruturaVersionada:
+    """
+    Estrutura em memória do processo derivada do índice (vocabulário,
+    autocomplete). Só a primeira carga do processo é feita no request; quando
+    a versão do índice muda, a estrutura atual continua servindo enquanto uma
+    thread reconstrói a nova e a troca de uma vez, então nenhuma consulta
+    paga a varredura do catálogo depois de uma edição no admin.
+    BUSCA_CONFIG['RECONSTRUIR_EM_SEGUNDO_PLANO'] = False reconstrói no próprio
+    request (testes, comandos).
+    """
+
+    def __init__(self, nome, construir, descrever=len):
+        self.nome = nome
+        self._construir = construir
+        self._descrever = descrever
+        self._atual = None              # (versão, estrutura): trocado de uma vez
+        self._reconstruindo = None      # pid do processo com reconstrução em andamento
+        self._lock = threading.Lock()
+
+    def obter(self):
+        versao = versao_indice()
+        atual = self._atual
+        if atual is None or (atual[0] != versao and not self._em_segundo_plano()):
+            with self._lock:
+                if self._atual is None or self._atual[0] != versao:
+                    self._carregar(versao)
+            return self._atual[1]
+        if atual[0] != versao:
+            self._agendar(versao)
+        return atual[1]
+
+    def _em_segundo_plano(self):
+        return getattr(settings, 'BUSCA_CONFIG', {}).get('RECONSTRUIR_EM_SEGUNDO_PLANO', True)
+
+    def _carregar(self, versao):
+        estrutura = self._construir()
+        self._atual = (versao, estrutura)
+        logger.info(f"{self.nome} carregado (v{versao}): {self._descrever(estrutura)}")
+
+    def _agendar(self, versao):
+        with self._lock:
+            # Após um fork, a thread do processo pai não existe aqui
+            if self._reconstruindo == os.getpid():
+                return
+            self._reconstruindo = os.getpid()
+        threading.Thread(target=self._reconstruir, args=(versao,), name=f'busca-{self.nome}', daemon=True).start()
+
+    def _reconstruir(self, versao):
+        try:
+            self._carregar(versao)
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir {self.nome} (v{versao}): {str(e)}")
+        finally:
+            self._reconstruindo = None
+            connections.close_all()
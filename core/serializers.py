@@ -2,7 +2,32 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.db import models
-from .models import User, Produto, Pedido, ItemPedido, StatusPedido, Pagamento, Envio, ImagemProduto
+from django.db.models import Prefetch
+from .services.rastreio import span
+from .models import User, Produto, Pedido, ItemPedido, StatusPedido, Pagamento, Envio, ImagemProduto, Avaliacao, MidiaAvaliacao, DerivadoImagem
+
+
+def campos_solicitados(request):
+    """Campos pedidos em `?fields=id,nome,preco` (None = todos)"""
+    if request is None or not hasattr(request, 'query_params'):
+        return None
+    param = request.query_params.get('fields', '')
+    campos = [c.strip() for c in param.split(',') if c.strip()]
+    return campos or None
+
+
+class CamposDinamicosMixin:
+    """Sparse fieldsets: em leituras, `?fields=` limita os campos serializados"""
+
+    def __init__(self, *args, **kwargs):
+        campos = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if campos is None and request is not None and request.method in ('GET', 'HEAD'):
+            campos = campos_solicitados(request)
+        if campos:
+            for nome in set(self.fields) - set(campos):
+                self.fields.pop(nome)
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,78 +60,232 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         return user
 
+class AvaliacaoResumoListSerializer(serializers.ListSerializer):
+    """Carrega as estatísticas de avaliação da página inteira de uma vez (stats_for_products)"""
+
+    def to_representation(self, data):
+        itens = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'avaliacao' in self.child.fields and itens:
+            self._context['stats_avaliacoes'] = Avaliacao.objects.stats_for_products([p.pk for p in itens])
+        return super().to_representation(itens)
+
+
+class AvaliacaoResumoMixin(serializers.Serializer):
+    """Campo `avaliacao` ({media, total}) para badges de estrelas"""
+    avaliacao = serializers.SerializerMethodField()
+
+    def get_avaliacao(self, obj):
+        stats = self.context.get('stats_avaliacoes', {}).get(obj.pk)
+        if stats is None:
+            stats = Avaliacao.objects.stats_for_product(obj.pk)
+        return {'media': stats['media'], 'total': stats['total']}
+
+
+def imagem_card(obj):
+    """Arquivo exibido no card: Produto.imagem ou, sem ela, a principal da galeria (prefetch)"""
+    if obj.imagem:
+        return obj.imagem
+    principais = getattr(obj, 'imagens_principais', None)
+    return principais[0].imagem if principais else None
+
+
+class SrcsetListSerializer(serializers.ListSerializer):
+    """Carrega os srcset (DerivadoImagem) de todas as imagens da lista em uma query"""
+
+    def to_representation(self, data):
+        itens = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if self.child.campo_srcset in self.child.fields:
+            # Registros do snapshot do catálogo já trazem o srcset
+            nomes = {
+                arquivo.name for arquivo in (
+                    self.child.arquivo_srcset(item) for item in itens if not hasattr(item, 'imagem_srcset')
+                ) if arquivo
+            }
+            # No contexto da raiz: listas aninhadas (galeria de cada produto) também enxergam
+            carregados = self.context.setdefault('srcsets_imagens', {})
+            nomes -= set(carregados)
+            if nomes:
+                encontrados = DerivadoImagem.objects.srcsets(nomes)
+                carregados.update({nome: encontrados.get(nome, {}) for nome in nomes})
+        return super().to_representation(itens)
+
+
+class ProdutoListSerializer(SrcsetListSerializer, AvaliacaoResumoListSerializer):
+    """Listas de produtos: srcset das imagens e estatísticas de avaliação em lote"""
+
+
+class SrcsetMixin(serializers.Serializer):
+    """`srcset` por formato ({'avif': 'url 320w, ...', 'webp': ..., 'jpeg': ...}) da imagem do objeto"""
+    campo_srcset = 'srcset'
+
+    def arquivo_srcset(self, obj):
+        return obj.imagem or None
+
+    def srcset_de(self, obj):
+        srcset = getattr(obj, 'imagem_srcset', None)
+        if srcset is not None:
+            return srcset
+        arquivo = self.arquivo_srcset(obj)
+        if not arquivo:
+            return {}
+        srcsets = self.context.get('srcsets_imagens', {})
+        if arquivo.name not in srcsets:
+            return DerivadoImagem.objects.srcsets([arquivo.name]).get(arquivo.name, {})
+        return srcsets[arquivo.name]
+
+
+class AvaliacaoPublicaSerializer(serializers.ModelSerializer):
+    """Avaliação aprovada como exibida na página do produto (lista paginada e /pagina/)"""
+    usuario_nome = serializers.SerializerMethodField()
+    usuario_iniciais = serializers.SerializerMethodField()
+    publicado_em = serializers.SerializerMethodField()
+    midias = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Avaliacao
+        fields = [
+            'id', 'usuario_nome', 'usuario_iniciais', 'nota_geral', 'titulo', 'comentario',
+            'melhor_ponto', 'pior_ponto', 'tempo_de_uso', 'recomendaria',
+            'likes', 'dislikes', 'util', 'nao_util', 'publicado_em', 'midias',
+        ]
+
+    @staticmethod
+    def otimizar_queryset(queryset):
+        """Usuário no JOIN e só as mídias aprovadas em um único prefetch"""
+        return queryset.select_related('usuario').prefetch_related(Prefetch(
+            'midias', queryset=MidiaAvaliacao.objects.filter(aprovado=True), to_attr='midias_aprovadas'
+        ))
+
+    def get_usuario_nome(self, obj):
+        return obj.usuario.full_name.strip() or obj.usuario.email.split('@')[0]
+
+    def get_usuario_iniciais(self, obj):
+        return ''.join(n[0] for n in (obj.usuario.full_name.strip() or 'U').split()[:2]).upper()
+
+    def get_publicado_em(self, obj):
+        # Data absoluta (ISO): o corpo vai para cache, um "há 2 minutos" envelheceria lá
+        return (obj.publicado_em or obj.created_at).isoformat()
+
+    def get_midias(self, obj):
+        midias = getattr(obj, 'midias_aprovadas', None)
+        if midias is None:
+            midias = obj.midias.aprovadas()
+        return [
+            {
+                'id': m.id,
+                'arquivo': m.arquivo.url,
+                'thumbnail': m.thumbnail.url if m.thumbnail else m.arquivo.url,
+                'tipo': m.tipo,
+                'legenda': m.legenda,
+            }
+            for m in midias
+        ]
+
+
 # ==================== SERIALIZERS PARA IMAGEMPRODUTO ====================
 
-class ImagemProdutoSerializer(serializers.ModelSerializer):
+class ImagemProdutoSerializer(SrcsetMixin, serializers.ModelSerializer):
     imagem_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = ImagemProduto
-        fields = ['id', 'produto', 'imagem', 'imagem_url', 'ordem', 'legenda', 'is_principal']  # ✅ ADICIONE 'produto'
+        fields = ['id', 'produto', 'imagem', 'imagem_url', 'srcset', 'ordem', 'legenda', 'is_principal']  # ✅ ADICIONE 'produto'
         read_only_fields = ['id']  # ✅ ADICIONE ESTA LINHA
+        list_serializer_class = SrcsetListSerializer
     
     def get_imagem_url(self, obj):
         if obj.imagem and hasattr(obj.imagem, 'url'):
             return obj.imagem.url
         return None
+
+    def get_srcset(self, obj):
+        return self.srcset_de(obj)
     
     def create(self, validated_data):
-        """Override para debug e garantir que produto seja salvo"""
-        print(f"🔍 SERIALIZER CREATE: Dados validados: {validated_data}")
-        try:
+        with span('serializer.imagem_produto.create', produto=validated_data['produto'].pk):
             return super().create(validated_data)
-        except Exception as e:
-            print(f"❌ SERIALIZER CREATE ERRO: {e}")
-            raise
 
 # ==================== SERIALIZERS ATUALIZADOS PARA PRODUTO ====================
 
-class ProdutoSerializer(serializers.ModelSerializer):
+class ProdutoSerializer(CamposDinamicosMixin, AvaliacaoResumoMixin, SrcsetMixin, serializers.ModelSerializer):
     imagem_url = serializers.SerializerMethodField()
+    imagem_srcset = serializers.SerializerMethodField()
     imagens = ImagemProdutoSerializer(many=True, read_only=True)
+    campo_srcset = 'imagem_srcset'
     
     class Meta:
         model = Produto
         fields = '__all__'
+        list_serializer_class = ProdutoListSerializer
     
     def get_imagem_url(self, obj):
         if obj.imagem and hasattr(obj.imagem, 'url'):
             return obj.imagem.url
         return None
+
+    def get_imagem_srcset(self, obj):
+        return self.srcset_de(obj)
     
     def update(self, instance, validated_data):
         if 'imagem' not in self.context['request'].FILES:
             validated_data.pop('imagem', None)
         return super().update(instance, validated_data)
 
+class ProdutoCardSerializer(CamposDinamicosMixin, AvaliacaoResumoMixin, SrcsetMixin, serializers.ModelSerializer):
+    """Serializer leve para listagens (cards): sem descrição e sem galeria"""
+    imagem_url = serializers.SerializerMethodField()
+    imagem_srcset = serializers.SerializerMethodField()
+    campo_srcset = 'imagem_srcset'
+
+    class Meta:
+        model = Produto
+        fields = ['id', 'nome', 'sku', 'preco', 'categoria', 'status', 'estoque', 'imagem_url', 'imagem_srcset', 'avaliacao']
+        list_serializer_class = ProdutoListSerializer
+
+    def get_imagem_url(self, obj):
+        # Sem imagem no produto: usa a principal da galeria (prefetch em otimizar_queryset)
+        arquivo = imagem_card(obj)
+        return arquivo.url if arquivo else None
+
+    def arquivo_srcset(self, obj):
+        return imagem_card(obj)
+
+    def get_imagem_srcset(self, obj):
+        return self.srcset_de(obj)
+
+    @classmethod
+    def otimizar_queryset(cls, queryset, request=None):
+        """
+        Carrega só as colunas dos campos pedidos e, se houver `imagem_url`/`imagem_srcset`,
+        apenas a imagem principal da galeria (1 query para a página inteira).
+        """
+        campos = set(campos_solicitados(request) or cls.Meta.fields) & set(cls.Meta.fields)
+        colunas = {'id'} | (campos - {'imagem_url', 'imagem_srcset', 'avaliacao'})
+        if campos & {'imagem_url', 'imagem_srcset'}:
+            colunas.add('imagem')
+            queryset = queryset.prefetch_related(Prefetch(
+                'imagens',
+                queryset=ImagemProduto.objects.filter(is_principal=True).only('id', 'produto_id', 'imagem'),
+                to_attr='imagens_principais',
+            ))
+        return queryset.only(*colunas)
+
 class ProdutoDetailSerializer(ProdutoSerializer):
     """Serializer extendido para detalhes do produto com galeria completa"""
     galeria_imagens = serializers.SerializerMethodField()
     
     class Meta(ProdutoSerializer.Meta):
         fields = [
-            'id', 'nome', 'sku', 'descricao', 'preco', 'imagem', 'imagem_url',
+            'id', 'nome', 'sku', 'descricao', 'preco', 'imagem', 'imagem_url', 'imagem_srcset',
             'estoque', 'categoria', 'status', 'peso', 'altura', 'largura', 
-            'comprimento', 'data_criacao', 'imagens', 'galeria_imagens'
+            'comprimento', 'data_criacao', 'imagens', 'galeria_imagens', 'avaliacao'
         ]
     
     def get_galeria_imagens(self, obj):
         """Retorna todas as imagens ordenadas da galeria"""
-        print(f"🔍 SERIALIZER DEBUG: Buscando galeria para produto {obj.id}")
-        
-        # Chama o método de debug do modelo
-        imagens = obj.get_galeria_imagens()
-        
-        print(f"🔍 SERIALIZER DEBUG: {len(imagens)} imagens serão serializadas")
-        
-        serializer_data = ImagemProdutoSerializer(imagens, many=True, context=self.context).data
-        print(f"🔍 SERIALIZER DEBUG: Dados serializados: {len(serializer_data)} itens")
-        
-        # Debug detalhado de cada imagem serializada
-        for i, img_data in enumerate(serializer_data):
-            print(f"🔍 SERIALIZER DEBUG: Imagem {i}: id={img_data.get('id')}, ordem={img_data.get('ordem')}, url={img_data.get('imagem_url')}")
-        
-        return serializer_data
+        with span('serializer.galeria_imagens', produto=obj.pk):
+            return ImagemProdutoSerializer(obj.get_galeria_imagens(), many=True, context=self.context).data
 
 # ==================== NOVOS SERIALIZERS PARA PEDIDOS ====================
 
@@ -0,0 +1,361 @@
+# core/services/cache_local.py
+"""
+Backend de cache em duas camadas: LRU/TTL no processo na frente do Redis.
+
+    CACHES = {'default': {'BACKEND': 'core.services.cache_local.CacheDuasCamadas', ...}}
+
+Só as chaves declaradas com `local=True` no registro (core.services.chaves:
+quentes e lidas muito mais do que escritas, como estatísticas de avaliação,
+páginas/contextos de produto e fragmentos de template) passam pela camada
+local; contadores (inclusive os de versão), debounce e travas (`<chave>:trava`)
+vão sempre direto ao Redis. Como as chaves locais levam a versão no nome, um
+INCR já as tira de uso em todos os processos, sem depender do pub/sub. CACHE_LOCAL_CONFIG['PREFIXOS'] substitui a lista.
+
+Coerência: toda escrita dessas chaves (set, add, delete, incr...) vai ao Redis
+e publica as chaves em um canal pub/sub; cada processo tem uma thread ouvindo
+o canal e descartando as cópias locais. A camada local só é usada enquanto a
+inscrição no canal está ativa (caiu a conexão: esvazia e lê só do Redis), e
+cada cópia vale no máximo TTL_LOCAL segundos, o que limita o atraso se uma
+mensagem se perder ou se a chave expirar sozinha no Redis.
+
+As cópias locais são guardadas serializadas (pickle), como no Redis: quem lê
+recebe um objeto novo e não consegue alterar o valor dos outros.
+
+Métricas por prefixo (acertos locais, acertos no Redis, misses) em
+`cache.metricas()`, visíveis aos admins em /admin-panel/cache/.
+
+O Django cria uma instância do backend por thread; camada, métricas e a
+thread ouvinte ficam em um EstadoProcesso único por processo, compartilhado
+por todas elas (uma conexão pub/sub por processo, não por thread).
+"""
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+
+from core.services.chaves import prefixos_locais
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_PADRAO = {
+    'PREFIXOS': None,           # None: chaves `local` de core.services.chaves
+    'MAX_ITENS': 5000,          # entradas por processo (LRU)
+    'TTL_LOCAL': 10,            # segundos; teto de atraso se uma invalidação se perder
+    'CANAL': 'cache_local_invalidacao',
+}
+
+TODAS = '*'
+_AUSENTE = object()
+_PREFIXO_METRICA = re.compile(r'[^\d:]*')
+
+
+def config(chave):
+    return getattr(settings, 'CACHE_LOCAL_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+class CamadaLocal:
+    """LRU com TTL, segura entre threads; valores guardados já serializados."""
+
+    def __init__(self, max_itens, ttl):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: uma leitura do Redis que começou
+        # antes dela não pode repovoar a camada com o valor antigo
+        self.geracao = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return _AUSENTE
+            expira_em, dados = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                return _AUSENTE
+            self._itens.move_to_end(chave)
+        return pickle.loads(dados)
+
+    def guardar(self, chave, valor, geracao):
+        dados = pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if geracao != self.geracao:
+                return
+            self._itens[chave] = (time.monotonic() + self.ttl, dados)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def descartar(self, chaves):
+        with self._lock:
+            self.geracao += 1
+            if chaves == TODAS:
+                self._itens.clear()
+                return
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class Metricas:
+    """Contadores por prefixo de chave (acertos locais / no Redis / misses)."""
+
+    def __init__(self, prefixos):
+        self._prefixos = prefixos
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def prefixo(self, chave):
+        for prefixo in self._prefixos:
+            if chave.startswith(prefixo):
+                return prefixo
+        return _PREFIXO_METRICA.match(chave).group() or chave
+
+    def contar(self, chave, resultado):
+        prefixo = self.prefixo(chave)
+        with self._lock:
+            contadores = self._contadores.get(prefixo)
+            if contadores is None:
+                contadores = self._contadores[prefixo] = {'local': 0, 'redis': 0, 'miss': 0}
+            contadores[resultado] += 1
+
+    def resumo(self):
+        with self._lock:
+            copia = {p: dict(c) for p, c in self._contadores.items()}
+        for contadores in copia.values():
+            leituras = contadores['local'] + contadores['redis'] + contadores['miss']
+            contadores['taxa_local'] = round(contadores['local'] / leituras, 4) if leituras else 0.0
+            contadores['taxa_acerto'] = round((leituras - contadores['miss']) / leituras, 4) if leituras else 0.0
+        return copia
+
+    def zerar(self):
+        with self._lock:
+            self._contadores.clear()
+
+
+class EstadoProcesso:
+    """
+    Camada local, métricas e ouvinte pub/sub de um processo. O Django cria uma
+    instância do backend por thread (`caches` é thread-local); todas as
+    instâncias do processo compartilham este estado: uma cópia local, uma
+    contagem e uma única thread/conexão inscrita no canal.
+    """
+
+    def __init__(self, canal, prefixos, obter_cliente):
+        self.pid = os.getpid()
+        self.canal = canal
+        self.camada = CamadaLocal(config('MAX_ITENS'), config('TTL_LOCAL'))
+        self.metricas = Metricas(prefixos)
+        self.inscrito = threading.Event()
+        self._obter_cliente = obter_cliente
+        self._ouvinte = None
+        self._lock = threading.Lock()
+
+    def iniciar_ouvinte(self):
+        if self._ouvinte is not None:
+            return
+        with self._lock:
+            if self._ouvinte is None:
+                self._ouvinte = threading.Thread(target=self._escutar, name='cache-local-invalidacao', daemon=True)
+                self._ouvinte.start()
+
+    def _escutar(self):
+        espera = 1
+        while True:
+            try:
+                pubsub = self._obter_cliente().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.canal)
+                self.inscrito.set()
+                espera = 1
+                while True:
+                    mensagem = pubsub.get_message(timeout=1.0)
+                    if mensagem and mensagem['type'] == 'message':
+                        chaves = json.loads(mensagem['data'])
+                        self.camada.descartar(TODAS if chaves == TODAS else chaves)
+            except Exception as e:
+                if self.inscrito.is_set():
+                    logger.warning(f"Cache local: inscrição em {self.canal} perdida ({str(e)}); usando só o Redis")
+                self.inscrito.clear()
+                self.camada.descartar(TODAS)
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+
+_ESTADOS = {}
+_ESTADOS_LOCK = threading.Lock()
+
+
+def estado_do_processo(chave, criar):
+    """Estado compartilhado de `chave` neste processo; recriado após um fork (a thread do pai não existe aqui)."""
+    with _ESTADOS_LOCK:
+        estado = _ESTADOS.get(chave)
+        if estado is None or estado.pid != os.getpid():
+            estado = _ESTADOS[chave] = criar()
+        return estado
+
+
+class CacheDuasCamadas(RedisCache):
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._prefixos = tuple(config('PREFIXOS') or prefixos_locais())
+        self._canal = config('CANAL')
+        self._chave_estado = (self._canal, repr(server))
+        self._estado = None
+
+    # ---------- invalidação (pub/sub) ----------
+    def _compartilhado(self):
+        estado = self._estado
+        if estado is None or estado.pid != os.getpid():
+            estado = self._estado = estado_do_processo(
+                self._chave_estado,
+                lambda: EstadoProcesso(self._canal, self._prefixos, lambda: self.client.get_client(write=True)),
+            )
+        return estado
+
+    def _local(self, key):
+        return isinstance(key, str) and key.startswith(self._prefixos) and ':' not in key
+
+    def _ativa(self):
+        """Camada local utilizável (ouvinte do processo inscrito)."""
+        estado = self._compartilhado()
+        estado.iniciar_ouvinte()
+        return estado.inscrito.is_set()
+
+    def _invalidar(self, keys, version=None):
+        chaves = [self.make_key(k, version) for k in keys if self._local(k)]
+        if chaves:
+            self._publicar(chaves)
+
+    def _publicar(self, chaves):
+        self._compartilhado().camada.descartar(chaves)
+        try:
+            self.client.get_client(write=True).publish(self._canal, json.dumps(chaves))
+        except Exception as e:
+            logger.warning(f"Cache local: falha ao publicar invalidação: {str(e)}")
+
+    # ---------- leitura ----------
+    def get(self, key, default=None, version=None, client=None):
+        estado = self._compartilhado()
+        if not self._local(key) or client is not None or not self._ativa():
+            valor = super().get(key, _AUSENTE, version=version, client=client)
+            estado.metricas.contar(key, 'miss' if valor is _AUSENTE else 'redis')
+            return default if valor is _AUSENTE else valor
+
+        chave = self.make_key(key, version)
+        valor = estado.camada.obter(chave)
+        if valor is not _AUSENTE:
+            estado.metricas.contar(key, 'local')
+            return valor
+        geracao = estado.camada.geracao
+        valor = super().get(key, _AUSENTE, version=version)
+        if valor is _AUSENTE:
+            estado.metricas.contar(key, 'miss')
+            return default
+        estado.metricas.contar(key, 'redis')
+        estado.camada.guardar(chave, valor, geracao)
+        return valor
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        estado = self._compartilhado()
+        resultado, faltando = {}, []
+        ativa = client is None and self._ativa()
+        for key in keys:
+            valor = estado.camada.obter(self.make_key(key, version)) if ativa and self._local(key) else _AUSENTE
+            if valor is _AUSENTE:
+                faltando.append(key)
+            else:
+                estado.metricas.contar(key, 'local')
+                resultado[key] = valor
+        if not faltando:
+            return resultado
+
+        geracao = estado.camada.geracao
+        do_redis = super().get_many(faltando, version=version, client=client)
+        for key in faltando:
+            if key not in do_redis:
+                estado.metricas.contar(key, 'miss')
+                continue
+            estado.metricas.contar(key, 'redis')
+            if ativa and self._local(key):
+                estado.camada.guardar(self.make_key(key, version), do_redis[key], geracao)
+        resultado.update(do_redis)
+        return resultado
+
+    # ---------- escrita: Redis + invalidação ----------
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, nx=False, xx=False):
+        retorno = super().set(key, value, timeout=timeout, version=version, client=client, nx=nx, xx=xx)
+        self._invalidar([key], version)
+        return retorno
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        retorno = super().add(key, value, timeout=timeout, version=version, client=client)
+        if retorno:
+            self._invalidar([key], version)
+        return retorno
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        retorno = super().set_many(data, timeout=timeout, version=version, client=client)
+        self._invalidar(list(data), version)
+        return retorno
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        retorno = super().delete(key, version=version, prefix=prefix, client=client)
+        self._invalidar([key], version)
+        return retorno
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        retorno = super().delete_many(keys, version=version)
+        self._invalidar(keys, version)
+        return retorno
+
+    def incr(self, key, delta=1, version=None, client=None, ignore_key_check=False):
+        retorno = super().incr(key, delta=delta, version=version, client=client, ignore_key_check=ignore_key_check)
+        self._invalidar([key], version)
+        return retorno
+
+    def decr(self, key, delta=1, version=None, client=None):
+        retorno = super().decr(key, delta=delta, version=version, client=client)
+        self._invalidar([key], version)
+        return retorno
+
+    def delete_pattern(self, *args, **kwargs):
+        retorno = super().delete_pattern(*args, **kwargs)
+        self._publicar(TODAS)
+        return retorno
+
+    def incr_version(self, *args, **kwargs):
+        retorno = super().incr_version(*args, **kwargs)
+        self._publicar(TODAS)
+        return retorno
+
+    def clear(self):
+        retorno = super().clear()
+        self._publicar(TODAS)
+        return retorno
+
+    # ---------- métricas ----------
+    def metricas(self):
+        estado = self._compartilhado()
+        return {
+            'pid': os.getpid(),
+            'camada_local_ativa': estado.inscrito.is_set(),
+            'itens_locais': len(estado.camada),
+            'prefixos': estado.metricas.resumo(),
+        }
+
+    def zerar_metricas(self):
+        self._compartilhado().metricas.zerar()
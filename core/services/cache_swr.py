@@ -0,0 +1,171 @@
+# core/services/cache_swr.py
+"""
+Cache com expiração suave (stale-while-revalidate) e proteção contra estouro.
+
+Cada entrada guarda (valor, expira_em, custo): `expira_em` é a validade
+"suave" (o ttl pedido) e a chave só some do cache depois de uma janela
+extra (ttl * FATOR_OBSOLETO). Entre as duas, o valor antigo continua sendo
+servido enquanto UM processo recalcula: quem consegue a trava (cache.add,
+SETNX no Redis) recalcula; os demais devolvem o valor obsoleto na hora.
+
+Para a chave nem chegar a ficar obsoleta sob carga, o recálculo pode ser
+antecipado de forma probabilística (XFetch): quanto mais perto de expirar e
+mais caro o cálculo (`custo`), maior a chance de uma requisição renovar antes.
+
+Invalidar não apaga nada: as chaves vêm do registro (core.services.chaves)
+com a versão dos escopos no nome, e incrementar a versão (signals, ou
+chaves.invalidar_produto) faz a próxima leitura procurar uma chave nova. Sem
+valor nessa chave, ela recalcula (e as concorrentes esperam a trava por até
+ESPERA_MAX); a entrada antiga expira sozinha.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_PADRAO = {
+    'FATOR_OBSOLETO': 4,        # a chave vive ttl * (1 + fator); o excedente é servido obsoleto
+    'BETA': 1.0,                # agressividade do recálculo antecipado (0 desliga)
+    'TRAVA_TIMEOUT': 30,        # segundos; libera a trava se o processo morrer no meio
+    'ESPERA_MAX': 2.0,          # miss com trava alheia: espera o valor por até N segundos
+    'ESPERA_INTERVALO': 0.05,
+    'TTL_NEGATIVO': 60,         # teto de validade para None (produto inexistente/inativo)
+}
+
+
+def config(chave):
+    return getattr(settings, 'CACHE_SWR_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+def _trava(chave):
+    return f'{chave}:trava'
+
+
+def _envelope(valor, ttl, custo):
+    return (valor, time.time() + ttl, custo)
+
+
+def _timeout(ttl):
+    return int(ttl * (1 + config('FATOR_OBSOLETO')))
+
+
+def _obsoleto(envelope):
+    """Expirou, ou foi sorteado para recálculo antecipado."""
+    _, expira_em, custo = envelope
+    agora = time.time()
+    beta = config('BETA')
+    if beta and custo:
+        # 1 - random() ∈ (0, 1]: evita log(0)
+        agora -= custo * beta * math.log(1 - random.random())
+    return agora >= expira_em
+
+
+def gravar(chave, valor, ttl, custo=0):
+    cache.set(chave, _envelope(valor, ttl, custo), _timeout(ttl))
+
+
+def gravar_muitos(valores, ttl, custo=0):
+    """{chave: valor} com um set_many."""
+    cache.set_many({c: _envelope(v, ttl, custo) for c, v in valores.items()}, _timeout(ttl))
+
+
+def _ttl_valor(valor, ttl):
+    return ttl if valor is not None else min(ttl, config('TTL_NEGATIVO'))
+
+
+def _calcular(chave, calcular, ttl):
+    inicio = time.perf_counter()
+    valor = calcular()
+    # None também é guardado: quem espera a trava não fica preso a um miss sem fim
+    gravar(chave, valor, _ttl_valor(valor, ttl), time.perf_counter() - inicio)
+    return valor
+
+
+def obter(chave, calcular, ttl):
+    """
+    Valor em cache de `chave`, ou `calcular()` (guardado por `ttl` segundos
+    de validade suave). None também é guardado, por no máximo TTL_NEGATIVO.
+    """
+    envelope = cache.get(chave)
+    if envelope is not None and not _obsoleto(envelope):
+        return envelope[0]
+
+    trava = _trava(chave)
+    if cache.add(trava, 1, config('TRAVA_TIMEOUT')):
+        try:
+            return _calcular(chave, calcular, ttl)
+        finally:
+            cache.delete(trava)
+
+    if envelope is not None:
+        # Outro processo já está recalculando: serve o valor obsoleto
+        return envelope[0]
+
+    # Miss com trava alheia: espera o valor em vez de recalcular junto
+    limite = time.monotonic() + config('ESPERA_MAX')
+    while time.monotonic() < limite:
+        time.sleep(config('ESPERA_INTERVALO'))
+        lidos = cache.get_many([chave, trava])
+        if chave in lidos:
+            return lidos[chave][0]
+        if trava not in lidos:
+            # Trava liberada sem valor (o cálculo falhou): não adianta esperar
+            break
+    else:
+        logger.warning(f"Cache {chave}: trava não liberada em {config('ESPERA_MAX')}s, recalculando")
+    return _calcular(chave, calcular, ttl)
+
+
+def _trava_lote(chaves):
+    """Uma trava para o conjunto de chaves (listagens iguais disputam a mesma)."""
+    resumo = hashlib.md5('|'.join(sorted(chaves)).encode()).hexdigest()
+    return f'cache_swr_lote:{resumo}:trava'
+
+
+def obter_muitos(chaves, calcular_lote, ttl):
+    """
+    Versão em lote: `chaves` é {chave: id}; `calcular_lote(ids)` devolve
+    {id: valor}. Um get_many e, se algo faltar ou estiver obsoleto, uma única
+    trava para o lote: com ela, misses e obsoletos são recalculados juntos em
+    uma chamada; sem ela, os obsoletos são servidos e só os misses são
+    recalculados (sem esperar: já é uma só chamada para o lote). Retorna
+    {id: valor}.
+    """
+    envelopes = cache.get_many(list(chaves))
+    resultado, pendentes = {}, []
+    for chave, id_ in chaves.items():
+        envelope = envelopes.get(chave)
+        if envelope is not None and not _obsoleto(envelope):
+            resultado[id_] = envelope[0]
+        else:
+            pendentes.append(chave)
+    if not pendentes:
+        return resultado
+
+    trava = _trava_lote(pendentes)
+    travado = cache.add(trava, 1, config('TRAVA_TIMEOUT'))
+    recalcular = []
+    for chave in pendentes:
+        if travado or chave not in envelopes:
+            recalcular.append(chave)
+        else:
+            # Outro processo já está recalculando este lote: serve o obsoleto
+            resultado[chaves[chave]] = envelopes[chave][0]
+
+    try:
+        if recalcular:
+            inicio = time.perf_counter()
+            novos = calcular_lote([chaves[c] for c in recalcular])
+            custo = time.perf_counter() - inicio
+            gravar_muitos({c: novos[chaves[c]] for c in recalcular if novos.get(chaves[c]) is not None}, ttl, custo)
+            resultado.update(novos)
+    finally:
+        if travado:
+            cache.delete(trava)
+    return resultado
@@ -0,0 +1,81 @@
+# core/services/carrinho_resumo.py
+"""
+Resumo do carrinho (subtotal, nº de itens, peso e dimensões) em uma passada.
+
+As linhas vêm de uma única query (itens do carrinho com preço e medidas do
+produto, via values()) ou dos itens já carregados para a tela; o resumo é
+calculado em Python sobre elas e guardado pelo carrinho (core.services.
+carrinho_store) até a próxima alteração, então todas as leituras de um
+request (totais, JSON, frete) usam o mesmo objeto.
+"""
+from decimal import Decimal
+
+# Medidas assumidas quando o produto não tem cadastro (as mesmas da cotação de frete)
+PESO_PADRAO = 0.1           # kg
+DIMENSAO_PADRAO = 1         # cm
+
+CAMPOS_PRODUTO = ('peso', 'altura', 'largura', 'comprimento')
+
+
+class ResumoCarrinho:
+    __slots__ = (
+        'subtotal', 'total_itens', 'peso_total', 'volume_total',
+        'altura_total', 'largura_max', 'comprimento_max', 'itens_frete', 'subtotais',
+    )
+
+    def __init__(self, linhas):
+        """`linhas`: (item_id, quantidade, preco_unitario, peso, altura, largura, comprimento)."""
+        self.subtotal = Decimal('0')
+        self.total_itens = 0
+        self.peso_total = 0.0
+        self.volume_total = 0.0
+        self.altura_total = 0.0      # itens empilhados
+        self.largura_max = 0.0
+        self.comprimento_max = 0.0
+        self.itens_frete = []
+        self.subtotais = {}         # item_id -> subtotal
+
+        for item_id, quantidade, preco, peso, altura, largura, comprimento in linhas:
+            peso = float(peso or PESO_PADRAO)
+            altura = float(altura or DIMENSAO_PADRAO)
+            largura = float(largura or DIMENSAO_PADRAO)
+            comprimento = float(comprimento or DIMENSAO_PADRAO)
+
+            self.subtotais[item_id] = quantidade * preco
+            self.subtotal += self.subtotais[item_id]
+            self.total_itens += quantidade
+            self.peso_total += quantidade * peso
+            self.volume_total += quantidade * altura * largura * comprimento
+            self.altura_total += quantidade * altura
+            self.largura_max = max(self.largura_max, largura)
+            self.comprimento_max = max(self.comprimento_max, comprimento)
+            # Formato de ShippingService.calcular_frete
+            self.itens_frete.append({
+                'quantidade': quantidade,
+                'peso': peso,
+                'altura': altura,
+                'largura': largura,
+                'comprimento': comprimento,
+                'valor': float(preco),
+            })
+
+    @classmethod
+    def dos_itens(cls, itens):
+        """A partir de itens já carregados (ItemCarrinho/ItemAnonimo com `produto`), sem query."""
+        return cls(
+            (item.id, item.quantidade, item.preco_unitario, *(getattr(item.produto, c) for c in CAMPOS_PRODUTO))
+            for item in itens
+        )
+
+    def como_dict(self):
+        return {
+            'subtotal': float(self.subtotal),
+            'total_itens': self.total_itens,
+            'peso_total': round(self.peso_total, 3),
+            'volume_total': round(self.volume_total, 1),
+            'dimensoes': {
+                'altura': round(self.altura_total, 1),
+                'largura': round(self.largura_max, 1),
+                'comprimento': round(self.comprimento_max, 1),
+            },
+        }
@@ -0,0 +1,643 @@
+# core/services/carrinho_store.py
+"""
+Armazenamento do carrinho, com a mesma interface para usuário logado e visitante.
+
+    carrinho = carrinho_store.do_request(request)
+    carrinho.adicionar(produto_id)
+    carrinho.itens(), carrinho.resumo(), carrinho.total_itens, carrinho.total_preco
+
+- Usuário logado: Carrinho/ItemCarrinho no banco (CarrinhoBanco); a linha do
+  carrinho só é criada na primeira escrita, leituras não criam nada.
+- Visitante: nada no banco. O carrinho é um hash no Redis (produto_id ->
+  quantidade) com TTL renovado a cada escrita (CarrinhoRedis); a chave da
+  sessão só é criada na primeira escrita, então bots e visitas de passagem
+  não deixam rastro. Vira Carrinho/ItemCarrinho no login (a compra exige
+  login), em `mesclar_no_login`. O preço de um item anônimo é o preço atual
+  do produto.
+
+CARRINHO_CONFIG['ARMAZENAMENTO_ANONIMO'] escolhe o armazenamento anônimo:
+'redis' (hash, operações atômicas) ou 'cache' (um dict no cache do Django,
+para ambientes sem Redis).
+
+Itens e resumo (core.services.carrinho_resumo) são carregados uma vez por
+instância e descartados a cada alteração: um request que lê totais, JSON e
+frete faz uma única query de leitura.
+
+Alterações no banco são um UPDATE condicional com a checagem de estoque no
+mesmo comando (quantidade + n <= estoque, via F() e subquery do produto):
+cliques simultâneos não perdem incrementos nem passam do estoque, e o caminho
+comum de "adicionar" é o UPDATE mais a leitura do resumo. Sem join no UPDATE,
+o banco reavalia a condição na linha travada por quem chegou antes.
+
+`aplicar_lote(operacoes)` aplica várias alterações de uma vez (a tela do
+carrinho manda todas em /api/carrinho/batch/): calcula o resultado em
+memória, confere o estoque de tudo o que mudou e grava com um bulk_create,
+um bulk_update e um delete na mesma transação (ou um pipeline no Redis).
+Tudo ou nada: uma operação inválida descarta o lote inteiro.
+
+Os itens anônimos usam o id do produto como id do item: as rotas
+/remover_carrinho/<item_id>/ e /alterar-quantidade/<item_id>/ recebem o `id`
+que o próprio carrinho devolveu em itens().
+"""
+import logging
+import uuid
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, PositiveIntegerField, Subquery, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from core.models import Carrinho, ItemCarrinho, Produto
+from core.services import chaves
+from core.services.carrinho_resumo import CAMPOS_PRODUTO, ResumoCarrinho
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_PADRAO = {
+    'ARMAZENAMENTO_ANONIMO': 'redis',
+    'LOTE_MAX': 50,             # operações por chamada de aplicar_lote
+}
+
+OPERACOES = ('adicionar', 'quantidade', 'remover')
+
+SESSAO_CHAVE = 'carrinho_sessao'
+
+
+def config(chave):
+    return getattr(settings, 'CARRINHO_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+class CarrinhoErro(Exception):
+    """Operação recusada (produto inexistente, sem estoque, item de outro carrinho)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _inteiro(valor, indice, campo, minimo):
+    if isinstance(valor, bool):
+        valor = None
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise CarrinhoErro(f'Operação {indice}: {campo} inválido')
+    if valor < minimo:
+        raise CarrinhoErro(f'Operação {indice}: {campo} deve ser pelo menos {minimo}')
+    return valor
+
+
+def normalizar_operacoes(operacoes):
+    """
+    Valida o lote vindo do cliente:
+        [{'op': 'adicionar', 'produto_id': 5, 'quantidade': 1},
+         {'op': 'quantidade', 'item_id': 3, 'quantidade': 2},   # 0 remove
+         {'op': 'remover', 'item_id': 4}]
+    """
+    if not isinstance(operacoes, list) or not operacoes:
+        raise CarrinhoErro('Informe uma lista de operações')
+    if len(operacoes) > config('LOTE_MAX'):
+        raise CarrinhoErro(f"Máximo de {config('LOTE_MAX')} operações por lote")
+
+    normalizadas = []
+    for indice, operacao in enumerate(operacoes):
+        if not isinstance(operacao, dict) or operacao.get('op') not in OPERACOES:
+            raise CarrinhoErro(f"Operação {indice}: 'op' deve ser um de {', '.join(OPERACOES)}")
+        op = operacao['op']
+        if op == 'adicionar':
+            normalizadas.append({
+                'op': op,
+                'produto_id': _inteiro(operacao.get('produto_id'), indice, 'produto_id', 1),
+                'quantidade': _inteiro(operacao.get('quantidade', 1), indice, 'quantidade', 1),
+            })
+        else:
+            normalizada = {'op': op, 'item_id': _inteiro(operacao.get('item_id'), indice, 'item_id', 1)}
+            if op == 'quantidade':
+                normalizada['quantidade'] = _inteiro(operacao.get('quantidade'), indice, 'quantidade', 0)
+            normalizadas.append(normalizada)
+    return normalizadas
+
+
+def _conferir_estoque(alterados, carregados=None):
+    """
+    `alterados`: {produto_id: nova quantidade} (0 = sai do carrinho). Busca os
+    produtos que faltam em `carregados` com uma query e confere o estoque.
+    """
+    produtos = dict(carregados or {})
+    faltando = [pid for pid, quantidade in alterados.items() if quantidade and pid not in produtos]
+    if faltando:
+        produtos.update(Produto.objects.in_bulk(faltando))
+    for produto_id, quantidade in alterados.items():
+        if not quantidade:
+            continue
+        produto = produtos.get(produto_id)
+        if produto is None:
+            raise CarrinhoErro(f'Produto {produto_id} não encontrado', status=404)
+        if quantidade > produto.estoque:
+            raise CarrinhoErro(f'Estoque insuficiente para {produto.nome}. Disponível: {produto.estoque}')
+    return produtos
+
+
+def _produto_para_carrinho(produto_id):
+    produto = Produto.objects.only('id', 'preco', 'estoque').filter(pk=produto_id).first()
+    if produto is None:
+        raise CarrinhoErro('Produto não encontrado', status=404)
+    return produto
+
+
+class _CarrinhoBase:
+    _itens = None
+    _resumo = None
+
+    def _alterado(self):
+        self._itens = self._resumo = None
+
+    @property
+    def total_itens(self):
+        return self.resumo().total_itens
+
+    @property
+    def total_preco(self):
+        return self.resumo().subtotal
+
+    @staticmethod
+    def _planejar(operacoes, atuais):
+        """
+        Aplica as operações em memória. `atuais`: {item_id: (produto_id,
+        quantidade)}; retorna {produto_id: quantidade final} (0 = remover).
+        """
+        produto_do_item = {item_id: produto_id for item_id, (produto_id, _) in atuais.items()}
+        final = dict(atuais.values())
+        for indice, operacao in enumerate(operacoes):
+            if operacao['op'] == 'adicionar':
+                produto_id = operacao['produto_id']
+                final[produto_id] = final.get(produto_id, 0) + operacao['quantidade']
+                continue
+            produto_id = produto_do_item.get(operacao['item_id'])
+            if produto_id is None:
+                raise CarrinhoErro(f"Operação {indice}: item {operacao['item_id']} não encontrado", status=404)
+            final[produto_id] = operacao['quantidade'] if operacao['op'] == 'quantidade' else 0
+        return final
+
+
+# ---------- usuário logado ----------
+class CarrinhoBanco(_CarrinhoBase):
+    anonimo = False
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self._carrinho = None
+
+    @property
+    def carrinho(self):
+        """Carrinho do usuário, ou None se ele nunca adicionou nada (não cria)."""
+        if self._carrinho is None:
+            self._carrinho = Carrinho.objects.filter(usuario=self.usuario).first()
+        return self._carrinho
+
+    def _carrinho_para_escrita(self):
+        if self.carrinho is None:
+            self._carrinho, _ = Carrinho.objects.get_or_create(usuario=self.usuario)
+        return self._carrinho
+
+    def _do_usuario(self):
+        # Pelo join: não precisa buscar o Carrinho antes
+        return ItemCarrinho.objects.filter(carrinho__usuario=self.usuario)
+
+    def _condicional(self, **filtros):
+        """Itens do usuário para UPDATE/DELETE: carrinho e estoque por subquery, sem join."""
+        return ItemCarrinho.objects.filter(
+            carrinho__in=Carrinho.objects.filter(usuario=self.usuario),
+        ).alias(
+            estoque=Subquery(Produto.objects.filter(pk=OuterRef('produto_id')).values('estoque')[:1]),
+        ).filter(**filtros)
+
+    def _incrementar(self, produto_id, quantidade):
+        """Soma `quantidade` ao item se couber no estoque; 0 se o item não existe ou não coube."""
+        return self._condicional(
+            produto_id=produto_id, estoque__gte=F('quantidade') + quantidade,
+        ).update(quantidade=F('quantidade') + quantidade, atualizado_em=timezone.now())
+
+    def itens(self):
+        if self._itens is None:
+            self._itens = list(self._do_usuario().select_related('produto').order_by('id'))
+        return self._itens
+
+    def resumo(self):
+        if self._resumo is None:
+            if self._itens is not None:
+                self._resumo = ResumoCarrinho.dos_itens(self._itens)
+            else:
+                self._resumo = ResumoCarrinho(self._do_usuario().values_list(
+                    'id', 'quantidade', 'preco_unitario', *(f'produto__{c}' for c in CAMPOS_PRODUTO)
+                ))
+        return self._resumo
+
+    def adicionar(self, produto_id, quantidade=1):
+        self._alterado()
+        # Caminho comum (produto já no carrinho): um UPDATE, sem ler o item
+        if self._incrementar(produto_id, quantidade):
+            return
+
+        produto = _produto_para_carrinho(produto_id)
+        if produto.estoque <= 0:
+            raise CarrinhoErro('Produto fora de estoque')
+        if quantidade > produto.estoque:
+            raise CarrinhoErro('Estoque insuficiente')
+        try:
+            with transaction.atomic():
+                ItemCarrinho.objects.create(
+                    carrinho=self._carrinho_para_escrita(),
+                    produto=produto,
+                    preco_unitario=produto.preco,
+                    quantidade=quantidade,
+                )
+        except IntegrityError:
+            # O item já existia (o UPDATE não coube no estoque) ou um clique
+            # simultâneo acabou de criá-lo: tenta o incremento mais uma vez
+            if not self._incrementar(produto_id, quantidade):
+                raise CarrinhoErro('Estoque insuficiente')
+
+    def _item(self, item_id):
+        item = self._do_usuario().select_related('produto').filter(pk=item_id).first()
+        if item is None:
+            raise CarrinhoErro('Item não encontrado', status=200)
+        return item
+
+    def alterar_quantidade(self, item_id, quantidade):
+        """Nova quantidade (< 1 remove); retorna o subtotal do item (do resumo, já atualizado)."""
+        if quantidade < 1:
+            self.remover(item_id)
+            return 0
+        self._alterado()
+        atualizados = self._condicional(pk=item_id, estoque__gte=quantidade).update(
+            quantidade=quantidade, atualizado_em=timezone.now(),
+        )
+        if not atualizados:
+            # Só no erro: descobre se o item não existe ou se faltou estoque
+            item = self._item(item_id)
+            raise CarrinhoErro(f'Estoque insuficiente. Disponível: {item.produto.estoque}', status=200)
+        return self.resumo().subtotais.get(item_id, 0)
+
+    def remover(self, item_id):
+        self._alterado()
+        if not self._condicional(pk=item_id).delete()[0]:
+            raise CarrinhoErro('Item não encontrado', status=200)
+
+    def limpar(self):
+        self._do_usuario().delete()
+        self._alterado()
+
+    def aplicar_lote(self, operacoes):
+        """Operações já normalizadas; número de queries constante. Retorna o resumo."""
+        self._alterado()
+        with transaction.atomic():
+            if any(operacao['op'] == 'adicionar' for operacao in operacoes):
+                carrinho = self._carrinho_para_escrita()
+            else:
+                carrinho = self.carrinho
+            itens = []
+            if carrinho is not None:
+                # Trava as linhas: alterações avulsas simultâneas esperam o lote
+                itens = list(
+                    carrinho.itens.select_related('produto').select_for_update(of=('self',))
+                )
+            por_produto = {item.produto_id: item for item in itens}
+
+            final = self._planejar(operacoes, {item.pk: (item.produto_id, item.quantidade) for item in itens})
+            alterados = {
+                produto_id: quantidade for produto_id, quantidade in final.items()
+                if produto_id not in por_produto or por_produto[produto_id].quantidade != quantidade
+            }
+            produtos = _conferir_estoque(alterados, {item.produto_id: item.produto for item in itens})
+
+            agora = timezone.now()
+            novos, mudados, removidos = [], [], []
+            for produto_id, quantidade in alterados.items():
+                item = por_produto.get(produto_id)
+                if item is None:
+                    produto = produtos[produto_id]
+                    novos.append(ItemCarrinho(
+                        carrinho=carrinho, produto=produto, quantidade=quantidade, preco_unitario=produto.preco,
+                    ))
+                elif quantidade == 0:
+                    removidos.append(item.pk)
+                else:
+                    item.quantidade = quantidade
+                    item.atualizado_em = agora
+                    mudados.append(item)
+
+            if novos:
+                ItemCarrinho.objects.bulk_create(novos)
+            if mudados:
+                ItemCarrinho.objects.bulk_update(mudados, ['quantidade', 'atualizado_em'])
+            if removidos:
+                ItemCarrinho.objects.filter(pk__in=removidos).delete()
+
+        # O resultado já está em memória: o resumo não relê o banco
+        removidos = set(removidos)
+        restantes = [item for item in itens if item.pk not in removidos] + novos
+        self._itens = sorted(restantes, key=lambda item: item.pk)
+        return self.resumo()
+
+
+# ---------- visitante ----------
+class ItemAnonimo:
+    """Item do carrinho anônimo com a forma de ItemCarrinho usada nas telas."""
+    __slots__ = ('id', 'produto', 'quantidade', 'preco_unitario')
+
+    def __init__(self, produto, quantidade):
+        self.id = produto.pk
+        self.produto = produto
+        self.quantidade = quantidade
+        self.preco_unitario = produto.preco
+
+    @property
+    def subtotal(self):
+        return self.quantidade * self.preco_unitario
+
+
+class _CarrinhoAnonimo(_CarrinhoBase, ABC):
+    """Lógica comum; as subclasses guardam {produto_id: quantidade}."""
+    anonimo = True
+
+    def __init__(self, request):
+        self.request = request
+        self.sessao = request.session.get(SESSAO_CHAVE)
+
+    def _chave(self):
+        return chaves.montar('carrinho_sessao', sessao=self.sessao)
+
+    def _sessao_para_escrita(self):
+        if not self.sessao:
+            self.sessao = self.request.session[SESSAO_CHAVE] = str(uuid.uuid4())
+        return self._chave()
+
+    # Armazenamento: implementado pelas subclasses
+    @abstractmethod
+    def quantidades(self):
+        """{produto_id: quantidade} do carrinho."""
+
+    @abstractmethod
+    def _incrementar(self, produto_id, delta):
+        """Soma `delta` à quantidade do produto."""
+
+    @abstractmethod
+    def _definir(self, produto_id, quantidade):
+        """Troca a quantidade do produto."""
+
+    @abstractmethod
+    def _remover(self, produto_id):
+        """Tira o produto do carrinho."""
+
+    @abstractmethod
+    def _gravar_lote(self, alterados):
+        """Grava {produto_id: quantidade} de uma vez; quantidade 0 remove."""
+
+    @abstractmethod
+    def limpar(self):
+        """Esvazia o carrinho."""
+
+    # Interface do carrinho
+    def itens(self):
+        if self._itens is None:
+            quantidades = self.quantidades()
+            produtos = Produto.objects.in_bulk(list(quantidades)) if quantidades else {}
+            for produto_id in set(quantidades) - set(produtos):
+                # Produto apagado depois de entrar no carrinho
+                self._remover(produto_id)
+            self._itens = [ItemAnonimo(produtos[pk], quantidades[pk]) for pk in sorted(produtos)]
+        return self._itens
+
+    def resumo(self):
+        # Preço atual e medidas vêm dos produtos: a mesma query de itens()
+        if self._resumo is None:
+            self._resumo = ResumoCarrinho.dos_itens(self.itens())
+        return self._resumo
+
+    @property
+    def total_itens(self):
+        # Só o Redis/cache, sem query
+        return sum(self.quantidades().values())
+
+    def adicionar(self, produto_id, quantidade=1):
+        produto = _produto_para_carrinho(produto_id)
+        if produto.estoque <= 0:
+            raise CarrinhoErro('Produto fora de estoque')
+        self._alterado()
+        # Incrementa e confere: cliques simultâneos não passam do estoque
+        if self._incrementar(produto.pk, quantidade) > produto.estoque:
+            self._incrementar(produto.pk, -quantidade)
+            raise CarrinhoErro('Estoque insuficiente')
+
+    def _produto_do_item(self, item_id):
+        if item_id not in self.quantidades():
+            raise CarrinhoErro('Item não encontrado', status=200)
+        return _produto_para_carrinho(item_id)
+
+    def alterar_quantidade(self, item_id, quantidade):
+        produto = self._produto_do_item(item_id)
+        if quantidade > produto.estoque:
+            raise CarrinhoErro(f'Estoque insuficiente. Disponível: {produto.estoque}', status=200)
+        self._alterado()
+        if quantidade < 1:
+            self._remover(produto.pk)
+            return 0
+        self._definir(produto.pk, quantidade)
+        return quantidade * produto.preco
+
+    def remover(self, item_id):
+        if item_id not in self.quantidades():
+            raise CarrinhoErro('Item não encontrado', status=200)
+        self._remover(item_id)
+        self._alterado()
+
+    def aplicar_lote(self, operacoes):
+        """Operações já normalizadas; uma escrita no armazenamento. Retorna o resumo."""
+        atuais = {produto_id: (produto_id, quantidade) for produto_id, quantidade in self.quantidades().items()}
+        final = self._planejar(operacoes, atuais)
+        alterados = {
+            produto_id: quantidade for produto_id, quantidade in final.items()
+            if self.quantidades().get(produto_id, 0) != quantidade
+        }
+        _conferir_estoque(alterados)
+        if alterados:
+            self._gravar_lote(alterados)
+        self._alterado()
+        return self.resumo()
+
+
+class CarrinhoRedis(_CarrinhoAnonimo):
+    """Hash no Redis (campo = produto_id, valor = quantidade); HINCRBY é atômico."""
+
+    def _redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    def _nome(self, chave):
+        return cache.make_key(chave)
+
+    def quantidades(self):
+        if not hasattr(self, '_quantidades'):
+            if not self.sessao:
+                self._quantidades = {}
+            else:
+                dados = self._redis().hgetall(self._nome(self._chave()))
+                self._quantidades = {int(pk): int(q) for pk, q in dados.items() if int(q) > 0}
+        return self._quantidades
+
+    def _escrever(self, operacao, *args):
+        nome = self._nome(self._sessao_para_escrita())
+        pipe = self._redis().pipeline()
+        getattr(pipe, operacao)(nome, *args)
+        pipe.expire(nome, chaves.ttl('carrinho_sessao'))
+        self.__dict__.pop('_quantidades', None)
+        return pipe.execute()[0]
+
+    def _incrementar(self, produto_id, delta):
+        novo = self._escrever('hincrby', produto_id, delta)
+        if novo <= 0:
+            self._remover(produto_id)
+        return novo
+
+    def _definir(self, produto_id, quantidade):
+        self._escrever('hset', produto_id, quantidade)
+
+    def _remover(self, produto_id):
+        self._escrever('hdel', produto_id)
+
+    def _gravar_lote(self, alterados):
+        nome = self._nome(self._sessao_para_escrita())
+        remover = [produto_id for produto_id, quantidade in alterados.items() if not quantidade]
+        definir = {produto_id: quantidade for produto_id, quantidade in alterados.items() if quantidade}
+        # MULTI/EXEC: o lote entra inteiro ou não entra
+        pipe = self._redis().pipeline(transaction=True)
+        if remover:
+            pipe.hdel(nome, *remover)
+        if definir:
+            pipe.hset(nome, mapping=definir)
+        pipe.expire(nome, chaves.ttl('carrinho_sessao'))
+        pipe.execute()
+        self.__dict__.pop('_quantidades', None)
+
+    def limpar(self):
+        if self.sessao:
+            self._redis().delete(self._nome(self._chave()))
+        self.__dict__.pop('_quantidades', None)
+        self._alterado()
+
+
+class CarrinhoCache(_CarrinhoAnonimo):
+    """Dict {produto_id: quantidade} em uma chave do cache do Django (sem atomicidade)."""
+
+    def quantidades(self):
+        if not hasattr(self, '_quantidades'):
+            self._quantidades = (cache.get(self._chave()) or {}) if self.sessao else {}
+        return self._quantidades
+
+    def _gravar(self, quantidades):
+        cache.set(self._sessao_para_escrita(), quantidades, chaves.ttl('carrinho_sessao'))
+        self._quantidades = quantidades
+
+    def _incrementar(self, produto_id, delta):
+        quantidades = dict(self.quantidades())
+        novo = quantidades.get(produto_id, 0) + delta
+        if novo > 0:
+            quantidades[produto_id] = novo
+        else:
+            quantidades.pop(produto_id, None)
+        self._gravar(quantidades)
+        return novo
+
+    def _definir(self, produto_id, quantidade):
+        self._gravar({**self.quantidades(), produto_id: quantidade})
+
+    def _remover(self, produto_id):
+        quantidades = dict(self.quantidades())
+        quantidades.pop(produto_id, None)
+        self._gravar(quantidades)
+
+    def _gravar_lote(self, alterados):
+        quantidades = {**self.quantidades(), **alterados}
+        self._gravar({produto_id: quantidade for produto_id, quantidade in quantidades.items() if quantidade})
+
+    def limpar(self):
+        if self.sessao:
+            cache.delete(self._chave())
+        self.__dict__.pop('_quantidades', None)
+        self._alterado()
+
+
+ARMAZENAMENTOS = {
+    'redis': CarrinhoRedis,
+    'cache': CarrinhoCache,
+}
+
+
+def anonimo(request):
+    return ARMAZENAMENTOS[config('ARMAZENAMENTO_ANONIMO')](request)
+
+
+def mesclar_no_login(request, usuario):
+    """
+    Junta o carrinho do visitante ao do usuário, logo após login() (que
+    preserva os dados da sessão). Origem: o armazenamento anônimo e, de antes
+    dele, Carrinho.sessao no banco. Quantidades somadas e limitadas ao
+    estoque; número de queries constante, qualquer que seja o nº de itens:
+    um bulk_create (ignorando os pares carrinho/produto que já existem) cria
+    as linhas que faltam com quantidade 0, um único UPDATE soma tudo e um
+    DELETE tira as que ficaram em 0 (estoque zerado depois da leitura).
+    """
+    sessao = request.session.get(SESSAO_CHAVE)
+    if not sessao:
+        return
+
+    anonimo_ = anonimo(request)
+    quantidades = dict(anonimo_.quantidades())
+    legados = Carrinho.objects.filter(sessao=sessao, usuario__isnull=True)
+    for produto_id, quantidade in ItemCarrinho.objects.filter(carrinho__in=legados).values_list(
+        'produto_id', 'quantidade',
+    ):
+        quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+
+    produtos = Produto.objects.only('id', 'preco', 'estoque').in_bulk(list(quantidades)) if quantidades else {}
+    somar = {pid: q for pid, q in quantidades.items() if q > 0 and pid in produtos and produtos[pid].estoque > 0}
+
+    with transaction.atomic():
+        if somar:
+            carrinho, _ = Carrinho.objects.get_or_create(usuario=usuario)
+            ItemCarrinho.objects.bulk_create(
+                [
+                    ItemCarrinho(carrinho=carrinho, produto_id=pid, quantidade=0, preco_unitario=produtos[pid].preco)
+                    for pid in somar
+                ],
+                ignore_conflicts=True,
+            )
+            ItemCarrinho.objects.filter(carrinho=carrinho, produto_id__in=list(somar)).update(
+                quantidade=Least(
+                    F('quantidade') + Case(*(When(produto_id=pid, then=Value(q)) for pid, q in somar.items())),
+                    Subquery(Produto.objects.filter(pk=OuterRef('produto_id')).values('estoque')[:1]),
+                    output_field=PositiveIntegerField(),
+                ),
+                atualizado_em=timezone.now(),
+            )
+            # O filtro de estoque acima é de antes da transação: o que zerou no
+            # meio do caminho ficou com quantidade 0 e sai do carrinho
+            ItemCarrinho.objects.filter(carrinho=carrinho, produto_id__in=list(somar), quantidade=0).delete()
+        legados.delete()
+
+    anonimo_.limpar()
+    request.session.pop(SESSAO_CHAVE, None)
+    if somar:
+        logger.info(f"Carrinho de sessão mesclado no login de {usuario.email}: {len(somar)} produto(s)")
+
+
+def do_request(request):
+    """Carrinho do usuário logado ou da sessão do visitante."""
+    if request.user.is_authenticated:
+        return CarrinhoBanco(request.user)
+    return anonimo(request)
@@ -0,0 +1,199 @@
+# core/services/catalogo.py
+"""
+Snapshot do catálogo (produtos ativos) mantido em memória em cada processo.
+
+Registros com `__slots__` (tratados como imutáveis: são compartilhados entre
+threads), versionados por uma chave pequena no cache (Redis): saves/deletes
+de Produto e ImagemProduto (e novos derivados de imagem) incrementam a versão
+e cada worker recarrega o snapshot na próxima leitura. Em regime estável, ler
+produtos do catálogo custa um cache.get da versão e nenhuma query.
+
+Estoque muda a cada venda/movimentação (save com update_fields=['estoque']):
+isso não recarrega o snapshot. O valor novo vai para uma chave por produto
+(`estoque_alterado`) e `produtos_por_ids` sobrepõe, com um get_many, os que
+mudaram depois da montagem do snapshot.
+
+Os registros imitam a interface de Produto usada nos templates e nos
+serializers de card (`imagem.url`, `preco`, `categoria`...); para alterar
+dados, use sempre o model.
+"""
+import logging
+import threading
+import time
+from itertools import islice
+
+from django.core.cache import cache
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from core.models import DerivadoImagem, Produto, ImagemProduto
+from core.services import chaves
+
+logger = logging.getLogger(__name__)
+
+VERSAO_CACHE_KEY = chaves.montar('catalogo_versao')
+TAMANHO_DESCRICAO = 250
+
+
+class ImagemRef:
+    """Referência mínima a um arquivo (mesma interface de FieldFile usada nas telas)."""
+    __slots__ = ('name', 'url')
+
+    def __init__(self, arquivo):
+        self.name = arquivo.name
+        self.url = arquivo.url
+
+    def __bool__(self):
+        return bool(self.name)
+
+
+class ImagemPrincipalRef:
+    """Imagem principal da galeria (mesma forma de ImagemProduto: `.imagem.url`)."""
+    __slots__ = ('imagem',)
+
+    def __init__(self, arquivo):
+        self.imagem = ImagemRef(arquivo)
+
+
+class ProdutoSnapshot:
+    __slots__ = (
+        'id', 'pk', 'nome', 'sku', 'preco', 'categoria', 'status', 'estoque',
+        'descricao', 'imagem', 'imagens_principais', 'imagem_srcset', 'data_criacao', 'stats_avaliacao',
+    )
+
+    def __init__(self, produto, imagem_principal=None, srcsets=None):
+        self.id = self.pk = produto.id
+        self.nome = produto.nome
+        self.sku = produto.sku
+        self.preco = produto.preco
+        self.categoria = produto.categoria
+        self.status = produto.status
+        self.estoque = produto.estoque
+        # Só o resumo usado nos cards (texto sem HTML)
+        self.descricao = Truncator(strip_tags(produto.descricao or '')).chars(TAMANHO_DESCRICAO)
+        self.imagem = ImagemRef(produto.imagem) if produto.imagem else None
+        self.imagens_principais = [ImagemPrincipalRef(imagem_principal)] if imagem_principal else []
+        # srcset (por formato) da imagem do card: Produto.imagem ou a principal da galeria
+        arquivo_card = produto.imagem or imagem_principal
+        self.imagem_srcset = (srcsets or {}).get(arquivo_card.name, {}) if arquivo_card else {}
+        self.data_criacao = produto.data_criacao
+        self.stats_avaliacao = None
+
+    def _copia(self, **campos):
+        # Cópia por requisição: o registro compartilhado entre threads não muda
+        copia = object.__new__(ProdutoSnapshot)
+        for campo in self.__slots__:
+            setattr(copia, campo, getattr(self, campo))
+        for campo, valor in campos.items():
+            setattr(copia, campo, valor)
+        return copia
+
+    def com_stats(self, stats):
+        """Cópia com as estatísticas de avaliação."""
+        return self._copia(stats_avaliacao=stats)
+
+    def com_estoque(self, estoque):
+        return self._copia(estoque=estoque)
+
+    def __repr__(self):
+        return f'<ProdutoSnapshot {self.id}: {self.nome}>'
+
+
+class Catalogo:
+    """Snapshot imutável: registros por ID + IDs em ordem (mais recentes primeiro)."""
+
+    def __init__(self, produtos, principais, srcsets=None, montado_em=None):
+        # Início da leitura do banco: estoques gravados depois disso sobrepõem o snapshot
+        self.montado_em = montado_em or time.time()
+        self.por_id = {p.id: ProdutoSnapshot(p, principais.get(p.id), srcsets) for p in produtos}
+        self.ids = sorted(self.por_id, reverse=True)
+        self.por_categoria = {}
+        for pk in self.ids:
+            self.por_categoria.setdefault(self.por_id[pk].categoria, []).append(pk)
+
+    @classmethod
+    def construir(cls):
+        montado_em = time.time()
+        produtos = Produto.objects.filter(status='Ativo').only(
+            'id', 'nome', 'sku', 'preco', 'categoria', 'status', 'estoque', 'descricao', 'imagem', 'data_criacao'
+        )
+        principais = {
+            img.produto_id: img.imagem
+            for img in ImagemProduto.objects.filter(is_principal=True, produto__status='Ativo').only('produto_id', 'imagem')
+        }
+        produtos = list(produtos.iterator(chunk_size=2000))
+        srcsets = DerivadoImagem.objects.srcsets(
+            [p.imagem.name for p in produtos if p.imagem] + [img.name for img in principais.values()]
+        )
+        return cls(produtos, principais, srcsets, montado_em)
+
+    def obter(self, ids):
+        """Registros dos IDs, na ordem pedida (IDs inativos/inexistentes são ignorados)."""
+        return [self.por_id[pk] for pk in ids if pk in self.por_id]
+
+    def da_categoria(self, categoria, limite, excluir=()):
+        """Até `limite` registros da categoria (mais recentes primeiro), fora os IDs excluídos."""
+        ids = (pk for pk in self.por_categoria.get(categoria, ()) if pk not in excluir)
+        return [self.por_id[pk] for pk in islice(ids, limite)]
+
+    def __len__(self):
+        return len(self.por_id)
+
+
+def versao_catalogo():
+    versao = cache.get(VERSAO_CACHE_KEY)
+    if versao is None:
+        cache.add(VERSAO_CACHE_KEY, 1, None)
+        versao = cache.get(VERSAO_CACHE_KEY, 1)
+    return versao
+
+
+def incrementar_versao_catalogo():
+    try:
+        return cache.incr(VERSAO_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSAO_CACHE_KEY, 1, None)
+        return cache.incr(VERSAO_CACHE_KEY)
+
+
+_lock = threading.Lock()
+_cache = {'versao': None, 'catalogo': None}
+
+
+def catalogo():
+    """Snapshot do processo, recarregado quando a versão no cache muda."""
+    versao = versao_catalogo()
+    if _cache['versao'] != versao:
+        with _lock:
+            if _cache['versao'] != versao:
+                _cache['catalogo'] = Catalogo.construir()
+                _cache['versao'] = versao
+                logger.info(f"Snapshot do catálogo carregado (v{versao}): {len(_cache['catalogo'])} produtos")
+    return _cache['catalogo']
+
+
+def estoque_alterado(produto_id, estoque):
+    """Estoque novo de um produto (após o commit), sem recarregar o snapshot."""
+    cache.set(chaves.montar('estoque_produto', produto_id=produto_id), (estoque, time.time()), None)
+
+
+def com_estoque_atual(registros, snapshot=None):
+    """Registros com o estoque das alterações posteriores ao snapshot (um get_many)."""
+    if not registros:
+        return registros
+    snapshot = snapshot or catalogo()
+    chaves_estoque = chaves.montar_muitos('estoque_produto', [{'produto_id': r.pk} for r in registros])
+    atuais = cache.get_many(chaves_estoque)
+    resultado = []
+    for registro, chave in zip(registros, chaves_estoque):
+        atual = atuais.get(chave)
+        if atual is not None and atual[1] >= snapshot.montado_em and atual[0] != registro.estoque:
+            registro = registro.com_estoque(atual[0])
+        resultado.append(registro)
+    return resultado
+
+
+def produtos_por_ids(ids):
+    """Registros ativos dos IDs, na ordem pedida (sem query em regime estável)."""
+    snapshot = catalogo()
+    return com_estoque_atual(snapshot.obter(ids), snapshot)
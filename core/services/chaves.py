@@ -0,0 +1,150 @@
+# core/services/chaves.py
+"""
+Registro central das chaves de cache da aplicação.
+
+Cada chave é declarada uma única vez aqui, com modelo, TTL, módulo dono e os
+escopos de versão (core.services.versoes) de que depende:
+
+    chave = chaves.montar('avaliacao_stats', produto_id=5)
+    # 'avaliacao_stats_prod_5_v<cache_produto>.<avaliacoes>'
+
+A versão dos escopos entra no nome da chave, então invalidar é incrementar
+um contador (um INCR) e nunca apagar chaves: as entradas antigas deixam de
+ser lidas e expiram sozinhas. Escopos:
+
+- ('cache_produto', id): namespace de tudo o que deriva de um produto;
+  `invalidar_produto(id)` descarta todas essas entradas de uma vez;
+- ('produto', id), ('avaliacoes', id), 'relacionados'...: escopos finos de
+  versoes, incrementados pelos signals após o commit (uma avaliação nova não
+  invalida a galeria, uma edição do produto não invalida as estatísticas);
+- 'catalogo' / 'busca': versões do snapshot do catálogo e do índice de busca.
+
+Chaves sem escopo (travas, debounce, contadores) estão aqui só para ter TTL
+e dono declarados em um lugar.
+"""
+from collections import namedtuple
+
+from django.core.exceptions import ImproperlyConfigured
+
+from core.services import versoes
+
+Chave = namedtuple('Chave', 'modelo ttl dono escopos local')
+
+REGISTRO = {}
+
+NAMESPACE_PRODUTO = 'cache_produto'
+
+
+def registrar(nome, modelo, ttl, dono, escopos=(), local=False):
+    """
+    Declara uma chave. `escopos`: nomes globais ou (escopo, parâmetro do modelo).
+    `local`: quente e lida muito mais do que escrita, vai para a camada local
+    do cache (core.services.cache_local); contadores e travas nunca.
+    """
+    if nome in REGISTRO:
+        raise ImproperlyConfigured(f'Chave de cache {nome!r} registrada duas vezes')
+    REGISTRO[nome] = Chave(modelo, ttl, dono, tuple(escopos), local)
+
+
+def ttl(nome):
+    return REGISTRO[nome].ttl
+
+
+def prefixos_locais():
+    """Parte fixa (antes do primeiro parâmetro) das chaves marcadas como `local`."""
+    return tuple(dict.fromkeys(c.modelo.split('{', 1)[0] for c in REGISTRO.values() if c.local))
+
+
+ESCOPOS_EXTERNOS = ('catalogo', 'busca')
+
+
+def _versao_externa(escopo):
+    # Importações tardias: este módulo é usado por core.models
+    if escopo == 'catalogo':
+        from core.services.catalogo import versao_catalogo
+        return versao_catalogo()
+    from core.search.versao import versao_indice
+    return versao_indice()
+
+
+def montar(nome, **params):
+    return montar_muitos(nome, [params])[0]
+
+
+def montar_muitos(nome, lista_params):
+    """Chaves de `nome` para cada dict de parâmetros; as versões saem de um único get_many."""
+    definicao = REGISTRO[nome]
+    externas = {e: _versao_externa(e) for e in definicao.escopos if e in ESCOPOS_EXTERNOS}
+    por_chave = [
+        [(e[0], params[e[1]]) if isinstance(e, tuple) else e for e in definicao.escopos if e not in externas]
+        for params in lista_params
+    ]
+
+    todos = list(dict.fromkeys(e for escopos in por_chave for e in escopos))
+    valores, lote = {}, None
+    if todos:
+        lidas, _ = versoes.carimbo(*todos)
+        valores = dict(zip(todos, lidas))
+        # carimbo() acrescenta o contador de lote quando há escopos ('produto', id)
+        if len(lidas) > len(todos):
+            lote = lidas[-1]
+
+    resultado = []
+    for params, escopos in zip(lista_params, por_chave):
+        partes = []
+        for escopo in escopos:
+            partes.append(valores[escopo])
+            if isinstance(escopo, tuple) and escopo[0] == 'produto':
+                partes.append(lote)
+        partes += externas.values()
+        base = definicao.modelo.format(**params)
+        resultado.append(f"{base}_v{'.'.join(map(str, partes))}" if partes else base)
+    return resultado
+
+
+def invalidar_produto(produto_id):
+    """Descarta todas as entradas derivadas do produto (um INCR no namespace)."""
+    versoes.incrementar((NAMESPACE_PRODUTO, produto_id))
+
+
+# ---------- chaves da aplicação ----------
+# Derivados de produto: invalidados pelos escopos de versão
+registrar(
+    'avaliacao_stats', 'avaliacao_stats_prod_{produto_id}', 60, 'core.models.avaliacoes',
+    escopos=[(NAMESPACE_PRODUTO, 'produto_id'), ('avaliacoes', 'produto_id')], local=True,
+)
+registrar(
+    'avaliacoes_contexto', 'avaliacoes_contexto_prod_{produto_id}', 300, 'core.services.pagina_produto',
+    escopos=[(NAMESPACE_PRODUTO, 'produto_id'), ('avaliacoes', 'produto_id')], local=True,
+)
+registrar(
+    'produto_pagina', 'produto_pagina_{produto_id}', 300, 'core.services.pagina_produto',
+    escopos=[
+        (NAMESPACE_PRODUTO, 'produto_id'), ('produto', 'produto_id'), ('avaliacoes', 'produto_id'),
+        'relacionados', 'catalogo',
+    ],
+    local=True,
+)
+# Chave montada pela tag {% cache %}; as versões vão nos argumentos (core.services.fragmentos)
+registrar('fragmentos', 'template.cache.{fragmento}', 60 * 60 * 24, 'core.services.fragmentos', local=True)
+registrar('busca_corpus_stats', 'busca_corpus_stats', 3600, 'core.search.indice', escopos=['busca'], local=True)
+registrar('autocomplete_popularidade', 'autocomplete_popularidade', 3600, 'core.search.autocomplete')
+registrar('admin_stats_reais', 'admin_stats_reais', 60, 'core.views.admin_views', local=True)
+# TTL definido por view (@condicional(cache_timeout=...)); o ETag já é a versão
+registrar('resposta_api', 'resposta_api_{etag}', None, 'core.views.condicional')
+
+# Contadores de versão (sem TTL). Nunca na camada local: toda chave versionada,
+# fragmento e ETag depende deles, e um INCR tem de valer na hora para todos os
+# processos (uma mensagem de invalidação perdida serviria versões antigas)
+registrar('versao', versoes.PREFIXO + '{escopo}', None, 'core.services.versoes')
+registrar('catalogo_versao', 'catalogo_versao', None, 'core.services.catalogo')
+registrar('busca_indice_versao', 'busca_indice_versao', None, 'core.search.versao')
+
+# Contadores, travas e estado (sempre direto no Redis)
+# Materializado a cada 5 min (beat); validade suave de duas rodadas do job
+registrar('destaque_ranking', 'produtos_destaque_ranking', 600, 'core.services.destaque_service')
+# Hash {produto_id: visualizações} no Redis, esvaziado pelo job periódico
+registrar('destaque_visualizacoes', 'produtos_visualizacoes', None, 'core.services.destaque_service')
+registrar('estoque_produto', 'estoque_produto_{produto_id}', None, 'core.services.catalogo')
+registrar('carrinho_sessao', 'carrinho_sessao_{sessao}', 60 * 60 * 24 * 7, 'core.services.carrinho_store')
+registrar('like_debounce', 'like_debounce_{usuario_id}_{avaliacao_id}', 2, 'core.views.avaliacao_views')
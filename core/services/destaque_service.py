@@ -0,0 +1,157 @@
+# core/services/destaque_service.py
+"""
+Ranking de produtos em destaque por velocidade de vendas e visualizações.
+
+Forward decay: um evento no instante t soma peso * exp(λ·(t - marco)) ao
+contador do produto (UPDATE com F(), sem ler o valor atual). Como todos os
+contadores seriam multiplicados pelo mesmo exp(-λ·(agora - marco)), a ordem
+dos valores guardados já é a ordem dos scores decaídos.
+
+Visualizações são acumuladas em um hash no Redis (campo = produto_id,
+HINCRBY) e descarregadas no banco pelo job periódico, que esvazia o hash de
+forma atômica (HGETALL + DEL em MULTI/EXEC) e só visita os produtos vistos
+desde a última vez. DESTAQUE_CONFIG['ARMAZENAMENTO_VISUALIZACOES'] = 'cache'
+guarda um dict no cache do Django (sem atomicidade), para ambientes sem Redis.
+O mesmo job materializa o ranking em uma lista no cache; a home e a API de
+destaques fazem apenas um cache.get e leem os produtos do snapshot do
+catálogo (core.services.catalogo).
+"""
+import logging
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Produto, VelocidadeProduto
+from core.services import cache_swr, catalogo, chaves
+
+logger = logging.getLogger(__name__)
+
+RANKING_CACHE_KEY = chaves.montar('destaque_ranking')
+VISUALIZACOES_CACHE_KEY = chaves.montar('destaque_visualizacoes')
+
+_CONFIG_PADRAO = {
+    'MEIA_VIDA_HORAS': 168,        # uma semana
+    'PESO_VENDA': 1.0,             # por unidade vendida
+    'PESO_VISUALIZACAO': 0.05,     # por visualização da página
+    'TAMANHO_RANKING': 48,
+    # Marco do forward decay; com meia-vida de 7 dias o expoente cabe em um
+    # float por ~19 anos a partir daqui
+    'MARCO': '2025-01-01',
+    'ARMAZENAMENTO_VISUALIZACOES': 'redis',   # 'redis' (hash, atômico) ou 'cache' (sem Redis)
+}
+
+
+def config(chave):
+    return getattr(settings, 'DESTAQUE_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+def _peso_no_instante(peso, instante=None):
+    """peso * exp(λ·(t - marco)), com λ = ln 2 / meia-vida"""
+    instante = instante or timezone.now()
+    marco = datetime.fromisoformat(config('MARCO')).replace(tzinfo=dt_timezone.utc)
+    horas = (instante - marco).total_seconds() / 3600
+    return peso * math.exp(math.log(2) * horas / config('MEIA_VIDA_HORAS'))
+
+
+def _incrementar(produto_id, campo, valor):
+    alteracao = {campo: F(campo) + valor, 'atualizado_em': timezone.now()}
+    if not VelocidadeProduto.objects.filter(produto_id=produto_id).update(**alteracao):
+        VelocidadeProduto.objects.get_or_create(produto_id=produto_id)
+        VelocidadeProduto.objects.filter(produto_id=produto_id).update(**alteracao)
+
+
+def registrar_venda(produto_id, quantidade=1):
+    _incrementar(produto_id, 'score_vendas', _peso_no_instante(config('PESO_VENDA') * quantidade))
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def registrar_visualizacao(produto_id):
+    """Só um HINCRBY; o job periódico leva o acumulado para o banco."""
+    if config('ARMAZENAMENTO_VISUALIZACOES') == 'redis':
+        _redis().hincrby(cache.make_key(VISUALIZACOES_CACHE_KEY), produto_id, 1)
+        return
+    pendentes = cache.get(VISUALIZACOES_CACHE_KEY) or {}
+    pendentes[produto_id] = pendentes.get(produto_id, 0) + 1
+    cache.set(VISUALIZACOES_CACHE_KEY, pendentes, None)
+
+
+def _retirar_visualizacoes():
+    """{produto_id: visualizações} acumuladas desde a última retirada; zera o acumulador."""
+    if config('ARMAZENAMENTO_VISUALIZACOES') == 'redis':
+        nome = cache.make_key(VISUALIZACOES_CACHE_KEY)
+        # MULTI/EXEC: nenhuma visualização cai entre a leitura e o DEL
+        pipe = _redis().pipeline(transaction=True)
+        pipe.hgetall(nome)
+        pipe.delete(nome)
+        dados, _ = pipe.execute()
+        return {int(pk): int(n) for pk, n in dados.items()}
+    pendentes = cache.get(VISUALIZACOES_CACHE_KEY) or {}
+    cache.delete(VISUALIZACOES_CACHE_KEY)
+    return pendentes
+
+
+def _descarregar_visualizacoes():
+    """Aplica as visualizações acumuladas (peso do instante do descarregamento)."""
+    acumuladas = _retirar_visualizacoes()
+    # Só os produtos vistos desde a última vez; removidos/inativos são descartados
+    ativos = Produto.objects.filter(pk__in=list(acumuladas), status='Ativo').values_list('id', flat=True)
+    peso = _peso_no_instante(config('PESO_VISUALIZACAO'))
+    for produto_id in ativos:
+        _incrementar(produto_id, 'score_visualizacoes', peso * acumuladas[produto_id])
+    return sum(acumuladas.values())
+
+
+def _calcular_ranking():
+    """Lista ordenada dos IDs em destaque, a partir dos contadores do banco."""
+    score = F('velocidade__score_vendas') + F('velocidade__score_visualizacoes')
+    ranking = list(
+        Produto.objects.filter(status='Ativo', estoque__gt=0, velocidade__isnull=False)
+        .annotate(score_destaque=score)
+        .order_by('-score_destaque', '-id')
+        .values_list('id', flat=True)[:config('TAMANHO_RANKING')]
+    )
+    # Sem histórico suficiente: completa com os mais recentes
+    if len(ranking) < config('TAMANHO_RANKING'):
+        ranking += list(
+            Produto.objects.filter(status='Ativo', estoque__gt=0)
+            .exclude(id__in=ranking)
+            .order_by('-id')
+            .values_list('id', flat=True)[:config('TAMANHO_RANKING') - len(ranking)]
+        )
+    return ranking
+
+
+def materializar_ranking():
+    """Descarrega visualizações e grava a lista ordenada de IDs no cache."""
+    visualizacoes = _descarregar_visualizacoes()
+    ranking = _calcular_ranking()
+    cache_swr.gravar(RANKING_CACHE_KEY, ranking, chaves.ttl('destaque_ranking'))
+    logger.info(f"Ranking de destaque materializado: {len(ranking)} produtos, {visualizacoes} visualizações descarregadas")
+    return ranking
+
+
+def ids_em_destaque(limite):
+    """
+    IDs do ranking materializado (um cache.get). Sem o job (cache vazio ou job
+    atrasado), um único processo recalcula sob a trava de core.services.cache_swr
+    e os demais servem a lista anterior ou esperam por ela.
+    """
+    ranking = cache_swr.obter(RANKING_CACHE_KEY, _calcular_ranking, chaves.ttl('destaque_ranking'))
+    return ranking[:limite]
+
+
+def produtos_em_destaque(limite):
+    """
+    Produtos do ranking, na ordem do ranking, lidos do snapshot do catálogo
+    (só ativos; re-filtra o estoque da versão atual). Sem query em regime estável.
+    """
+    ids = ids_em_destaque(limite * 2)
+    return [p for p in catalogo.produtos_por_ids(ids) if p.estoque > 0][:limite]
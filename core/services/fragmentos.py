@@ -0,0 +1,42 @@
+# core/services/fragmentos.py
+"""
+Versões para as chaves dos fragmentos de template ({% cache %}).
+
+Cada fragmento entra na chave com os carimbos (core.services.versoes) e a
+versão do catálogo dos dados de que depende: uma alteração muda só a chave
+dos fragmentos afetados. As views passam o contexto desses blocos como
+valores preguiçosos, avaliados apenas quando o fragmento não está em cache;
+com o fragmento em cache, o bloco sai sem nenhuma query. O TTL só libera
+memória, nunca é o que invalida.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from core.services import catalogo, chaves, versoes
+
+TIMEOUT = chaves.ttl('fragmentos')
+
+
+def preguicoso(funcao):
+    """Valor de contexto calculado só se o template chegar a usá-lo."""
+    return SimpleLazyObject(funcao)
+
+
+def versoes_produto(produto_id):
+    """Versões dos fragmentos da página de produto (galeria, avaliações, relacionados)."""
+    # carimbo() acrescenta o contador de lote ao fim quando há um escopo ('produto', id);
+    # o namespace do produto (chaves.invalidar_produto) entra em todos os fragmentos
+    (namespace, produto, avaliacoes, relacionados, lote), _ = versoes.carimbo(
+        (chaves.NAMESPACE_PRODUTO, produto_id), ('produto', produto_id), ('avaliacoes', produto_id), 'relacionados'
+    )
+    return {
+        'timeout': TIMEOUT,
+        'produto': f'{namespace}.{produto}.{lote}',
+        'avaliacoes': f'{namespace}.{avaliacoes}',
+        'relacionados': f'{namespace}.{catalogo.versao_catalogo()}.{relacionados}',
+    }
+
+
+def versoes_listagem():
+    """Versão dos cards de produto: dados do snapshot do catálogo + estrelas das avaliações."""
+    (avaliacoes,), _ = versoes.carimbo('avaliacoes')
+    return {'timeout': TIMEOUT, 'cards': f'{catalogo.versao_catalogo()}.{avaliacoes}'}
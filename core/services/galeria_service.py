@@ -0,0 +1,121 @@
+# core/services/galeria_service.py
+"""
+Upload em lote da galeria de um produto (ImagemProdutoViewSet.create).
+
+Tudo ou nada: todos os arquivos são validados antes de qualquer escrita; os
+arquivos vão para o storage em paralelo (thread pool, I/O); as linhas entram
+com um único bulk_create dentro de uma transação que também resolve `ordem`
+(depois da última imagem do produto) e confere `is_principal` de uma vez. Se o banco
+falhar, os arquivos já gravados são apagados.
+
+bulk_create não dispara os signals de ImagemProduto: snapshot do catálogo,
+carimbos de versão e derivados responsivos são agendados aqui, após o commit.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from core.models import ImagemProduto, Produto
+from core.services import catalogo, versoes
+from core.services.imagens_service import config
+from core.tasks.imagem_tasks import gerar_derivados_imagem
+
+logger = logging.getLogger(__name__)
+
+
+def validar_arquivos(arquivos, legenda=''):
+    """Lista de erros [{arquivo, erro}] (vazia se tudo for válido). Não grava nada."""
+    erros = []
+    if len(arquivos) > config('MAX_ARQUIVOS_UPLOAD'):
+        erros.append({'arquivo': None, 'erro': f"No máximo {config('MAX_ARQUIVOS_UPLOAD')} imagens por envio"})
+    try:
+        ImagemProduto._meta.get_field('legenda').clean(legenda, None)
+    except ValidationError as e:
+        erros.append({'arquivo': None, 'erro': f"legenda: {' '.join(e.messages)}"})
+    campo = forms.ImageField()
+    for arquivo in arquivos:
+        try:
+            # Abre com o Pillow (verify) e volta o ponteiro para o início
+            campo.clean(arquivo)
+        except ValidationError as e:
+            erros.append({'arquivo': arquivo.name, 'erro': ' '.join(e.messages)})
+    return erros
+
+
+def _gravar_no_storage(arquivos, produto):
+    """Grava os arquivos em paralelo; devolve os nomes finais na ordem de envio."""
+    campo = ImagemProduto._meta.get_field('imagem')
+    modelo = ImagemProduto(produto=produto)
+
+    def gravar(arquivo):
+        return campo.storage.save(campo.generate_filename(modelo, arquivo.name), arquivo)
+
+    with ThreadPoolExecutor(max_workers=min(config('UPLOAD_THREADS'), len(arquivos))) as pool:
+        futuros = [pool.submit(gravar, arquivo) for arquivo in arquivos]
+    nomes, falhas = [], []
+    for futuro in futuros:
+        try:
+            nomes.append(futuro.result())
+        except Exception as e:
+            falhas.append(e)
+    if falhas:
+        _apagar(nomes)
+        raise falhas[0]
+    return nomes
+
+
+def _apagar(nomes):
+    storage = ImagemProduto._meta.get_field('imagem').storage
+    for nome in nomes:
+        try:
+            storage.delete(nome)
+        except Exception as e:
+            logger.warning(f"Não foi possível apagar {nome} após falha no upload: {str(e)}")
+
+
+def enviar_imagens(produto_id, arquivos, legenda='', principal=False):
+    """
+    Adiciona os arquivos (já validados) à galeria do produto. Com `principal`,
+    a primeira imagem enviada passa a ser a principal; como em
+    ImagemProduto.clean(), levanta ValidationError se o produto já tiver uma.
+    Retorna as instâncias criadas, em ordem; levanta Produto.DoesNotExist se o
+    produto não existir.
+    """
+    produto = Produto.objects.only('id').get(pk=produto_id)
+    nomes = _gravar_no_storage(arquivos, produto)
+    try:
+        with transaction.atomic():
+            # Trava o produto: envios simultâneos não repetem `ordem` nem duplicam a principal
+            Produto.objects.select_for_update().filter(pk=produto.pk).values_list('pk', flat=True).get()
+            ultima = ImagemProduto.objects.filter(produto=produto).aggregate(ultima=Max('ordem'))['ultima']
+            inicio = 0 if ultima is None else ultima + 1
+            if principal and ImagemProduto.objects.filter(produto=produto, is_principal=True).exists():
+                raise ValidationError(
+                    "Já existe uma imagem principal para este produto. "
+                    "Desmarque a imagem principal existente antes de definir uma nova."
+                )
+            ImagemProduto.objects.bulk_create([
+                ImagemProduto(
+                    produto=produto, imagem=nome, ordem=inicio + i, legenda=legenda,
+                    is_principal=principal and i == 0,
+                )
+                for i, nome in enumerate(nomes)
+            ])
+
+            def agendar():
+                catalogo.incrementar_versao_catalogo()
+                versoes.produto_alterado(produto.pk)
+                for nome in nomes:
+                    gerar_derivados_imagem.delay(nome)
+            transaction.on_commit(agendar)
+    except Exception:
+        _apagar(nomes)
+        raise
+
+    logger.info(f"{len(nomes)} imagens adicionadas à galeria do produto {produto.pk}")
+    # Nem todo backend devolve as PKs no bulk_create
+    return list(ImagemProduto.objects.filter(produto=produto, imagem__in=nomes).order_by('ordem'))
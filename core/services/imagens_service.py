@@ -0,0 +1,164 @@
+# core/services/imagens_service.py
+"""
+Derivados responsivos das imagens de produto (srcset).
+
+Cada imagem enviada (Produto.imagem ou ImagemProduto.imagem) ganha versões em
+larguras fixas, sem ampliar o original, em cada formato configurado que o
+Pillow instalado suporta (AVIF/WebP/JPEG). Os arquivos vão para o storage em
+caminhos determinísticos e ficam registrados em DerivadoImagem.
+
+A geração (Pillow + storage) é separada da gravação no banco: a task do
+Celery faz as duas coisas; o backfill (`gerar_derivados_imagens`) roda a
+geração em um pool de processos e grava no processo principal.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from core.models import DerivadoImagem, ImagemProduto, Produto
+from core.services import catalogo, versoes
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_PADRAO = {
+    'LARGURAS': (320, 640, 960, 1280),
+    'FORMATOS': ('avif', 'webp', 'jpeg'),   # ordem de preferência no <picture>
+    'QUALIDADE': {'avif': 50, 'webp': 75, 'jpeg': 80},
+    'PASTA': 'derivados',
+    'UPLOAD_THREADS': 4,            # gravações simultâneas no storage por envio
+    'MAX_ARQUIVOS_UPLOAD': 20,
+}
+
+# formato -> (formato do Pillow, extensão, feature do Pillow)
+_FORMATOS_PILLOW = {
+    'avif': ('AVIF', 'avif', 'avif'),
+    'webp': ('WEBP', 'webp', 'webp'),
+    'jpeg': ('JPEG', 'jpg', 'jpg'),
+}
+
+
+def config(chave):
+    return getattr(settings, 'IMAGENS_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+def formatos_suportados():
+    """Formatos configurados que o Pillow instalado consegue gravar (AVIF depende da build)."""
+    return [f for f in config('FORMATOS') if f in _FORMATOS_PILLOW and features.check(_FORMATOS_PILLOW[f][2])]
+
+
+def larguras_para(largura_original):
+    """Larguras configuradas que não ampliam o original (imagem pequena: só a própria largura)."""
+    return [l for l in sorted(config('LARGURAS')) if l <= largura_original] or [largura_original]
+
+
+def caminho_derivado(original, largura, formato):
+    base, _ = os.path.splitext(original)
+    return f"{config('PASTA')}/{base}-{largura}w.{_FORMATOS_PILLOW[formato][1]}"
+
+
+def _preparar(imagem, formato):
+    """JPEG não tem canal alfa: achata sobre fundo branco."""
+    if formato == 'jpeg':
+        if imagem.mode in ('RGBA', 'LA', 'P'):
+            imagem = imagem.convert('RGBA')
+            fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+            fundo.paste(imagem, mask=imagem.getchannel('A'))
+            return fundo
+        return imagem.convert('RGB') if imagem.mode != 'RGB' else imagem
+    if imagem.mode not in ('RGB', 'RGBA'):
+        return imagem.convert('RGBA' if 'A' in imagem.getbands() or imagem.mode == 'P' else 'RGB')
+    return imagem
+
+
+def gerar_arquivos(original):
+    """
+    Gera e grava no storage os derivados de um arquivo original.
+    Não toca no banco (pode rodar em outro processo); retorna os dados das linhas
+    de DerivadoImagem.
+    """
+    formatos = formatos_suportados()
+    qualidade = config('QUALIDADE')
+    linhas = []
+
+    with default_storage.open(original, 'rb') as arquivo:
+        imagem = Image.open(arquivo)
+        # JPEG: decodifica já reduzido quando o original é muito maior que o maior derivado
+        imagem.draft('RGB', (max(config('LARGURAS')), max(config('LARGURAS'))))
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.load()
+
+    largura_original, altura_original = imagem.size
+    for largura in sorted(larguras_para(largura_original), reverse=True):
+        altura = max(1, round(altura_original * largura / largura_original))
+        redimensionada = imagem if largura == imagem.width else imagem.resize((largura, altura), Image.LANCZOS)
+        # Próxima largura (menor) parte desta: reduções sucessivas são mais baratas
+        imagem = redimensionada
+        for formato in formatos:
+            buffer = io.BytesIO()
+            _preparar(redimensionada, formato).save(
+                buffer, _FORMATOS_PILLOW[formato][0], quality=qualidade.get(formato, 80), optimize=formato == 'jpeg'
+            )
+            caminho = caminho_derivado(original, largura, formato)
+            if default_storage.exists(caminho):
+                default_storage.delete(caminho)
+            salvo = default_storage.save(caminho, ContentFile(buffer.getvalue()))
+            linhas.append({
+                'original': original, 'formato': formato, 'largura': largura, 'altura': altura,
+                'arquivo': salvo, 'tamanho_bytes': buffer.tell(),
+            })
+    return linhas
+
+
+def registrar_derivados(original, linhas):
+    """Substitui as linhas de DerivadoImagem do original e remove arquivos que saíram do conjunto."""
+    novos = {linha['arquivo'] for linha in linhas}
+    with transaction.atomic():
+        antigos = set(DerivadoImagem.objects.filter(original=original).values_list('arquivo', flat=True))
+        DerivadoImagem.objects.filter(original=original).delete()
+        DerivadoImagem.objects.bulk_create([DerivadoImagem(**linha) for linha in linhas])
+        # Os cards do snapshot do catálogo e as respostas das APIs carregam o srcset
+        transaction.on_commit(catalogo.incrementar_versao_catalogo)
+        produto_ids = set(Produto.objects.filter(imagem=original).values_list('id', flat=True))
+        produto_ids.update(ImagemProduto.objects.filter(imagem=original).values_list('produto_id', flat=True))
+        transaction.on_commit(lambda: versoes.incrementar('produtos', *[('produto', pk) for pk in produto_ids]))
+    for arquivo in antigos - novos:
+        default_storage.delete(arquivo)
+
+
+def processar_imagem(original):
+    """Gera e registra os derivados de um arquivo. Retorna o nº de derivados."""
+    linhas = gerar_arquivos(original)
+    registrar_derivados(original, linhas)
+    logger.info(f"Derivados gerados para {original}: {len(linhas)} arquivos")
+    return len(linhas)
+
+
+def em_uso(original):
+    return (
+        Produto.objects.filter(imagem=original).exists()
+        or ImagemProduto.objects.filter(imagem=original).exists()
+    )
+
+
+def remover_derivados(original):
+    """Remove arquivos e linhas dos derivados (se o original não for mais usado)."""
+    if em_uso(original):
+        return 0
+    arquivos = list(DerivadoImagem.objects.filter(original=original).values_list('arquivo', flat=True))
+    DerivadoImagem.objects.filter(original=original).delete()
+    for arquivo in arquivos:
+        default_storage.delete(arquivo)
+    return len(arquivos)
+
+
+def originais_em_uso():
+    """Nomes de todos os arquivos de imagem referenciados por produtos e galerias."""
+    nomes = set(Produto.objects.exclude(imagem='').exclude(imagem__isnull=True).values_list('imagem', flat=True))
+    nomes.update(ImagemProduto.objects.exclude(imagem='').values_list('imagem', flat=True))
+    return nomes
@@ -0,0 +1,137 @@
+# core/services/pagina_produto.py
+"""
+Payload agregado da página de produto (/api/produtos/<id>/pagina/).
+
+Produto, galeria, primeira página de avaliações, estatísticas e relacionados
+em uma única resposta, montada com um número fixo de queries e guardada em
+cache sob os carimbos de versão do produto, das avaliações e do catálogo
+(chave 'produto_pagina' de core.services.chaves: uma alteração gera outra
+chave; nunca serve dado antigo). Dentro da mesma
+versão, a expiração é suave (core.services.cache_swr): um único processo
+remonta a página. Só o total de itens do carrinho, que é por usuário, fica
+fora do cache.
+"""
+from core.models import Avaliacao, DerivadoImagem, EstatisticaAvaliacao, MidiaAvaliacao, Produto
+from core.serializers import (
+    AvaliacaoPublicaSerializer, ImagemProdutoSerializer, ProdutoCardSerializer, ProdutoDetailSerializer,
+)
+from core.services import cache_swr, carrinho_store, catalogo, chaves
+from core.services.relacionados_service import produtos_relacionados
+
+AVALIACOES_POR_PAGINA = 10
+LIMITE_RELACIONADOS = 4
+
+# Página HTML (detalhes_produto.html)
+AVALIACOES_TEMPLATE = 5
+MIDIAS_DESTAQUE = 12
+MIDIAS_POR_AVALIACAO = 2
+
+CAMPOS_PRODUTO = [
+    'id', 'nome', 'sku', 'descricao', 'preco', 'imagem', 'imagem_url', 'imagem_srcset',
+    'estoque', 'categoria', 'status', 'peso', 'altura', 'largura', 'comprimento', 'data_criacao',
+]
+
+
+def montar_pagina(produto_id):
+    """
+    Payload compartilhado (sem dados do usuário) ou None se o produto não estiver ativo.
+    Montado sem o request: `?fields=` de um cliente não pode recortar o cache de todos.
+    """
+    produto = (
+        Produto.objects.select_related('estatistica_avaliacao')
+        .prefetch_related('imagens')
+        .filter(pk=produto_id, status='Ativo')
+        .first()
+    )
+    if produto is None:
+        return None
+
+    # srcset da imagem do produto e de toda a galeria em uma query
+    galeria = list(produto.imagens.all())
+    nomes = [arquivo.name for arquivo in [produto.imagem] + [img.imagem for img in galeria] if arquivo]
+    encontrados = DerivadoImagem.objects.srcsets(nomes)
+    contexto = {'srcsets_imagens': {nome: encontrados.get(nome, {}) for nome in nomes}}
+
+    estatisticas = produto.estatisticas_avaliacoes.como_contexto()
+    avaliacoes = list(AvaliacaoPublicaSerializer.otimizar_queryset(
+        Avaliacao.objects.filter(produto_id=produto.pk, status='aprovado').order_by('-created_at')
+    )[:AVALIACOES_POR_PAGINA + 1])
+    has_more = len(avaliacoes) > AVALIACOES_POR_PAGINA
+    avaliacoes = avaliacoes[:AVALIACOES_POR_PAGINA]
+
+    relacionados = produtos_relacionados(produto, limite=LIMITE_RELACIONADOS)
+
+    return {
+        'produto': ProdutoDetailSerializer(produto, fields=CAMPOS_PRODUTO, context=contexto).data,
+        'galeria': ImagemProdutoSerializer(galeria, many=True, context=contexto).data,
+        'estatisticas': estatisticas,
+        # Mesmo formato de /api/avaliacoes/<id>/listar/ (próximas páginas pelo cursor)
+        'avaliacoes': {
+            'avaliacoes': AvaliacaoPublicaSerializer(avaliacoes, many=True).data,
+            'pagination': {
+                'has_more': has_more,
+                'next_cursor': avaliacoes[-1].created_at.isoformat() if has_more else None,
+                'total': estatisticas['total'],
+            },
+        },
+        'relacionados': ProdutoCardSerializer(relacionados, many=True).data,
+    }
+
+
+def pagina_produto(produto_id):
+    """Payload da página (cache por versão); None se o produto não existir/estiver inativo."""
+    return cache_swr.obter(
+        chaves.montar('produto_pagina', produto_id=produto_id),
+        lambda: montar_pagina(produto_id),
+        chaves.ttl('produto_pagina'),
+    )
+
+
+def montar_contexto_avaliacoes(produto_id):
+    """Avaliações, estatísticas e mídias em destaque da página HTML, como dados simples (sem QuerySets)."""
+    avaliacoes = list(AvaliacaoPublicaSerializer.otimizar_queryset(
+        Avaliacao.objects.filter(produto_id=produto_id, status='aprovado').order_by('-created_at')
+    )[:AVALIACOES_TEMPLATE])
+    estatistica = (
+        EstatisticaAvaliacao.objects.filter(produto_id=produto_id).first()
+        or EstatisticaAvaliacao(produto_id=produto_id)
+    )
+
+    # Mídias aprovadas das avaliações mais recentes: no máximo 2 por avaliação (uma query)
+    midias, por_avaliacao = [], {}
+    for midia in (
+        MidiaAvaliacao.objects.filter(avaliacao__produto_id=produto_id, avaliacao__status='aprovado', aprovado=True)
+        .order_by('-avaliacao__created_at', 'id')[:MIDIAS_DESTAQUE * MIDIAS_POR_AVALIACAO]
+    ):
+        if len(midias) == MIDIAS_DESTAQUE:
+            break
+        if por_avaliacao.get(midia.avaliacao_id, 0) < MIDIAS_POR_AVALIACAO:
+            por_avaliacao[midia.avaliacao_id] = por_avaliacao.get(midia.avaliacao_id, 0) + 1
+            midias.append({
+                'tipo': midia.tipo,
+                'arquivo': midia.arquivo.url,
+                'thumbnail': midia.thumbnail.url if midia.thumbnail else midia.arquivo.url,
+            })
+
+    return {
+        'avaliacoes': [
+            {**dados, 'criado_em': avaliacao.created_at}
+            for avaliacao, dados in zip(avaliacoes, AvaliacaoPublicaSerializer(avaliacoes, many=True).data)
+        ],
+        'estatisticas': estatistica.como_contexto(),
+        'midias_destaque': midias,
+    }
+
+
+def contexto_avaliacoes(produto_id):
+    """Contexto de avaliações da página HTML, em cache sob a versão das avaliações do produto."""
+    return cache_swr.obter(
+        chaves.montar('avaliacoes_contexto', produto_id=produto_id),
+        lambda: montar_contexto_avaliacoes(produto_id),
+        chaves.ttl('avaliacoes_contexto'),
+    )
+
+
+def total_itens_carrinho(request):
+    """Soma das quantidades do carrinho do usuário/sessão, sem criar carrinho."""
+    return carrinho_store.do_request(request).total_itens
@@ -0,0 +1,271 @@
+# core/services/produtos_io.py
+"""
+Importação/exportação em massa de produtos (CSV e JSONL).
+
+A importação lê o arquivo linha a linha e processa em lotes: cada lote busca
+os produtos existentes por SKU em uma query, valida as linhas com os próprios
+campos do modelo e grava com bulk_update (só o que mudou) + bulk_create, em
+uma transação por lote. Linhas inválidas não derrubam o lote: vão para a
+lista de erros com o número da linha.
+
+bulk_create/bulk_update não disparam signals, então ao final o índice de
+busca dos produtos afetados é refeito e os carimbos de versão/snapshot do
+catálogo são incrementados explicitamente.
+
+A exportação é um gerador (values_list + iterator), para StreamingHttpResponse
+ou para arquivo, sem carregar a tabela em memória.
+"""
+import csv
+import io
+import json
+import logging
+from decimal import Decimal
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Estoque, Produto
+from core.search import indexar_produtos
+from core.search.indice import CAMPOS_INDEXADOS
+from core.services import catalogo, versoes
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('csv', 'jsonl')
+TAMANHO_LOTE = 1000
+MAX_ERROS = 1000    # erros guardados no relatório (o total é sempre contado)
+
+# Colunas aceitas/exportadas; 'sku' é a chave do upsert
+CAMPOS = [
+    'sku', 'nome', 'descricao', 'preco', 'estoque', 'categoria', 'status',
+    'peso', 'altura', 'largura', 'comprimento',
+]
+OBRIGATORIOS_NOVO = ('nome', 'preco')
+
+
+# ---------- leitura ----------
+def ler_jsonl(arquivo):
+    """(nº da linha, dict) de um arquivo JSONL binário; linha inválida vira erro no import."""
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError as e:
+            registro = e
+        yield numero, registro
+
+
+def ler_arquivo(arquivo, formato):
+    if formato == 'csv':
+        return ler_csv(arquivo)
+    if formato == 'jsonl':
+        return ler_jsonl(arquivo)
+    raise ValueError(f'Formato não suportado: {formato}')
+
+
+def ler_csv(arquivo):
+    """(nº da linha, dict) de um arquivo CSV binário (UTF-8, com ou sem BOM)."""
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        leitor = csv.DictReader(texto)
+        for registro in leitor:
+            yield leitor.line_num, registro
+    finally:
+        texto.detach()
+
+
+def formato_do_nome(nome):
+    """'csv' ou 'jsonl' pela extensão do arquivo (None se desconhecida)."""
+    extensao = nome.rsplit('.', 1)[-1].lower() if '.' in nome else ''
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extensao)
+
+
+# ---------- validação ----------
+def validar_linha(registro):
+    """
+    (sku, valores limpos) de um registro. Células vazias/ausentes são ignoradas
+    (o valor atual, ou o padrão do modelo, é mantido). Levanta ValidationError.
+    """
+    if not isinstance(registro, dict):
+        raise ValidationError(f'Linha inválida: {registro}')
+
+    desconhecidas = set(registro) - set(CAMPOS) - {None}
+    if desconhecidas:
+        raise ValidationError(f"Colunas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    sku = str(registro.get('sku') or '').strip()
+    if not sku:
+        raise ValidationError('SKU obrigatório')
+
+    valores, erros = {}, []
+    for campo in CAMPOS[1:]:
+        bruto = registro.get(campo)
+        if bruto is None or (isinstance(bruto, str) and not bruto.strip()):
+            continue
+        if isinstance(bruto, str):
+            bruto = bruto.strip()
+        elif isinstance(bruto, float):
+            bruto = str(bruto)   # evita o arredondamento binário no DecimalField
+        try:
+            valores[campo] = Produto._meta.get_field(campo).clean(bruto, None)
+        except ValidationError as e:
+            erros.append(f"{campo}: {' '.join(e.messages)}")
+    Produto._meta.get_field('sku').run_validators(sku)
+    if erros:
+        raise ValidationError('; '.join(erros))
+    return sku, valores
+
+
+# ---------- importação ----------
+def _lotes(iteravel, tamanho):
+    iterador = iter(iteravel)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _registrar_erro(relatorio, linha, sku, erro):
+    relatorio['total_erros'] += 1
+    if len(relatorio['erros']) < MAX_ERROS:
+        relatorio['erros'].append({'linha': linha, 'sku': sku, 'erro': erro})
+
+
+def _gravar_lote(validos, relatorio, dry_run):
+    """Upsert de um lote {sku: (linha, valores)}. Retorna (ids alterados, ids a reindexar)."""
+    existentes = Produto.objects.in_bulk(list(validos), field_name='sku')
+    alterados, novos, campos_alterados = [], [], set()
+    estoque_alterado = {}
+    reindexar = set()
+
+    for sku, (linha, valores) in validos.items():
+        produto = existentes.get(sku)
+        if produto is None:
+            faltando = [c for c in OBRIGATORIOS_NOVO if c not in valores]
+            if faltando:
+                _registrar_erro(relatorio, linha, sku, f"Produto novo sem {', '.join(faltando)}")
+                continue
+            novos.append(Produto(sku=sku, **valores))
+            continue
+
+        mudou = {c for c, v in valores.items() if getattr(produto, c) != v}
+        if not mudou:
+            relatorio['inalterados'] += 1
+            continue
+        for campo in mudou:
+            setattr(produto, campo, valores[campo])
+        alterados.append(produto)
+        campos_alterados |= mudou
+        if 'estoque' in mudou:
+            estoque_alterado[produto.pk] = produto.estoque
+        if mudou & CAMPOS_INDEXADOS:
+            reindexar.add(produto.pk)
+
+    if dry_run:
+        relatorio['criados'] += len(novos)
+        relatorio['atualizados'] += len(alterados)
+        return set(), set()
+
+    with transaction.atomic():
+        if alterados:
+            Produto.objects.bulk_update(alterados, sorted(campos_alterados))
+        if novos:
+            Produto.objects.bulk_create(novos)
+        if estoque_alterado:
+            # Estoque é a fonte de verdade das movimentações: acompanha o valor importado
+            agora = timezone.now()
+            registros = list(Estoque.objects.filter(produto_id__in=estoque_alterado))
+            for registro in registros:
+                registro.quantidade = estoque_alterado[registro.produto_id]
+                registro.atualizado_em = agora
+            Estoque.objects.bulk_update(registros, ['quantidade', 'atualizado_em'])
+
+    # Nem todo backend devolve as PKs no bulk_create
+    ids_novos = set(
+        Produto.objects.filter(sku__in=[p.sku for p in novos]).values_list('id', flat=True)
+    ) if novos else set()
+    relatorio['criados'] += len(novos)
+    relatorio['atualizados'] += len(alterados)
+    return {p.pk for p in alterados} | ids_novos, reindexar | ids_novos
+
+
+def importar_produtos(linhas, tamanho_lote=None, progresso=None, dry_run=False):
+    """
+    Upsert por SKU a partir de (nº da linha, dict). Processa `tamanho_lote`
+    linhas por vez; `progresso(relatorio)` é chamado após cada lote.
+    Em SKU repetido no mesmo lote, as colunas da última linha prevalecem.
+    """
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE
+    relatorio = {
+        'lidas': 0, 'criados': 0, 'atualizados': 0, 'inalterados': 0,
+        'total_erros': 0, 'erros': [], 'dry_run': dry_run,
+    }
+    alterados, reindexar = set(), set()
+
+    for lote in _lotes(linhas, tamanho_lote):
+        validos = {}
+        for linha, registro in lote:
+            relatorio['lidas'] += 1
+            try:
+                sku, valores = validar_linha(registro)
+            except ValidationError as e:
+                sku = registro.get('sku') if isinstance(registro, dict) else None
+                _registrar_erro(relatorio, linha, sku, '; '.join(e.messages))
+                continue
+            anteriores = validos[sku][1] if sku in validos else {}
+            validos[sku] = (linha, {**anteriores, **valores})
+
+        if validos:
+            ids, ids_indice = _gravar_lote(validos, relatorio, dry_run)
+            alterados |= ids
+            reindexar |= ids_indice
+        if progresso:
+            progresso(relatorio)
+
+    if alterados:
+        indexar_produtos(reindexar)
+        catalogo.incrementar_versao_catalogo()
+        versoes.produtos_alterados(alterados)
+
+    logger.info(
+        f"Importação de produtos{' (dry-run)' if dry_run else ''}: {relatorio['lidas']} linhas, "
+        f"{relatorio['criados']} criados, {relatorio['atualizados']} atualizados, "
+        f"{relatorio['total_erros']} erros"
+    )
+    return relatorio
+
+
+# ---------- exportação ----------
+class _Eco:
+    """Pseudo-arquivo para o csv.writer devolver a linha em vez de gravá-la."""
+    def write(self, valor):
+        return valor
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    return str(valor)
+
+
+def exportar_produtos(formato='csv', queryset=None, chunk_size=2000):
+    """Gerador de linhas (str) do arquivo de exportação, em ordem de id."""
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato não suportado: {formato}')
+    queryset = Produto.objects.all() if queryset is None else queryset
+    linhas = queryset.order_by('id').values_list(*CAMPOS).iterator(chunk_size=chunk_size)
+
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield '\ufeff' + escritor.writerow(CAMPOS)   # BOM: Excel abre como UTF-8
+        for linha in linhas:
+            yield escritor.writerow([_texto(v) for v in linha])
+    else:
+        for linha in linhas:
+            registro = {c: (str(v) if isinstance(v, Decimal) else v) for c, v in zip(CAMPOS, linha)}
+            yield json.dumps(registro, ensure_ascii=False) + '\n'
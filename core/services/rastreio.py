@@ -0,0 +1,144 @@
+# core/services/rastreio.py
+"""
+Rastreio dos caminhos quentes (substitui os print() de debug).
+
+Pontos de rastreio nomeados:
+
+    @rastrear('admin.index')
+    def admin_index(request): ...
+
+    with span('serializer.galeria_imagens', produto=obj.pk) as s:
+        ...
+        s.anotar(imagens=len(imagens))
+
+Desligado (padrão), `rastrear` devolve a própria função e `span` devolve um
+span nulo compartilhado: nada é medido, alocado ou escrito. Ligado
+(RASTREIO_CONFIG['ATIVO']), cada span registra duração, nº de queries (as
+internas contam também no span de fora) e atributos em um buffer circular
+do processo, visível aos admins em /admin-panel/rastreio/.
+
+A decisão é tomada na importação do módulo: mudar ATIVO exige reiniciar os
+workers. O buffer é por processo (cada worker do gunicorn tem o seu).
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+_CONFIG_PADRAO = {
+    'ATIVO': False,
+    'TAMANHO_BUFFER': 500,      # spans guardados por processo (os mais antigos saem)
+}
+
+
+def config(chave):
+    return getattr(settings, 'RASTREIO_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+ATIVO = bool(config('ATIVO'))
+
+_buffer = deque(maxlen=config('TAMANHO_BUFFER'))
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def anotar(self, **atributos):
+        pass
+
+
+_NULO = _SpanNulo()
+
+
+class _Span:
+    __slots__ = ('nome', 'atributos', 'id', 'pai', 'queries', 'inicio', '_contador')
+
+    def __init__(self, nome, atributos):
+        self.nome = nome
+        self.atributos = atributos
+
+    def _contar(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def anotar(self, **atributos):
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        pilha = _pilha()
+        self.pai = pilha[-1].id if pilha else None
+        self.id = next(_ids)
+        self.queries = 0
+        pilha.append(self)
+        self._contador = connection.execute_wrapper(self._contar)
+        self._contador.__enter__()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        duracao = time.perf_counter() - self.inicio
+        self._contador.__exit__(tipo, valor, tb)
+        _pilha().pop()
+        _buffer.append({
+            'id': self.id,
+            'pai': self.pai,
+            'nome': self.nome,
+            'em': time.time(),
+            'duracao_ms': round(duracao * 1000, 3),
+            'queries': self.queries,
+            'atributos': self.atributos,
+            'erro': repr(valor) if valor is not None else None,
+            'pid': os.getpid(),
+            'thread': threading.get_ident(),
+        })
+        return False
+
+
+def _pilha():
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+if ATIVO:
+    def span(nome, **atributos):
+        return _Span(nome, atributos)
+
+    def rastrear(nome):
+        def decorator(funcao):
+            @wraps(funcao)
+            def wrapper(*args, **kwargs):
+                with _Span(nome, {}):
+                    return funcao(*args, **kwargs)
+            return wrapper
+        return decorator
+else:
+    def span(nome, **atributos):
+        return _NULO
+
+    def rastrear(nome):
+        return lambda funcao: funcao
+
+
+def spans(nome=None, limite=None):
+    """Spans registrados neste processo, do mais recente ao mais antigo (filtro por prefixo do nome)."""
+    registros = [s for s in reversed(_buffer) if nome is None or s['nome'].startswith(nome)]
+    return registros[:limite] if limite else registros
+
+
+def limpar():
+    _buffer.clear()
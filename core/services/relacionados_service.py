@@ -0,0 +1,154 @@
+# core/services/relacionados_service.py
+"""
+Produtos relacionados por co-compra ("quem comprou também comprou").
+
+Job offline: monta a matriz cesta x produto a partir de ItemPedido, calcula a
+co-ocorrência C = Bᵀ·B (esparsa) e guarda os top-K vizinhos de cada produto
+em ProdutoRelacionado. A página de produto só faz uma leitura por PK.
+
+Score: co-ocorrência normalizada pelo cosseno, c_ij / sqrt(n_i · n_j), para
+que produtos muito vendidos não apareçam como "relacionados" de tudo.
+Usa NumPy/SciPy quando instalados; caso contrário, contagem em Python puro.
+"""
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ItemPedido, ProdutoRelacionado
+from core.services import catalogo, versoes
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # dependências opcionais
+    np = sparse = None
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_PADRAO = {
+    'TOP_K': 12,
+    'MAX_ITENS_CESTA': 50,   # cestas maiores (atacado) distorcem a co-ocorrência
+    'JANELA_DIAS': 365,
+    'STATUS_IGNORADOS': ('Cancelado',),
+}
+
+
+def config(chave):
+    return getattr(settings, 'RELACIONADOS_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+def _cestas():
+    """Lista de cestas (listas de produto_id distintos) dos pedidos da janela."""
+    desde = timezone.now() - timedelta(days=config('JANELA_DIAS'))
+    linhas = (
+        ItemPedido.objects
+        .filter(pedido__criado_em__gte=desde)
+        .exclude(pedido__status__nome__in=config('STATUS_IGNORADOS'))
+        .order_by('pedido_id')
+        .values_list('pedido_id', 'produto_id')
+    )
+    maximo = config('MAX_ITENS_CESTA')
+    cestas = []
+    pedido_atual, cesta = None, set()
+    for pedido_id, produto_id in linhas.iterator(chunk_size=5000):
+        if pedido_id != pedido_atual:
+            if 1 < len(cesta) <= maximo:
+                cestas.append(list(cesta))
+            pedido_atual, cesta = pedido_id, set()
+        cesta.add(produto_id)
+    if 1 < len(cesta) <= maximo:
+        cestas.append(list(cesta))
+    return cestas
+
+
+def _vizinhos_numpy(cestas, top_k):
+    """Co-ocorrência vetorizada com matriz esparsa (SciPy)."""
+    itens = np.fromiter((pk for cesta in cestas for pk in cesta), dtype=np.int64)
+    produtos, colunas = np.unique(itens, return_inverse=True)
+    linhas = np.repeat(np.arange(len(cestas)), [len(cesta) for cesta in cestas])
+    cesta_produto = sparse.csr_matrix(
+        (np.ones(len(colunas), dtype=np.float32), (linhas, colunas)),
+        shape=(len(cestas), len(produtos)),
+    )
+    co = (cesta_produto.T @ cesta_produto).tocsr()
+    frequencias = co.diagonal().copy()
+    co.setdiag(0)
+    co.eliminate_zeros()
+
+    resultado = {}
+    for i in range(co.shape[0]):
+        inicio, fim = co.indptr[i], co.indptr[i + 1]
+        if inicio == fim:
+            continue
+        indices = co.indices[inicio:fim]
+        scores = co.data[inicio:fim] / np.sqrt(frequencias[i] * frequencias[indices])
+        k = min(top_k, len(indices))
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.lexsort((produtos[indices[melhores]], -scores[melhores]))]
+        resultado[int(produtos[i])] = [int(pk) for pk in produtos[indices[melhores]]]
+    return resultado
+
+
+def _vizinhos_python(cestas, top_k):
+    """Mesma conta em Python puro (fallback sem NumPy/SciPy)."""
+    frequencias = Counter()
+    co = defaultdict(Counter)
+    for cesta in cestas:
+        frequencias.update(cesta)
+        for a in cesta:
+            for b in cesta:
+                if a != b:
+                    co[a][b] += 1
+
+    resultado = {}
+    for produto_id, vizinhos in co.items():
+        scores = (
+            (c / math.sqrt(frequencias[produto_id] * frequencias[outro]), outro)
+            for outro, c in vizinhos.items()
+        )
+        melhores = nlargest(top_k, scores, key=lambda item: (item[0], -item[1]))
+        resultado[produto_id] = [outro for _, outro in melhores]
+    return resultado
+
+
+def calcular_relacionados(top_k=None):
+    """Recalcula e persiste os vizinhos de todos os produtos. Retorna o nº de produtos."""
+    top_k = top_k or config('TOP_K')
+    cestas = _cestas()
+    if np is not None and cestas:
+        vizinhos = _vizinhos_numpy(cestas, top_k)
+    else:
+        vizinhos = _vizinhos_python(cestas, top_k)
+
+    registros = [ProdutoRelacionado(produto_id=pk, vizinhos=ids) for pk, ids in vizinhos.items()]
+    with transaction.atomic():
+        ProdutoRelacionado.objects.all().delete()
+        ProdutoRelacionado.objects.bulk_create(registros, batch_size=500)
+        # Fragmentos e páginas em cache que mostram relacionados
+        transaction.on_commit(lambda: versoes.incrementar('relacionados'))
+
+    logger.info(f"Produtos relacionados recalculados: {len(registros)} produtos, {len(cestas)} cestas "
+                f"({'numpy' if np is not None else 'python'})")
+    return len(registros)
+
+
+def produtos_relacionados(produto, limite=4):
+    """
+    Vizinhos de co-compra ativos do produto (1 leitura por PK; produtos vêm do
+    snapshot do catálogo). Completa com produtos da mesma categoria enquanto não
+    houver histórico suficiente.
+    """
+    ids = ProdutoRelacionado.objects.filter(pk=produto.pk).values_list('vizinhos', flat=True).first() or []
+    snapshot = catalogo.catalogo()
+    relacionados = snapshot.obter(ids)[:limite]
+
+    if len(relacionados) < limite:
+        excluir = {produto.pk} | {p.pk for p in relacionados}
+        relacionados += snapshot.da_categoria(produto.categoria, limite - len(relacionados), excluir)
+    return catalogo.com_estoque_atual(relacionados, snapshot)
@@ -0,0 +1,82 @@
+# core/services/versoes.py
+"""
+Carimbos de versão baratos (contadores no cache) para GET condicional.
+
+Cada escopo guarda um contador e o instante da última alteração:
+- 'produtos' / 'avaliacoes': qualquer produto / qualquer avaliação mudou;
+- ('produto', id) / ('avaliacoes', id): um produto específico / as avaliações dele;
+- 'produtos_lote': importações grandes, que valem para todos os ('produto', id);
+- 'relacionados': recálculo dos produtos relacionados (job offline);
+- ('cache_produto', id): namespace de todos os caches derivados do produto
+  (core.services.chaves.invalidar_produto).
+
+Qualquer (escopo, id) funciona: o contador é criado na primeira leitura.
+
+Os signals incrementam os contadores após o commit; as views só fazem um
+get_many para montar ETag/Last-Modified. Um contador ausente (cache limpo)
+recomeça de um valor baseado no relógio, para nunca repetir uma versão antiga.
+"""
+import time
+
+from django.core.cache import cache
+
+PREFIXO = 'versao_'
+LOTE_PRODUTOS = 'produtos_lote'
+LIMITE_INDIVIDUAL = 1000
+
+
+def chave(escopo, produto_id=None):
+    return f'{PREFIXO}{escopo}' if produto_id is None else f'{PREFIXO}{escopo}_{produto_id}'
+
+
+def _chaves(escopos):
+    return [chave(*e) if isinstance(e, tuple) else chave(e) for e in escopos]
+
+
+def carimbo(*escopos):
+    """
+    (versões, última alteração em segundos) dos escopos com um único get_many;
+    escopos sem contador são inicializados.
+    """
+    if any(isinstance(e, tuple) and e[0] == 'produto' for e in escopos):
+        # Cargas grandes incrementam só o contador de lote, que vale para todo produto
+        escopos += (LOTE_PRODUTOS,)
+    chaves = _chaves(escopos)
+    valores = cache.get_many(chaves + [f'{c}_em' for c in chaves])
+    faltando = [c for c in chaves if c not in valores or f'{c}_em' not in valores]
+    if faltando:
+        agora = time.time()
+        for c in faltando:
+            cache.add(c, int(agora * 1000), None)
+            cache.add(f'{c}_em', agora, None)
+        valores.update(cache.get_many(faltando + [f'{c}_em' for c in faltando]))
+    versoes = tuple(valores.get(c, 0) for c in chaves)
+    ultima = max(valores.get(f'{c}_em', 0) for c in chaves)
+    return versoes, ultima
+
+
+def incrementar(*escopos):
+    agora = time.time()
+    for c in _chaves(escopos):
+        try:
+            cache.incr(c)
+        except ValueError:
+            cache.add(c, int(agora * 1000), None)
+        cache.set(f'{c}_em', agora, None)
+
+
+def produto_alterado(produto_id):
+    incrementar('produtos', ('produto', produto_id))
+
+
+def produtos_alterados(produto_ids):
+    """Cargas em lote: poucos produtos incrementam um a um; muitos, o contador de lote."""
+    produto_ids = list(produto_ids)
+    if len(produto_ids) <= LIMITE_INDIVIDUAL:
+        incrementar('produtos', *[('produto', pk) for pk in produto_ids])
+    else:
+        incrementar('produtos', LOTE_PRODUTOS)
+
+
+def avaliacoes_alteradas(produto_id):
+    incrementar('avaliacoes', ('avaliacoes', produto_id))
@@ -1,12 +1,21 @@
 # core/signals.py
-from django.db.models.signals import post_save, post_delete
+import logging
+
+from django.db.models.signals import post_save, post_delete, post_init
 from django.dispatch import receiver
+from django.db import transaction
 from django.db.models import F
 
-from core.models import Avaliacao, MidiaAvaliacao
+from core.models import Avaliacao, MidiaAvaliacao, EstatisticaAvaliacao, ItemPedido, ImagemProduto
 from core.models.inventory import Estoque, MovimentacaoEstoque
 from core.models.produto import Produto
 from core.tasks.avaliacao_tasks import processar_midia_avaliacao, processar_moderacao_avaliacao
+from core.tasks.imagem_tasks import gerar_derivados_imagem, remover_derivados_imagem
+from core.search import indice as indice_busca
+from core.services import destaque_service
+from core.services import catalogo, chaves, versoes
+
+logger = logging.getLogger(__name__)
 
 def atualizar_estoque_cache(produto: Produto):
     """
@@ -69,10 +78,7 @@ def disparar_moderacao_avaliacao(sender, instance, created, **kwargs):
     # Só dispara para avaliações pendentes (que ainda não foram moderadas)
     if instance.status == 'pendente':
         processar_moderacao_avaliacao.delay(instance.id)
-        # Log para debug
-        from django.conf import settings
-        if settings.DEBUG:
-            print(f"[SIGNAL] Task de moderação disparada para avaliação {instance.id}")
+        logger.debug(f"Task de moderação disparada para avaliação {instance.id}")
 
 
 @receiver(post_save, sender=MidiaAvaliacao)
@@ -83,33 +89,199 @@ def disparar_processamento_midia(sender, instance, created, **kwargs):
     # Só processa se ainda não foi aprovada/rejeitada
     if not instance.aprovado and instance.motivo_rejeicao is None:
         processar_midia_avaliacao.delay(instance.id)
-        # Log para debug
-        from django.conf import settings
-        if settings.DEBUG:
-            print(f"[SIGNAL] Task de mídia disparada para mídia {instance.id}")
+        logger.debug(f"Task de mídia disparada para mídia {instance.id}")
 
 
 # =============================
-# Signal para invalidar cache de estatísticas
+# Signals para os agregados denormalizados (EstatisticaAvaliacao)
 # =============================
+@receiver(post_init, sender=Avaliacao)
+def guardar_estado_avaliacao(sender, instance, **kwargs):
+    """
+    Estado carregado do banco, base do delta no post_save/post_delete.
+    Avaliacao.save()/delete() o substituem pelo estado relido com a linha
+    travada; este só vale para deleções em massa (cascata, queryset.delete()).
+    """
+    instance._estado_estatisticas = instance.estado_estatisticas() if instance.pk else None
+
+
 @receiver(post_save, sender=Avaliacao)
+def atualizar_estatisticas_avaliacao(sender, instance, created, **kwargs):
+    """Aplica apenas a diferença (status/nota/recomendação) com UPDATE ... F()"""
+    antes = None if created else getattr(instance, '_estado_estatisticas', None)
+    depois = instance.estado_estatisticas()
+    if antes != depois:
+        EstatisticaAvaliacao.registrar_mudanca(instance, antes, depois)
+    instance._estado_estatisticas = depois
+
+
 @receiver(post_delete, sender=Avaliacao)
-def invalidar_cache_estatisticas(sender, instance, **kwargs):
+def remover_estatisticas_avaliacao(sender, instance, **kwargs):
+    EstatisticaAvaliacao.registrar_mudanca(instance, getattr(instance, '_estado_estatisticas', None), None)
+
+
+def _ajustar_com_midia(midia, delta):
     """
-    Invalida o cache de estatísticas quando uma avaliação é alterada
+    com_midia conta as avaliações aprovadas com pelo menos uma mídia aprovada:
+    muda só quando a primeira mídia aprovada entra ou a última sai.
     """
-    from django.core.cache import cache
-    from core.models.avaliacoes import Avaliacao
-    
-    # Invalida cache específico do produto
-    cache_key = f"avaliacao_stats_prod_{instance.produto_id}"
-    cache.delete(cache_key)
-    
-    # Opcional: recalcula as estatísticas em background
-    try:
-        Avaliacao.objects.recalc_cache_for_produto(instance.produto_id)
-    except Exception as e:
-        # Fail silently em produção, log em debug
-        from django.conf import settings
-        if settings.DEBUG:
-            print(f"[SIGNAL] Erro ao recalcular cache: {e}")
\ No newline at end of file
+    travada = midia.__dict__.pop('_avaliacao_travada', None)
+    if travada is None:
+        # Deleção em massa/cascata: sem a trava de MidiaAvaliacao.delete()
+        travada = Avaliacao.objects.filter(pk=midia.avaliacao_id).values_list('produto_id', 'status').first()
+    if not travada or travada[1] != 'aprovado':
+        return
+    outras = MidiaAvaliacao.objects.aprovadas().filter(avaliacao_id=midia.avaliacao_id).exclude(pk=midia.pk)
+    if not outras.exists():
+        EstatisticaAvaliacao.aplicar_delta(travada[0], {'com_midia': delta})
+
+
+@receiver(post_save, sender=MidiaAvaliacao)
+def contar_midia_avaliacao(sender, instance, **kwargs):
+    """Mídia aprovada ou reprovada (MidiaAvaliacao.save trava a avaliação: uma mídia por vez)"""
+    antes = getattr(instance, '_aprovada_antes', False)
+    instance._aprovada_antes = bool(instance.aprovado)
+    if instance._aprovada_antes != antes:
+        _ajustar_com_midia(instance, 1 if instance.aprovado else -1)
+
+
+@receiver(post_delete, sender=MidiaAvaliacao)
+def descontar_midia_avaliacao(sender, instance, origin=None, **kwargs):
+    """Última mídia aprovada removida de uma avaliação aprovada sai de com_midia"""
+    if not getattr(instance, '_aprovada_antes', instance.aprovado):
+        return
+    # Em massa/cascata todas as mídias já saíram antes dos signals: desconta
+    # cada avaliação uma vez por deleção
+    descontadas = getattr(origin, '_com_midia_descontadas', None)
+    if descontadas is None:
+        descontadas = set()
+        if origin is not None:
+            origin._com_midia_descontadas = descontadas
+    if instance.avaliacao_id not in descontadas:
+        descontadas.add(instance.avaliacao_id)
+        _ajustar_com_midia(instance, -1)
+
+
+# =============================
+# Signals para o índice de busca de produtos
+# =============================
+@receiver(post_save, sender=Produto)
+def atualizar_indice_busca(sender, instance, update_fields=None, **kwargs):
+    """
+    Reindexa o produto após o commit. Saves parciais que não tocam campos
+    indexados (ex.: update_fields=['estoque']) não reindexam.
+    """
+    if update_fields is not None and not indice_busca.CAMPOS_INDEXADOS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: indice_busca.indexar_produto(instance))
+
+
+@receiver(post_delete, sender=Produto)
+def remover_indice_busca(sender, instance, **kwargs):
+    """O CASCADE já remove o documento; só invalida as estruturas derivadas."""
+    transaction.on_commit(indice_busca.incrementar_versao)
+
+
+# =============================
+# Signals para o snapshot do catálogo em memória
+# =============================
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=ImagemProduto)
+@receiver(post_delete, sender=ImagemProduto)
+def invalidar_snapshot_catalogo(sender, instance, update_fields=None, **kwargs):
+    """
+    Incrementa a versão do catálogo; cada worker recarrega o snapshot na
+    próxima leitura. Vendas e movimentações (save só do estoque) não
+    recarregam: o estoque novo é sobreposto ao snapshot (catalogo.estoque_alterado).
+    """
+    if sender is Produto and kwargs.get('signal') is post_save:
+        produto_id, estoque = instance.pk, instance.estoque
+        transaction.on_commit(lambda: catalogo.estoque_alterado(produto_id, estoque))
+        if update_fields is not None and set(update_fields) <= {'estoque'}:
+            return
+    transaction.on_commit(catalogo.incrementar_versao_catalogo)
+
+
+# =============================
+# Signals para os carimbos de versão (ETag/Last-Modified das APIs)
+# =============================
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=ImagemProduto)
+@receiver(post_delete, sender=ImagemProduto)
+def incrementar_versao_produto(sender, instance, **kwargs):
+    produto_id = instance.pk if sender is Produto else instance.produto_id
+    transaction.on_commit(lambda: versoes.produto_alterado(produto_id))
+
+
+@receiver(post_delete, sender=Produto)
+def invalidar_caches_produto(sender, instance, **kwargs):
+    """Produto removido: tudo o que deriva dele (estatísticas, contextos, fragmentos) sai de uma vez"""
+    produto_id = instance.pk
+    transaction.on_commit(lambda: chaves.invalidar_produto(produto_id))
+
+
+@receiver(post_save, sender=Avaliacao)
+@receiver(post_delete, sender=Avaliacao)
+def incrementar_versao_avaliacoes(sender, instance, **kwargs):
+    produto_id = instance.produto_id
+    transaction.on_commit(lambda: versoes.avaliacoes_alteradas(produto_id))
+
+
+@receiver(post_save, sender=MidiaAvaliacao)
+@receiver(post_delete, sender=MidiaAvaliacao)
+def incrementar_versao_midias_avaliacao(sender, instance, **kwargs):
+    avaliacao_id = instance.avaliacao_id
+
+    def incrementar():
+        produto_id = Avaliacao.objects.filter(pk=avaliacao_id).values_list('produto_id', flat=True).first()
+        if produto_id:
+            versoes.avaliacoes_alteradas(produto_id)
+    transaction.on_commit(incrementar)
+
+
+# =============================
+# Signals para os derivados responsivos das imagens (srcset)
+# =============================
+@receiver(post_init, sender=Produto)
+@receiver(post_init, sender=ImagemProduto)
+def guardar_imagem_original(sender, instance, **kwargs):
+    """Guarda o nome do arquivo carregado do banco (campos adiados ficam de fora)"""
+    valor = instance.__dict__.get('imagem') if instance.pk else None
+    instance._imagem_original = getattr(valor, 'name', valor) or None
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=ImagemProduto)
+def agendar_derivados_imagem(sender, instance, update_fields=None, **kwargs):
+    """Gera os derivados quando a imagem é enviada/trocada; remove os da imagem anterior"""
+    if update_fields is not None and 'imagem' not in update_fields:
+        return
+    nome = instance.imagem.name if instance.imagem else None
+    anterior = getattr(instance, '_imagem_original', None)
+    if nome == anterior:
+        return
+    instance._imagem_original = nome
+    if nome:
+        transaction.on_commit(lambda: gerar_derivados_imagem.delay(nome))
+    if anterior:
+        transaction.on_commit(lambda: remover_derivados_imagem.delay(anterior))
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=ImagemProduto)
+def remover_derivados_apagados(sender, instance, **kwargs):
+    if instance.imagem:
+        nome = instance.imagem.name
+        transaction.on_commit(lambda: remover_derivados_imagem.delay(nome))
+
+
+# =============================
+# Signal para o ranking de destaque (velocidade de vendas)
+# =============================
+@receiver(post_save, sender=ItemPedido)
+def registrar_venda_destaque(sender, instance, created, **kwargs):
+    """Soma a venda no contador com decaimento do produto (UPDATE com F())"""
+    if created:
+        transaction.on_commit(lambda: destaque_service.registrar_venda(instance.produto_id, instance.quantidade))
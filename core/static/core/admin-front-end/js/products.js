@@ -520,7 +520,7 @@ async function deleteGalleryImage(imageId) {
 async function fetchProdutos(tipo) {
     try {
         console.log(`🔍 Buscando produtos do tipo: ${tipo}`);
-        const response = await fetch('/api/produtos/', { credentials: 'include' });
+        const response = await fetch('/api/produtos/?modo=completo', { credentials: 'include' });
         if (!response.ok) throw new Error('Erro ao buscar produtos');
 
         const data = await response.json();
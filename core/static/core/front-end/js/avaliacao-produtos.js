@@ -247,7 +247,7 @@ class AvaliacoesManager {
                                 <div class="flex text-yellow-400 mr-2">
                                     ${this.renderStars(avaliacao.nota_geral || 0)}
                                 </div>
-                                <span>• ${avaliacao.tempo_decorrido || 'Recentemente'}</span>
+                                <span>• ${this.formatarData(avaliacao.publicado_em)}</span>
                             </div>
                         </div>
                     </div>
@@ -322,6 +322,11 @@ class AvaliacoesManager {
         `;
     }
 
+    formatarData(iso) {
+        // Data absoluta, como no template: a resposta fica em cache sob a ETag
+        return iso ? new Date(iso).toLocaleDateString('pt-BR') : 'Recentemente';
+    }
+
     renderStars(rating) {
         let stars = '';
         for (let i = 1; i <= 5; i++) {
@@ -4,10 +4,16 @@ from .avaliacao_tasks import (
     processar_midia_avaliacao,
     limpar_avaliacoes_temporarias
 )
+from .recomendacao_tasks import recalcular_produtos_relacionados, materializar_ranking_destaque
+from .imagem_tasks import gerar_derivados_imagem, remover_derivados_imagem
 
 # Exportação explícita para melhor discoverability
 __all__ = [
     'processar_moderacao_avaliacao',
     'processar_midia_avaliacao',
     'limpar_avaliacoes_temporarias',
+    'recalcular_produtos_relacionados',
+    'materializar_ranking_destaque',
+    'gerar_derivados_imagem',
+    'remover_derivados_imagem',
 ]
\ No newline at end of file
@@ -0,0 +1,30 @@
+# core/tasks/imagem_tasks.py
+import logging
+
+from celery import shared_task
+
+from core.services import imagens_service
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def gerar_derivados_imagem(nome_original):
+    """Gera as versões responsivas (larguras fixas, AVIF/WebP/JPEG) de uma imagem enviada"""
+    try:
+        return {'derivados': imagens_service.processar_imagem(nome_original)}
+    except FileNotFoundError:
+        logger.warning(f"Imagem {nome_original} não encontrada no storage para gerar derivados")
+    except Exception as e:
+        logger.error(f"Erro ao gerar derivados de {nome_original}: {str(e)}")
+        raise
+
+
+@shared_task
+def remover_derivados_imagem(nome_original):
+    """Remove os derivados de uma imagem que deixou de ser usada"""
+    try:
+        return {'removidos': imagens_service.remover_derivados(nome_original)}
+    except Exception as e:
+        logger.error(f"Erro ao remover derivados de {nome_original}: {str(e)}")
+        raise
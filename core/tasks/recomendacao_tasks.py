@@ -0,0 +1,30 @@
+# core/tasks/recomendacao_tasks.py
+import logging
+
+from celery import shared_task
+
+from core.services.relacionados_service import calcular_relacionados
+from core.services.destaque_service import materializar_ranking
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def recalcular_produtos_relacionados():
+    """Reconstrói a tabela de produtos relacionados (co-compra) - job periódico"""
+    try:
+        total = calcular_relacionados()
+        return {'produtos': total}
+    except Exception as e:
+        logger.error(f"Erro ao recalcular produtos relacionados: {str(e)}")
+        raise
+
+
+@shared_task
+def materializar_ranking_destaque():
+    """Descarrega visualizações e recalcula a lista de destaques em cache"""
+    try:
+        return {'produtos': len(materializar_ranking())}
+    except Exception as e:
+        logger.error(f"Erro ao materializar ranking de destaque: {str(e)}")
+        raise
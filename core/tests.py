@@ -1,3 +1,217 @@
-from django.test import TestCase
+import json
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+
+from core.models import Avaliacao, EstatisticaAvaliacao, ItemCarrinho, MidiaAvaliacao, Produto, User
+from core.search import facetas, indice
+
+# Sem Redis: caches em memória; carrinho de visitante e visualizações no cache do Django
+CACHES_TESTE = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'session', 'ratelimit')
+}
+
+
+@override_settings(
+    CACHES=CACHES_TESTE,
+    CARRINHO_CONFIG={'ARMAZENAMENTO_ANONIMO': 'cache'},
+    DESTAQUE_CONFIG={'ARMAZENAMENTO_VISUALIZACOES': 'cache'},
+    BUSCA_CONFIG={'RECONSTRUIR_EM_SEGUNDO_PLANO': False},
+)
+class BaseTeste(TestCase):
+    def setUp(self):
+        for alias in CACHES_TESTE:
+            caches[alias].clear()
+
+    def criar_produto(self, nome, estoque=10, **campos):
+        return Produto.objects.create(nome=nome, preco=Decimal('10.00'), estoque=estoque, **campos)
+
+
+class CarrinhoTeste(BaseTeste):
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user(email='cliente@teste.com', password='senha123')
+
+    def adicionar(self, client, produto):
+        return client.post(f'/adicionar_carrinho/{produto.pk}/', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def lote(self, client, operacoes):
+        return client.post(
+            '/api/carrinho/batch/', json.dumps({'operacoes': operacoes}), content_type='application/json'
+        )
+
+    def clientes(self):
+        logado = Client()
+        logado.force_login(self.usuario)
+        return (('visitante', Client()), ('logado', logado))
+
+    def test_adicionar_alem_do_estoque(self):
+        for nome, client in self.clientes():
+            with self.subTest(nome):
+                produto = self.criar_produto(f'Cera {nome}', estoque=1)
+                self.assertEqual(self.adicionar(client, produto).status_code, 200)
+
+                resposta = self.adicionar(client, produto)
+                self.assertEqual(resposta.status_code, 400)
+                self.assertEqual(resposta.json()['error'], 'Estoque insuficiente')
+                self.assertEqual(client.get('/carrinho-json/').json()['total_itens'], 1)
+
+    def test_lote_falha_inteiro(self):
+        for nome, client in self.clientes():
+            with self.subTest(nome):
+                cera = self.criar_produto(f'Cera {nome}', estoque=5)
+                flanela = self.criar_produto(f'Flanela {nome}', estoque=5)
+                self.assertEqual(self.lote(client, [
+                    {'op': 'adicionar', 'produto_id': cera.pk, 'quantidade': 1},
+                    {'op': 'adicionar', 'produto_id': flanela.pk, 'quantidade': 1},
+                ]).status_code, 200)
+
+                resposta = self.lote(client, [
+                    {'op': 'adicionar', 'produto_id': cera.pk, 'quantidade': 2},
+                    {'op': 'adicionar', 'produto_id': flanela.pk, 'quantidade': 10},
+                ])
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('Estoque insuficiente', resposta.json()['error'])
+                # Nada do lote foi aplicado, nem a operação válida
+                self.assertEqual(client.get('/carrinho-json/').json()['total_itens'], 2)
+
+    def test_login_mescla_limitado_ao_estoque(self):
+        produto = self.criar_produto('Cera', estoque=3)
+        outro = self.criar_produto('Flanela', estoque=5)
+        logado = Client()
+        logado.force_login(self.usuario)
+        self.lote(logado, [{'op': 'adicionar', 'produto_id': produto.pk, 'quantidade': 2}])
+
+        client = Client()
+        self.lote(client, [
+            {'op': 'adicionar', 'produto_id': produto.pk, 'quantidade': 2},
+            {'op': 'adicionar', 'produto_id': outro.pk, 'quantidade': 1},
+        ])
+        resposta = client.post(
+            '/api/login/', json.dumps({'email': 'cliente@teste.com', 'senha': 'senha123'}),
+            content_type='application/json',
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+        itens = dict(ItemCarrinho.objects.filter(carrinho__usuario=self.usuario).values_list('produto_id', 'quantidade'))
+        # 2 do visitante + 2 da conta, com estoque 3
+        self.assertEqual(itens, {produto.pk: 3, outro.pk: 1})
+        self.assertEqual(client.get('/carrinho-json/').json()['total_itens'], 4)
+
+
+class PaginaProdutoTeste(BaseTeste):
+    def test_fields_nao_recorta_pagina_em_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            produto = self.criar_produto('Cera', categoria='Proteção')
+            for nome in ('Selante', 'Vitrificador'):
+                self.criar_produto(nome, categoria='Proteção')
+        url = f'/api/produtos/{produto.pk}/pagina/'
+
+        recortada = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(recortada.status_code, 200)
+
+        relacionados = self.client.get(url).json()['relacionados']
+        self.assertEqual(len(relacionados), 2)
+        for card in relacionados:
+            self.assertIn('nome', card)
+            self.assertIn('preco', card)
+
+
+class GetCondicionalTeste(BaseTeste):
+    def test_etag_e_304(self):
+        produto = self.criar_produto('Cera')
+        url = f'/api/avaliacoes/{produto.pk}/listar/'
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta['ETag']).status_code, 304)
+
+    def test_curinga_nao_esconde_404(self):
+        resposta = self.client.get('/api/avaliacoes/999999/listar/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(resposta.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class EstatisticaAvaliacaoTeste(BaseTeste):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto('Cera')
+
+    def avaliar(self, email):
+        usuario = User.objects.create_user(email=email, password='senha123')
+        return Avaliacao.objects.create(
+            produto=self.produto, usuario=usuario, nota_geral=5, titulo='Boa', comentario=email, status='aprovado',
+        )
+
+    def midia(self, avaliacao):
+        return MidiaAvaliacao.objects.create(
+            avaliacao=avaliacao, tipo='imagem', aprovado=True,
+            arquivo=SimpleUploadedFile('foto.jpg', b'foto', content_type='image/jpeg'),
+        )
+
+    def com_midia(self):
+        return EstatisticaAvaliacao.objects.get(produto=self.produto).com_midia
+
+    def test_com_midia_conta_avaliacoes_com_midia_aprovada(self):
+        avaliacao = self.avaliar('a@teste.com')
+        primeira, segunda = self.midia(avaliacao), self.midia(avaliacao)
+        self.assertEqual(self.com_midia(), 1)
+
+        for midia in (primeira, segunda):
+            midia.aprovado, midia.motivo_rejeicao = False, 'Reprovada'
+            midia.save(update_fields=['aprovado', 'motivo_rejeicao'])
+        self.assertEqual(self.com_midia(), 0)
+
+        segunda.aprovado = True
+        segunda.save(update_fields=['aprovado'])
+        self.assertEqual(self.com_midia(), 1)
+
+        outra = self.avaliar('b@teste.com')
+        self.midia(outra), self.midia(outra)
+        self.assertEqual(self.com_midia(), 2)
+
+        # Em massa e em cascata: cada avaliação sai uma vez só
+        MidiaAvaliacao.objects.filter(avaliacao=outra).delete()
+        self.assertEqual(self.com_midia(), 1)
+        avaliacao.delete()
+        self.assertEqual(self.com_midia(), 0)
+
+        incremental = EstatisticaAvaliacao.objects.get(produto=self.produto)
+        EstatisticaAvaliacao.recalcular([self.produto.pk])
+        recalculada = EstatisticaAvaliacao.objects.get(produto=self.produto)
+        self.assertEqual((incremental.total, incremental.com_midia), (recalculada.total, recalculada.com_midia))
+
+
+class BuscaTeste(BaseTeste):
+    def setUp(self):
+        super().setUp()
+        self.nome = self.criar_produto(
+            'Shampoo automotivo neutro', descricao='Shampoo concentrado para lavagem.', categoria='Lavagem'
+        )
+        self.descricao = self.criar_produto(
+            'Kit lavagem completo', descricao='Inclui balde, luva de microfibra, pretinho e shampoo.',
+            categoria='Acessórios',
+        )
+        self.criar_produto('Cera de carnaúba', descricao='Proteção e brilho para a pintura.', categoria='Proteção')
+        self.inativo = self.criar_produto('Shampoo com cera', status='Inativo', categoria='Lavagem')
+        for produto in Produto.objects.all():
+            indice.indexar_produto(produto)
+
+    def test_ordem_bm25(self):
+        # Mesmo caminho de /api/produtos/buscar/ e da página de busca
+        resultado = facetas.busca_facetada('shampoo')
+        # Termo no nome (peso maior) e repetido vem antes de uma menção na descrição
+        self.assertEqual(resultado['ids'], [self.nome.pk, self.descricao.pk])
+        self.assertEqual(resultado['total'], 2)
+        self.assertNotIn(self.inativo.pk, resultado['ids'])
+
+        segunda = facetas.busca_facetada('shampoo', pagina=2, por_pagina=1)
+        self.assertEqual(segunda['ids'], [self.descricao.pk])
+
+    def test_ordem_bm25_com_filtro(self):
+        resultado = facetas.busca_facetada('shampoo', {'categoria': 'Acessórios'})
+        self.assertEqual(resultado['ids'], [self.descricao.pk])
+        self.assertEqual(resultado['total'], 1)
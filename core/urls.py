@@ -10,14 +10,16 @@ from .views import (
     
     # Carrinho Views
     carrinho, carrinho_json, adicionar_carrinho, remover_carrinho, alterar_quantidade, simular_frete_carrinho,
+    carrinho_lote,
     
     # Admin Views
     admin_index, delete_user, admin_pedidos, admin_produtos, atualizar_status_pedido, 
     perfil_usuario, detalhes_pedido_admin, admin_user_profile, toggle_user_status, 
     force_logout_user, send_password_reset, toggle_suspicious_user, update_user_risk_level,
+    exportar_produtos_admin, importar_produtos_admin, rastreio_admin, cache_admin,
     
     # Produto Views
-    produtos_destaque, buscar_produtos, ProdutoViewSet, produto_detalhes_com_galeria, ImagemProdutoViewSet,
+    produtos_destaque, buscar_produtos, autocomplete_produtos, ProdutoViewSet, produto_detalhes_com_galeria, produto_pagina, ImagemProdutoViewSet,
     
     # API Views (APIs REST)
     atualizar_perfil, check_auth, CheckAuthView, api_esqueceu_senha,
@@ -65,9 +67,12 @@ urlpatterns = [
     # PRODUTOS
     path('api/produtos/destaque/', produtos_destaque, name='api_produtos_destaque'),
     path('api/produtos/buscar/', buscar_produtos, name='api_produtos_buscar'),
+    path('api/produtos/autocomplete/', autocomplete_produtos, name='api_produtos_autocomplete'),
     
     # NOVA URL para detalhes do produto com galeria
     path('api/produtos/<int:produto_id>/galeria/', produto_detalhes_com_galeria, name='produto-galeria'),
+    # Página de produto agregada (uma chamada)
+    path('api/produtos/<int:produto_id>/pagina/', produto_pagina, name='api_produto_pagina'),
     
     # PAGAMENTO
     path('api/criar-pagamento-abacatepay/<int:pedido_id>/', criar_pagamento_abacatepay, name='criar_pagamento_abacatepay'),
@@ -101,6 +106,7 @@ urlpatterns = [
     path('remover_carrinho/<int:item_id>/', remover_carrinho, name='remover_carrinho'),
     path('alterar-quantidade/<int:item_id>/', alterar_quantidade, name='alterar_quantidade'),
     path('api/carrinho/simular-frete/', simular_frete_carrinho, name='api_carrinho_simular_frete'),
+    path('api/carrinho/batch/', carrinho_lote, name='api_carrinho_batch'),
 
     # ========== ADMIN ==========
     path('admin-login/', admin_login, name='admin_login'),
@@ -108,6 +114,10 @@ urlpatterns = [
     path('admin-panel/delete-user/<int:user_id>/', delete_user, name='delete_user'),
     path('admin-panel/pedidos/', admin_pedidos, name='admin_pedidos'),
     path('admin-panel/produtos/', admin_produtos, name='admin_produtos'),
+    path('admin-panel/produtos/exportar/', exportar_produtos_admin, name='exportar_produtos_admin'),
+    path('admin-panel/produtos/importar/', importar_produtos_admin, name='importar_produtos_admin'),
+    path('admin-panel/rastreio/', rastreio_admin, name='rastreio_admin'),
+    path('admin-panel/cache/', cache_admin, name='cache_admin'),
     
     # GESTÃO AVANÇADA DE USUÁRIOS
     path('admin-panel/user-profile/<int:user_id>/', admin_user_profile, name='admin_user_profile'),
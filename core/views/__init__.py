@@ -3,7 +3,8 @@ from .admin_views import (
     admin_index, delete_user, admin_pedidos, admin_produtos,
     atualizar_status_pedido, perfil_usuario, detalhes_pedido_admin,
     admin_user_profile, toggle_user_status, force_logout_user, send_password_reset,
-    toggle_suspicious_user, update_user_risk_level
+    toggle_suspicious_user, update_user_risk_level, exportar_produtos_admin, importar_produtos_admin,
+    rastreio_admin, cache_admin
 )
 from .public_views import (
     index, login_page, esqueceu_senha_page, criar_conta_page,
@@ -15,12 +16,13 @@ from .auth_views import (
 from .carrinho_views import (
     carrinho, carrinho_json, adicionar_carrinho,
     remover_carrinho, alterar_quantidade, get_or_create_carrinho,
-    simular_frete_carrinho
+    simular_frete_carrinho, carrinho_lote
 )
 from .pagamento_views import criar_pagamento_abacatepay
 from .pedido_views import preparar_pagamento, criar_pedido_apos_pagamento, meus_pedidos
 from .produto_views import (
-    ProdutoViewSet, produtos_destaque, buscar_produtos, produto_detalhes_com_galeria, ImagemProdutoViewSet
+    ProdutoViewSet, produtos_destaque, buscar_produtos, autocomplete_produtos,
+    produto_detalhes_com_galeria, produto_pagina, ImagemProdutoViewSet
 )
 from .api_views import (
     check_auth, CheckAuthView, atualizar_perfil, api_esqueceu_senha
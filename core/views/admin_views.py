@@ -3,15 +3,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods, require_GET
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
 from ..models import User, Produto, Pedido
 from core.models.orders import StatusPedido
+from core.services import cache_swr, chaves, produtos_io, rastreio
+from core.services.rastreio import rastrear, span
 import logging
 import json
+import os
 
 # ===================== IMPORTAÇÕES PARA EMAIL =====================
 from django.core.mail import send_mail
@@ -24,6 +28,11 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 def calcular_stats_reais():
+    """Estatísticas do dashboard (cache de 60s com expiração suave: um único processo recalcula)"""
+    return cache_swr.obter(chaves.montar('admin_stats_reais'), _montar_stats_reais, chaves.ttl('admin_stats_reais'))
+
+
+def _montar_stats_reais():
     """Calcula estatísticas REAIS do banco de dados - CORRIGIDA"""
     hoje = timezone.now().date()
     ontem = hoje - timedelta(days=1)
@@ -84,6 +93,7 @@ def perfil_usuario(request):
 # ===================== ADMIN INDEX =====================
 @csrf_protect
 @login_required
+@rastrear('admin.index')
 def admin_index(request):
     if not request.user.is_authenticated or not request.user.is_admin:
         logger.warning(f"Acesso negado à admin_index - Usuário: {request.user}")
@@ -92,9 +102,6 @@ def admin_index(request):
     site_language = request.GET.get('site_language', 'pt-BR')
     section = request.GET.get('section', 'dashboard')
 
-    # DEBUG - Verificar parâmetros recebidos
-    print(f"🎯 DEBUG ADMIN - Section: {section}, GET: {dict(request.GET)}")
-
     # Filtro de usuários (para outras seções)
     users_list = User.objects.all().order_by('-id')
     users_search = request.GET.get('search', '')
@@ -131,8 +138,6 @@ def admin_index(request):
         orders_search = request.GET.get('search', '')
         orders_status = request.GET.get('status', 'Todos')
         orders_page_num = request.GET.get('page', 1)
-        
-        print(f"📊 DEBUG VENDAS - Status: {orders_status}, Search: {orders_search}, Page: {orders_page_num}")
 
         # Query base para pedidos
         orders_list = Pedido.objects.all().select_related(
@@ -142,7 +147,6 @@ def admin_index(request):
         # Aplicar filtros
         if orders_status and orders_status != 'Todos':
             orders_list = orders_list.filter(status__nome=orders_status)
-            print(f"🔍 Filtro status aplicado: {orders_status} -> {orders_list.count()} pedidos")
         
         if orders_search:
             orders_list = orders_list.filter(
@@ -151,7 +155,6 @@ def admin_index(request):
                 models.Q(usuario__last_name__icontains=orders_search) |
                 models.Q(usuario__email__icontains=orders_search)
             )
-            print(f"🔍 Filtro busca aplicado: {orders_search} -> {orders_list.count()} pedidos")
 
         # Paginação
         orders_paginator = Paginator(orders_list, 10)
@@ -163,8 +166,6 @@ def admin_index(request):
             'status': orders_status,  # Usar orders_status para a seção vendas
             'search_query': orders_search
         })
-        
-        print(f"✅ VENDAS - Pedidos na página: {len(orders_page)}")
 
     logger.info(f"Admin acessou painel: {request.user.email} - Seção: {section}")
     return render(request, 'core/admin-front-end/admin_index.html', context)
@@ -214,55 +215,18 @@ def admin_pedidos(request):
 
 @require_GET
 @login_required
+@rastrear('admin.detalhes_pedido')
 def detalhes_pedido_admin(request, pedido_id):
     if not request.user.is_admin:
         return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
     try:
-        pedido = get_object_or_404(Pedido, id=pedido_id)
-        
-        # DEBUG: Verificar relações disponíveis
-        print(f"🔍 DEBUG - Buscando itens do pedido {pedido_id}")
-        print(f"📦 Atributos do pedido: {[attr for attr in dir(pedido) if 'item' in attr.lower()]}")
-        
-        # CORREÇÃO: Use a relação correta baseada no seu modelo
-        # Tente diferentes nomes comuns para a relação de itens
-        itens = []
-        
-        # Opção 1: Tentar 'itens' (mais comum)
-        if hasattr(pedido, 'itens') and callable(getattr(pedido, 'itens')):
-            try:
-                itens = pedido.itens.all()
-                print(f"✅ Itens encontrados via 'itens': {itens.count()}")
-            except Exception as e:
-                print(f"❌ Erro em 'itens': {e}")
-        
-        # Opção 2: Se 'itens' não funcionar, tentar acessar via related_name
-        if not itens:
-            try:
-                # Buscar qualquer relação que contenha 'item' no nome
-                for field_name in dir(pedido):
-                    if 'item' in field_name.lower() and not field_name.startswith('_'):
-                        field = getattr(pedido, field_name)
-                        if hasattr(field, 'all'):
-                            itens = field.all()
-                            print(f"✅ Itens encontrados via '{field_name}': {itens.count()}")
-                            break
-            except Exception as e:
-                print(f"❌ Erro em busca por related_name: {e}")
-        
-        # Opção 3: Último recurso - buscar manualmente
-        if not itens:
-            try:
-                from core.models.orders import ItemPedido  # Ajuste conforme seu modelo
-                itens = ItemPedido.objects.filter(pedido=pedido)
-                print(f"✅ Itens encontrados manualmente: {itens.count()}")
-            except Exception as e:
-                print(f"❌ Erro em busca manual: {e}")
-        
-        # Se ainda não encontrou, criar lista vazia
-        if not itens:
-            itens = []
-            print("⚠️ Nenhum item encontrado para o pedido")
+        pedido = get_object_or_404(
+            Pedido.objects.select_related('usuario', 'status', 'pagamento'),
+            id=pedido_id
+        )
+        with span('admin.detalhes_pedido.itens', pedido=pedido_id) as s:
+            itens = list(pedido.itens.select_related('produto'))
+            s.anotar(itens=len(itens))
 
         # Serializar os dados
         dados_pedido = {
@@ -284,11 +248,11 @@ def detalhes_pedido_admin(request, pedido_id):
             'total_descontos': float(pedido.total_descontos or 0),
             'total_final': float(pedido.total_final or 0),
             'status': pedido.status.nome if pedido.status else 'N/A',
-            'status_pagamento': getattr(pedido.pagamento, 'status', 'N/A') if pedido.pagamento else 'N/A',
+            # Pedido sem Pagamento: o acesso reverso levanta RelatedObjectDoesNotExist (um AttributeError)
+            'status_pagamento': getattr(getattr(pedido, 'pagamento', None), 'status', 'N/A'),
             'criado_em': pedido.criado_em.isoformat() if pedido.criado_em else None
         }
 
-        print(f"✅ Dados serializados - {len(dados_pedido['itens'])} itens")
         return JsonResponse({'success': True, 'pedido': dados_pedido})
         
     except Exception as e:
@@ -320,6 +284,97 @@ def admin_produtos(request):
         'search_query': search_query,
         'categoria_filter': categoria_filter
     })
+@require_GET
+@login_required
+def exportar_produtos_admin(request):
+    """Exporta todos os produtos em CSV ou JSONL (?formato=), em streaming"""
+    if not request.user.is_admin:
+        return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
+
+    formato = request.GET.get('formato', 'csv')
+    if formato not in produtos_io.FORMATOS:
+        return JsonResponse({'success': False, 'error': 'Formato inválido (csv ou jsonl)'}, status=400)
+
+    content_type = 'text/csv; charset=utf-8' if formato == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(produtos_io.exportar_produtos(formato), content_type=content_type)
+    nome = f"produtos-{timezone.now():%Y%m%d-%H%M}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    logger.info(f"Exportação de produtos ({formato}) por admin: {request.user.email}")
+    return response
+
+@csrf_protect
+@require_http_methods(["POST"])
+@login_required
+def importar_produtos_admin(request):
+    """Importa produtos de um CSV/JSONL enviado em 'arquivo' (upsert por SKU, em lotes)"""
+    if not request.user.is_admin:
+        return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
+
+    arquivo = request.FILES.get('arquivo')
+    if not arquivo:
+        return JsonResponse({'success': False, 'error': 'Envie o arquivo no campo "arquivo"'}, status=400)
+    formato = request.POST.get('formato') or produtos_io.formato_do_nome(arquivo.name)
+    if formato not in produtos_io.FORMATOS:
+        return JsonResponse({'success': False, 'error': 'Formato inválido (csv ou jsonl)'}, status=400)
+
+    try:
+        relatorio = produtos_io.importar_produtos(
+            produtos_io.ler_arquivo(arquivo.file, formato),
+            dry_run=request.POST.get('dry_run') in ('1', 'true', 'on'),
+        )
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'error': 'O arquivo precisa estar em UTF-8'}, status=400)
+    except Exception as e:
+        logger.error(f"Erro na importação de produtos: {str(e)}")
+        return JsonResponse({'success': False, 'error': f'Erro interno: {str(e)}'}, status=500)
+
+    logger.info(f"Importação de produtos por admin: {request.user.email} - {relatorio['lidas']} linhas")
+    # O relatório completo pode ser grande: a resposta leva só os primeiros erros
+    relatorio['erros'] = relatorio['erros'][:100]
+    return JsonResponse({'success': True, **relatorio})
+
+# ===================== RASTREIO =====================
+@csrf_protect
+@require_http_methods(["GET", "POST"])
+@login_required
+def rastreio_admin(request):
+    """Spans recentes deste processo (GET ?nome=prefixo&limite=N); POST limpa o buffer"""
+    if not request.user.is_admin:
+        return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
+
+    if request.method == 'POST':
+        rastreio.limpar()
+        return JsonResponse({'success': True})
+
+    try:
+        limite = int(request.GET.get('limite', 100))
+    except ValueError:
+        limite = 100
+    return JsonResponse({
+        'success': True,
+        'ativo': rastreio.ATIVO,
+        'pid': os.getpid(),
+        'spans': rastreio.spans(request.GET.get('nome') or None, limite),
+    })
+
+# ===================== CACHE =====================
+@csrf_protect
+@require_http_methods(["GET", "POST"])
+@login_required
+def cache_admin(request):
+    """Taxa de acerto do cache por prefixo de chave neste processo; POST zera os contadores"""
+    if not request.user.is_admin:
+        return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
+
+    # Só o backend de duas camadas (core.services.cache_local) coleta métricas
+    if not hasattr(cache, 'metricas'):
+        return JsonResponse({'success': True, 'duas_camadas': False})
+
+    if request.method == 'POST':
+        cache.zerar_metricas()
+        return JsonResponse({'success': True})
+    return JsonResponse({'success': True, 'duas_camadas': True, **cache.metricas()})
+
 # ===================== ATUALIZAR STATUS PEDIDO =====================
 @csrf_exempt
 @require_http_methods(["PUT"])
@@ -332,7 +387,7 @@ def atualizar_status_pedido(request, pedido_id):
         data = json.loads(request.body)
         novo_status_nome = data.get('status')
         
-        print(f"🔄 ATUALIZAR STATUS - Pedido: {pedido_id}, Novo Status: {novo_status_nome}")
+        logger.info(f"Atualizar status - Pedido: {pedido_id}, Novo Status: {novo_status_nome}")
         
         if not novo_status_nome:
             return JsonResponse({'success': False, 'error': 'Status não informado'}, status=400)
@@ -12,11 +12,19 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from ..serializers import UserSerializer, RegisterSerializer
+from ..services import carrinho_store
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def _mesclar_carrinho(request, user):
+    """Carrinho do visitante vai para o do usuário; uma falha aqui não impede o login."""
+    try:
+        carrinho_store.mesclar_no_login(request, user)
+    except Exception as e:
+        logger.error(f"Erro ao mesclar carrinho no login de {user.email}: {str(e)}")
+
 # ==== API LOGIN ====
 class LoginView(APIView):
     permission_classes = [AllowAny]
@@ -44,6 +52,7 @@ class LoginView(APIView):
                 )
             
             login(request, user)
+            _mesclar_carrinho(request, user)
             serializer = UserSerializer(user)
             logger.info(f"Login bem-sucedido: {email} - Admin: {user.is_admin}")
             return Response({
@@ -104,6 +113,7 @@ def admin_login(request):
         # ✅ VERIFICAÇÃO ADICIONAL: Usuário ativo E admin
         if user is not None and getattr(user, 'is_admin', False) and user.is_active:
             auth_login(request, user)
+            _mesclar_carrinho(request, user)
 
             # Tempo de sessão
             if not remember_me:
@@ -3,7 +3,6 @@ import json
 import logging
 import hashlib
 import datetime
-from django.contrib.humanize.templatetags.humanize import naturaltime
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -16,7 +15,6 @@ from django.db.models.functions import RowNumber
 from django.db import transaction
 from django.utils import timezone
 from django.core.cache import cache
-from django.views.decorators.cache import cache_page
 from django.conf import settings
 
 # CORREÇÃO: Importe corretamente
@@ -25,6 +23,9 @@ from django_ratelimit.exceptions import Ratelimited
 
 from core.models import Produto, Avaliacao, MidiaAvaliacao, AvaliacaoLike, AvaliacaoUtil, DenunciaAvaliacao
 from core.forms import AvaliacaoForm, MidiaAvaliacaoForm
+from .condicional import get_condicional
+from core.serializers import AvaliacaoPublicaSerializer
+from core.services import chaves
 
 logger = logging.getLogger('core.avaliacoes')
 
@@ -99,13 +100,8 @@ def criar_avaliacao(request, produto_id):
                         from core.tasks.avaliacao_tasks import processar_midia_avaliacao
                         processar_midia_avaliacao.delay(midia.id)
                     
-                    # Limpa cache de estatísticas do produto
-                    cache.delete_many([
-                        f'produto_{produto.id}_media_avaliacoes',
-                        f'produto_{produto.id}_total_avaliacoes',
-                        f'produto_{produto.id}_distribuicao_avaliacoes',
-                        f'produto_{produto.id}_percentual_recomendacao',
-                    ])
+                    # Caches de estatísticas/contexto do produto: a versão das avaliações
+                    # é incrementada pelos signals após o commit (core.services.chaves)
                     
                     # Dispara task de moderação em background
                     from core.tasks.avaliacao_tasks import processar_moderacao_avaliacao
@@ -149,14 +145,8 @@ def excluir_minha_avaliacao(request, avaliacao_id):
         with transaction.atomic():
             # Soft delete para conformidade
             avaliacao.delete_soft("Removido pelo usuário (LGPD)")
-            
-            # Limpa cache
-            cache.delete_many([
-                f'produto_{avaliacao.produto.id}_media_avaliacoes',
-                f'produto_{avaliacao.produto.id}_total_avaliacoes',
-                f'produto_{avaliacao.produto.id}_distribuicao_avaliacoes',
-                f'produto_{avaliacao.produto.id}_percentual_recomendacao',
-            ])
+            # O save dispara o incremento da versão das avaliações do produto
+            # (signals), que invalida as estatísticas e o contexto em cache
             
             logger.info(f"Avaliação {avaliacao_id} removida por {request.user.email} (LGPD)")
             
@@ -177,7 +167,7 @@ def like_avaliacao(request, avaliacao_id):
         return JsonResponse({'error': 'Tipo inválido'}, status=400)
     
     # Debounce: verifica se já interagiu recentemente
-    debounce_key = f"like_debounce_{request.user.id}_{avaliacao_id}"
+    debounce_key = chaves.montar('like_debounce', usuario_id=request.user.id, avaliacao_id=avaliacao_id)
     if cache.get(debounce_key):
         return JsonResponse({'error': 'Aguarde antes de interagir novamente'}, status=429)
     
@@ -215,7 +205,7 @@ def like_avaliacao(request, avaliacao_id):
             avaliacao.save()
             
             # Debounce: impede múltiplas interações em curto período
-            cache.set(debounce_key, True, 2)  # 2 segundos
+            cache.set(debounce_key, True, chaves.ttl('like_debounce'))
             
             return JsonResponse({
                 'likes': avaliacao.likes,
@@ -227,7 +217,8 @@ def like_avaliacao(request, avaliacao_id):
         logger.error(f"Erro no like: {str(e)}")
         return JsonResponse({'error': 'Erro ao processar'}, status=500)
 
-@cache_page(60 * 5)  # Cache de 5 minutos
+# ETag/304 pela versão das avaliações do produto; corpo em cache por 5 minutos sob a ETag
+@get_condicional(lambda request, produto_id: [('avaliacoes', produto_id)], cache_timeout=60 * 5)
 def listar_avaliacoes_api(request, produto_id):
     """API para carregar avaliações com keyset pagination para performance"""
     produto = get_object_or_404(Produto, id=produto_id)
@@ -243,7 +234,7 @@ def listar_avaliacoes_api(request, produto_id):
     queryset = Avaliacao.objects.filter(
         produto=produto, 
         status='aprovado'
-    ).select_related('usuario').prefetch_related('midias')
+    )
     
     # Aplica filtros
     if filtro_nota:
@@ -271,7 +262,7 @@ def listar_avaliacoes_api(request, produto_id):
         queryset = queryset.order_by('-created_at')
     
     # Limita resultados
-    avaliacoes = list(queryset[:limit + 1])  # Pega um extra para saber se tem mais
+    avaliacoes = list(AvaliacaoPublicaSerializer.otimizar_queryset(queryset)[:limit + 1])  # Pega um extra para saber se tem mais
     has_more = len(avaliacoes) > limit
     
     if has_more:
@@ -282,35 +273,7 @@ def listar_avaliacoes_api(request, produto_id):
     
     # Serialização
     data = {
-        'avaliacoes': [
-            {
-                'id': av.id,
-                'usuario_nome': av.usuario.get_full_name() or av.usuario.email.split('@')[0],
-                'usuario_iniciais': ''.join([n[0] for n in (av.usuario.get_full_name() or 'U').split()[:2]]).upper(),
-                'nota_geral': av.nota_geral,
-                'titulo': av.titulo,
-                'comentario': av.comentario,
-                'melhor_ponto': av.melhor_ponto,
-                'pior_ponto': av.pior_ponto,
-                'tempo_de_uso': av.tempo_de_uso,
-                'recomendaria': av.recomendaria,
-                'likes': av.likes,
-                'dislikes': av.dislikes,
-                'util': av.util,
-                'nao_util': av.nao_util,
-                'tempo_decorrido': naturaltime(av.publicado_em or av.created_at),
-                'midias': [
-                    {
-                        'id': m.id,
-                        'arquivo': m.arquivo.url,
-                        'thumbnail': m.thumbnail.url if m.thumbnail else m.arquivo.url,
-                        'tipo': m.tipo,
-                        'legenda': m.legenda
-                    } for m in av.midias.aprovadas()
-                ]
-            }
-            for av in avaliacoes
-        ],
+        'avaliacoes': AvaliacaoPublicaSerializer(avaliacoes, many=True).data,
         'pagination': {
             'has_more': has_more,
             'next_cursor': next_cursor,
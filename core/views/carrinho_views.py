@@ -3,51 +3,31 @@ from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
-from ..models import Carrinho, ItemCarrinho, Produto
+from ..services import carrinho_store
+from ..services.carrinho_store import CarrinhoErro
 from ..services.shipping_service import ShippingService  # 👈 ADICIONAR ESTA LINHA
-import uuid
 import json
 
 # Instanciar o serviço para ser usado nas views
 shipping_service = ShippingService()
 
 def get_or_create_carrinho(request):
-    if request.user.is_authenticated:
-        carrinho, created = Carrinho.objects.get_or_create(usuario=request.user)
-    else:
-        session_key = request.session.get('carrinho_sessao')
-        if not session_key:
-            session_key = str(uuid.uuid4())
-            request.session['carrinho_sessao'] = session_key
-        carrinho, created = Carrinho.objects.get_or_create(
-            sessao=session_key,
-            usuario=None
-        )
-    return carrinho
+    """Carrinho do request (banco para usuário logado, Redis para visitante); não cria nada só para ler."""
+    return carrinho_store.do_request(request)
+
+def _erro(e):
+    return JsonResponse({'success': False, 'error': e.mensagem}, status=e.status)
 
 def carrinho(request):
     carrinho_obj = get_or_create_carrinho(request)
-    return render(request, 'core/front-end/carrinho.html', {'carrinho': carrinho_obj})
+    return render(request, 'core/front-end/carrinho.html', {'carrinho': carrinho_obj, 'itens': carrinho_obj.itens()})
 
 @require_http_methods(["POST"])
 @csrf_protect
 def adicionar_carrinho(request, produto_id):
     try:
-        produto = get_object_or_404(Produto, id=produto_id)
-        if produto.estoque <= 0:
-            return JsonResponse({'success': False, 'error': 'Produto fora de estoque'}, status=400)
         carrinho_obj = get_or_create_carrinho(request)
-        item, created = ItemCarrinho.objects.get_or_create(
-            carrinho=carrinho_obj,
-            produto=produto,
-            defaults={'preco_unitario': produto.preco}
-        )
-        if not created:
-            if item.quantidade >= produto.estoque:
-                return JsonResponse({'success': False, 'error': 'Estoque insuficiente'}, status=400)
-            item.quantidade += 1
-            item.save()
-        carrinho_obj.refresh_from_db()
+        carrinho_obj.adicionar(produto_id)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': True,
@@ -55,6 +35,8 @@ def adicionar_carrinho(request, produto_id):
                 'message': 'Produto adicionado ao carrinho!'
             })
         return redirect('carrinho')
+    except CarrinhoErro as e:
+        return _erro(e)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -62,12 +44,8 @@ def adicionar_carrinho(request, produto_id):
 @csrf_protect
 def remover_carrinho(request, item_id):
     try:
-        item = get_object_or_404(ItemCarrinho, id=item_id)
         carrinho_obj = get_or_create_carrinho(request)
-        if item.carrinho != carrinho_obj:
-            return JsonResponse({'success': False, 'error': 'Item não encontrado'})
-        item.delete()
-        carrinho_obj.refresh_from_db()
+        carrinho_obj.remover(item_id)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': True,
@@ -75,18 +53,19 @@ def remover_carrinho(request, item_id):
                 'message': 'Produto removido do carrinho!'
             })
         return redirect('carrinho')
+    except CarrinhoErro as e:
+        return _erro(e)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 def carrinho_json(request):
     try:
-        carrinho_obj = get_or_create_carrinho(request)
+        resumo = get_or_create_carrinho(request).resumo()
         frete = 0
         return JsonResponse({
-            'subtotal': float(carrinho_obj.total_preco),
+            **resumo.como_dict(),
             'frete': frete,
-            'total': float(carrinho_obj.total_preco) + frete,
-            'total_itens': carrinho_obj.total_itens
+            'total': float(resumo.subtotal) + frete,
         })
     except Exception:
         return JsonResponse({'subtotal': 0, 'frete': 0, 'total': 0, 'total_itens': 0})
@@ -95,33 +74,47 @@ def carrinho_json(request):
 @csrf_protect
 def alterar_quantidade(request, item_id):
     try:
-        item = get_object_or_404(ItemCarrinho, id=item_id)
         carrinho_obj = get_or_create_carrinho(request)
-        if item.carrinho != carrinho_obj:
-            return JsonResponse({'success': False, 'error': 'Item não encontrado'})
         if not request.body:
             return JsonResponse({'success': False, 'error': 'Dados não fornecidos'})
         data = json.loads(request.body)
         nova_quantidade = int(data.get('quantidade', 1))
-        if nova_quantidade > item.produto.estoque:
-            return JsonResponse({
-                'success': False,
-                'error': f'Estoque insuficiente. Disponível: {item.produto.estoque}'
-            })
-        if nova_quantidade < 1:
-            item.delete()
-            subtotal_item = 0
-        else:
-            item.quantidade = nova_quantidade
-            item.save()
-            subtotal_item = float(item.subtotal)
-        carrinho_obj.refresh_from_db()
+        subtotal_item = carrinho_obj.alterar_quantidade(item_id, nova_quantidade)
         return JsonResponse({
             'success': True,
-            'subtotal_item': subtotal_item,
+            'subtotal_item': float(subtotal_item),
             'total_itens': carrinho_obj.total_itens,
             'message': 'Quantidade atualizada!'
         })
+    except CarrinhoErro as e:
+        return _erro(e)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Dados JSON inválidos'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@require_http_methods(["POST"])
+@csrf_protect
+def carrinho_lote(request):
+    """
+    Várias alterações do carrinho em uma chamada, em uma transação:
+    {"operacoes": [{"op": "adicionar", "produto_id": 5, "quantidade": 1},
+                   {"op": "quantidade", "item_id": 3, "quantidade": 2},
+                   {"op": "remover", "item_id": 4}]}
+    Devolve o resumo uma vez, com o subtotal de cada item.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+        operacoes = carrinho_store.normalizar_operacoes(data.get('operacoes') if isinstance(data, dict) else data)
+        resumo = get_or_create_carrinho(request).aplicar_lote(operacoes)
+        return JsonResponse({
+            'success': True,
+            **resumo.como_dict(),
+            'subtotais': {str(item_id): float(subtotal) for item_id, subtotal in resumo.subtotais.items()},
+            'message': 'Carrinho atualizado!'
+        })
+    except CarrinhoErro as e:
+        return _erro(e)
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Dados JSON inválidos'}, status=400)
     except Exception as e:
@@ -152,20 +145,10 @@ def simular_frete_carrinho(request):
         cep_destino = cep_destino.replace('-', '')
         origem_cep = origem_cep.replace('-', '')
 
-        carrinho_obj = get_or_create_carrinho(request)
-        itens_carrinho_lista = []
-        
-        # Converter itens do carrinho para formato do shipping service
-        for item in carrinho_obj.itens.all():
-            itens_carrinho_lista.append({
-                'quantidade': item.quantidade,
-                'peso': float(item.produto.peso or 0.1),  # Fallback para 100g
-                'altura': float(item.produto.altura or 1),  # Fallback para 1cm
-                'largura': float(item.produto.largura or 1),  # Fallback para 1cm
-                'comprimento': float(item.produto.comprimento or 1),  # Fallback para 1cm
-                'valor': float(item.preco_unitario)
-            })
-            
+        # Itens já no formato do shipping service, com medidas padrão (uma query)
+        resumo = get_or_create_carrinho(request).resumo()
+        itens_carrinho_lista = resumo.itens_frete
+
         if not itens_carrinho_lista:
             return JsonResponse({
                 'success': False, 
@@ -182,14 +165,14 @@ def simular_frete_carrinho(request):
         if resultado_frete.get('status') == 'sucesso':
             valor_frete = float(resultado_frete['valor_frete'])
             prazo_dias = int(resultado_frete['prazo_dias'])
-            total_com_frete = float(carrinho_obj.total_preco) + valor_frete
+            total_com_frete = float(resumo.subtotal) + valor_frete
             
             return JsonResponse({
                 'success': True,
                 'frete': valor_frete,
                 'prazo_dias': prazo_dias,
                 'servico': resultado_frete['servico'],
-                'subtotal': float(carrinho_obj.total_preco),
+                'subtotal': float(resumo.subtotal),
                 'total_com_frete': total_com_frete,
                 'cep_destino': cep_destino,
                 'message': f'Frete calculado: R$ {valor_frete:.2f} - Prazo: {prazo_dias} dia(s)'
@@ -0,0 +1,114 @@
+# views/condicional.py
+"""
+GET condicional para as APIs de leitura: ETag forte + Last-Modified montados
+a partir dos carimbos de versão (core.services.versoes). Um If-None-Match /
+If-Modified-Since que ainda vale é respondido com 304 depois de um único
+get_many no cache, sem tocar no banco nem no serializer.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from ..services import chaves, versoes
+
+_CONFIG_PADRAO = {
+    'MAX_AGE': 0,                   # navegador sempre revalida (304 barato)
+    'S_MAXAGE': 60,                 # CDN/proxy compartilhado
+    'STALE_WHILE_REVALIDATE': 300,
+    'VERSAO': 1,                    # mudar ao alterar o formato das respostas
+}
+
+
+def config(chave):
+    return getattr(settings, 'API_CACHE_CONFIG', {}).get(chave, _CONFIG_PADRAO[chave])
+
+
+def gerar_etag(request, carimbos):
+    """ETag forte: rota + parâmetros + Accept (negociação do DRF) + versões"""
+    base = repr((
+        config('VERSAO'),
+        request.path,
+        sorted(request.GET.lists()),
+        request.headers.get('Accept', ''),
+        carimbos,
+    ))
+    return f'"{hashlib.sha1(base.encode()).hexdigest()}"'
+
+
+def _nao_modificado(request, etag, ultima):
+    # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110). `*` não
+    # vale: o 304 sai antes da view, sem saber se o recurso existe (seria 404)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag in parse_etags(if_none_match)
+    desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return desde is not None and int(ultima) <= desde
+
+
+def aplicar_cabecalhos(response, etag, ultima):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=config('MAX_AGE'),
+        s_maxage=config('S_MAXAGE'),
+        stale_while_revalidate=config('STALE_WHILE_REVALIDATE'),
+    )
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def avaliar(request, *escopos):
+    """(etag, última alteração, resposta 304 ou None) para os escopos de versão"""
+    carimbos, ultima = versoes.carimbo(*escopos)
+    etag = gerar_etag(request, carimbos)
+    if _nao_modificado(request, etag, ultima):
+        return etag, ultima, aplicar_cabecalhos(HttpResponseNotModified(), etag, ultima)
+    return etag, ultima, None
+
+
+def get_condicional(escopos, cache_timeout=None):
+    """
+    Decorator para views de leitura. `escopos(request, *args, **kwargs)` devolve
+    os escopos de versão dos quais a resposta depende. Com `cache_timeout`, o
+    corpo do 200 fica em cache sob a própria ETag (nunca serve versão antiga).
+    Deve ficar por fora de @api_view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            etag, ultima, resposta = avaliar(request, *escopos(request, *args, **kwargs))
+            if resposta is not None:
+                return resposta
+
+            chave_cache = chaves.montar('resposta_api', etag=etag.strip('"')) if cache_timeout else None
+            if chave_cache:
+                guardada = cache.get(chave_cache)
+                if guardada is not None:
+                    conteudo, content_type = guardada
+                    return aplicar_cabecalhos(HttpResponse(conteudo, content_type=content_type), etag, ultima)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            aplicar_cabecalhos(response, etag, ultima)
+            if chave_cache:
+                def guardar(r):
+                    cache.set(chave_cache, (r.content, r['Content-Type']), cache_timeout)
+                # Respostas do DRF só têm conteúdo depois de renderizadas
+                if hasattr(response, 'add_post_render_callback'):
+                    response.add_post_render_callback(guardar)
+                else:
+                    guardar(response)
+            return response
+        return wrapper
+    return decorator
@@ -1,116 +1,71 @@
 # views/produto_views.py
-from django.shortcuts import render, get_object_or_404
-from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.views.decorators.gzip import gzip_page
 from rest_framework import viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
-from ..models import Produto, ImagemProduto, Avaliacao
-from ..serializers import ProdutoSerializer, ImagemProdutoSerializer, ProdutoDetailSerializer
+from ..models import Produto, ImagemProduto
+from ..serializers import ProdutoSerializer, ProdutoCardSerializer, ImagemProdutoSerializer, ProdutoDetailSerializer
+from ..pagination import ProdutoCursorPagination
 from .permissions import IsAdminOrReadOnly
+from .condicional import avaliar, aplicar_cabecalhos, get_condicional
+from ..search import indice as indice_busca, facetas
+from ..search.autocomplete import sugerir, LIMITE_PADRAO
+from ..services import catalogo, destaque_service, galeria_service, pagina_produto
+from ..services.rastreio import rastrear
 import logging
 from django.db import models
 
 logger = logging.getLogger(__name__)
 
-# FUNÇÃO DE DETALHES DO PRODUTO (Template Django)
-def detalhes_produto(request, produto_id):
-    """View para página de detalhes do produto com template Django"""
-    try:
-        # Obtém o produto com todas as relações necessárias
-        produto = get_object_or_404(
-            Produto.objects.select_related('categoria')
-            .prefetch_related('imagens'),
-            id=produto_id,
-            status='Ativo'
-        )
-        
-        # AVALIAÇÕES - Cache implementado
-        cache_key = f'produto_{produto_id}_avaliacoes_context'
-        avaliacoes_context = cache.get(cache_key)
-        
-        if not avaliacoes_context:
-            # Avaliações principais (aprovadas)
-            avaliacoes = Avaliacao.objects.filter(
-                produto=produto, 
-                status='aprovado'
-            ).select_related('usuario').prefetch_related('midias')[:5]
-            
-            # Estatísticas
-            estatisticas = {
-                'media': produto.media_avaliacoes or 0.0,
-                'total': produto.total_avaliacoes,
-                'distribuicao': produto.distribuicao_avaliacoes,
-                'recomendacao_percent': produto.percentual_recomendacao or 100,
-                'com_midia': produto.avaliacoes_com_midia.count(),
-            }
-            
-            # Mídias para galeria (máximo 12)
-            midias_destaque = []
-            for av in Avaliacao.objects.filter(
-                produto=produto, 
-                status='aprovado',
-                midias__isnull=False
-            ).prefetch_related('midias')[:6]:
-                for midia in av.midias.filter(aprovado=True)[:2]:  # Máx 2 por avaliação
-                    if len(midias_destaque) < 12:
-                        midias_destaque.append(midia)
-            
-            avaliacoes_context = {
-                'avaliacoes': avaliacoes,
-                'estatisticas': estatisticas,
-                'midias_destaque': midias_destaque,
-            }
-            
-            # Cache por 5 minutos
-            cache.set(cache_key, avaliacoes_context, 300)
-        
-        # Produtos relacionados
-        produtos_relacionados = Produto.objects.filter(
-            categoria=produto.categoria,
-            status='Ativo'
-        ).exclude(id=produto.id)[:4]
-        
-        context = {
-            'produto': produto,
-            'produtos_relacionados': produtos_relacionados,
-            **avaliacoes_context,  # Desempacota tudo
-        }
-        
-        return render(request, 'core/front-end/detalhes_produto.html', context)
-        
-    except Exception as e:
-        logger.error(f"Erro na view detalhes_produto para ID {produto_id}: {str(e)}")
-        return render(request, 'core/front-end/404.html', status=404)
-
-
 # SUA ProdutoViewSet EXISTENTE - ATUALIZE para usar o serializer correto
 class ProdutoViewSet(viewsets.ModelViewSet):
     queryset = Produto.objects.all()
     serializer_class = ProdutoSerializer  # Mantenha o serializer básico para listas
     parser_classes = [FormParser, MultiPartParser, JSONParser]
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = ProdutoCursorPagination
+
+    def _listagem_completa(self):
+        # ?modo=completo mantém o payload antigo (usado pelo painel admin para edição)
+        return self.request.query_params.get('modo') == 'completo'
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self._listagem_completa():
+            return ProdutoCardSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            if self._listagem_completa():
+                return queryset.prefetch_related('imagens')
+            return ProdutoCardSerializer.otimizar_queryset(queryset, self.request)
+        return queryset
 
     # ADICIONE esta action para detalhes completos com galeria
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    @rastrear('produto.detalhes_com_galeria')
     def detalhes_com_galeria(self, request, pk=None):
         """Endpoint para página de detalhes com galeria completa"""
         try:
             produto = self.get_object()
-            print(f"🔍 VIEW DEBUG: Acessando detalhes com galeria para produto {pk}")
             serializer = ProdutoDetailSerializer(produto, context={'request': request})
-            print(f"🔍 VIEW DEBUG: Serializer criado para produto {pk}")
-            data = serializer.data
-            print(f"🔍 VIEW DEBUG: Dados serializados retornados para produto {pk}")
-            return Response(data)
+            return Response(serializer.data)
         except Exception as e:
             logger.error(f"Erro ao buscar detalhes do produto {pk}: {str(e)}")
             return Response({'error': 'Produto não encontrado'}, status=404)
 
     def list(self, request, *args, **kwargs):
         logger.info("Listagem de produtos solicitada")
-        return super().list(request, *args, **kwargs)
+        # Qualquer produto ou avaliação alterada muda a ETag; 304 sem query nem serializer
+        etag, ultima, nao_modificado = avaliar(request, 'produtos', 'avaliacoes')
+        if nao_modificado is not None:
+            return nao_modificado
+        response = super().list(request, *args, **kwargs)
+        return aplicar_cabecalhos(response, etag, ultima) if response.status_code == 200 else response
 
     def create(self, request, *args, **kwargs):
         logger.info(f"Tentativa de criar produto - Usuário: {request.user.email if request.user.is_authenticated else 'Anônimo'}")
@@ -176,101 +131,120 @@ class ImagemProdutoViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         if not request.user.is_authenticated or not request.user.is_admin:
             return Response({'error': 'Permissão negada'}, status=403)
-        
-        print(f"🔍 UPLOAD DEBUG: Dados recebidos - {dict(request.data)}")
-        print(f"🔍 UPLOAD DEBUG: Arquivos - {[f.name for f in request.FILES.getlist('imagem')]}")
-        
-        # ✅ CORREÇÃO CRÍTICA: Garantir que produto_id seja convertido para inteiro
+
         try:
             produto_id = int(request.data.get('produto'))
-            print(f"🔍 UPLOAD DEBUG: Produto ID convertido: {produto_id}")
-        except (TypeError, ValueError) as e:
-            print(f"❌ UPLOAD DEBUG: Erro ao converter produto_id: {e}")
+        except (TypeError, ValueError):
             return Response({'error': 'ID do produto inválido'}, status=400)
-        
+
         images = request.FILES.getlist('imagem')
-        
-        if len(images) > 1:
-            # Upload múltiplo
-            created_images = []
-            for i, image in enumerate(images):
-                try:
-                    # ✅ CORREÇÃO: Criar dados corretamente
-                    data = {
-                        'produto': produto_id,
-                        'imagem': image,
-                        'ordem': i + 1,
-                        'legenda': request.data.get('legenda', ''),
-                        'is_principal': request.data.get('is_principal', 'false').lower() == 'true'
-                    }
-                    
-                    print(f"🔍 UPLOAD DEBUG: Criando imagem {i+1} com dados: {data}")
-                    
-                    serializer = self.get_serializer(data=data)
-                    if serializer.is_valid():
-                        instance = serializer.save()
-                        created_images.append(serializer.data)
-                        print(f"✅ UPLOAD DEBUG: Imagem {i+1} salva com ID {instance.id}")
-                    else:
-                        print(f"❌ UPLOAD DEBUG: Erro de validação imagem {i+1}: {serializer.errors}")
-                        return Response(serializer.errors, status=400)
-                        
-                except Exception as e:
-                    print(f"❌ UPLOAD DEBUG: Erro ao processar imagem {i+1}: {e}")
-                    return Response({'error': f'Erro ao processar imagem {i+1}: {str(e)}'}, status=500)
-            
-            print(f"✅ UPLOAD DEBUG: {len(created_images)} imagens salvas com sucesso")
-            return Response(created_images, status=201)
-        else:
-            # Upload único
-            print(f"🔍 UPLOAD DEBUG: Modo upload único")
+        if len(images) <= 1:
+            # Upload único: fluxo padrão do serializer (aceita ordem/legenda/is_principal)
             return super().create(request, *args, **kwargs)
 
+        # Upload múltiplo: valida tudo, grava em paralelo e insere em uma transação
+        legenda = request.data.get('legenda', '')
+        erros = galeria_service.validar_arquivos(images, legenda)
+        if erros:
+            return Response({'error': 'Arquivos inválidos', 'erros': erros}, status=400)
+        try:
+            criadas = galeria_service.enviar_imagens(
+                produto_id, images, legenda=legenda,
+                principal=str(request.data.get('is_principal', 'false')).lower() == 'true',
+            )
+        except Produto.DoesNotExist:
+            return Response({'error': 'Produto não encontrado'}, status=404)
+        except ValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=400)
+        except Exception as e:
+            logger.error(f"Erro no upload múltiplo do produto {produto_id}: {str(e)}")
+            return Response({'error': 'Erro interno do servidor'}, status=500)
+
+        return Response(self.get_serializer(criadas, many=True).data, status=201)
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def produtos_destaque(request):
-    # ✅ APENAS produtos ATIVOS em destaque
-    produtos = Produto.objects.filter(status='Ativo', estoque__gt=0)[:6]
-    serializer = ProdutoSerializer(produtos, many=True)  # Use o serializer básico
+    # ✅ APENAS produtos ATIVOS em destaque, na ordem do ranking de velocidade (materializado em cache)
+    produtos = destaque_service.produtos_em_destaque(6)
+    serializer = ProdutoCardSerializer(produtos, many=True, context={'request': request})
     return Response({'produtos': serializer.data})
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def buscar_produtos(request):
-    query = request.GET.get('q', '')
-    categoria = request.GET.get('categoria', '')
-    # ✅ APENAS produtos ATIVOS na busca
-    produtos = Produto.objects.filter(status='Ativo')
-    if query:
-        produtos = produtos.filter(models.Q(nome__icontains=query) | models.Q(descricao__icontains=query))
-    if categoria:
-        produtos = produtos.filter(categoria=categoria)
-    serializer = ProdutoSerializer(produtos, many=True)  # Use o serializer básico
+    """Busca full-text (índice invertido + BM25) com facetas, correção de digitação, sinônimos e paginação"""
+    query = request.GET.get('q', '').strip()
+    filtros = facetas.filtros_da_requisicao(request.GET)
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+        por_pagina = max(int(request.GET.get('page_size', indice_busca.config('PAGINACAO_ITEMS'))), 1)
+    except ValueError:
+        return Response({'error': 'Parâmetros de paginação inválidos'}, status=400)
+    por_pagina = min(por_pagina, indice_busca.config('MAX_PAGINACAO_ITEMS'))
+
+    resultado = facetas.busca_facetada(query, filtros, pagina=pagina, por_pagina=por_pagina)
+    total = resultado['total']
+    # Resultados são sempre produtos ativos: hidrata do snapshot do catálogo (sem query)
+    produtos = catalogo.produtos_por_ids(resultado['ids'])
+
+    serializer = ProdutoCardSerializer(produtos, many=True, context={'request': request})
     return Response({
         'query': query,
-        'categoria': categoria,
-        'total': produtos.count(),
+        'categoria': filtros.get('categoria', ''),
+        'filtros': filtros,
+        'total': total,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'total_paginas': (total + por_pagina - 1) // por_pagina,
+        'correcoes': resultado['correcoes'],
+        'facetas': resultado['facetas'],
         'produtos': serializer.data
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_produtos(request):
+    """Sugestões para a caixa de busca (payload mínimo, sem serializer)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limite = int(request.GET.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        limite = LIMITE_PADRAO
+    return Response({'q': query, 'sugestoes': sugerir(query, limite) if query else []})
+
+
 # ADICIONE esta view para a página de detalhes do produto
+@get_condicional(lambda request, produto_id: [('produto', produto_id), ('avaliacoes', produto_id)])
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@rastrear('api.produto_detalhes_com_galeria')
 def produto_detalhes_com_galeria(request, produto_id):
     """Endpoint específico para página de detalhes com galeria completa"""
     try:
-        print(f"🔍 API VIEW DEBUG: Buscando detalhes com galeria para produto {produto_id}")
         produto = Produto.objects.prefetch_related('imagens').get(
             id=produto_id, 
             status='Ativo'
         )
-        print(f"🔍 API VIEW DEBUG: Produto encontrado: {produto.nome}")
         serializer = ProdutoDetailSerializer(produto, context={'request': request})
-        print(f"🔍 API VIEW DEBUG: Serialização concluída para produto {produto_id}")
         return Response(serializer.data)
     except Produto.DoesNotExist:
-        print(f"❌ API VIEW DEBUG: Produto {produto_id} não encontrado")
-        return Response({'error': 'Produto não encontrado'}, status=404)
\ No newline at end of file
+        return Response({'error': 'Produto não encontrado'}, status=404)
+
+
+@gzip_page
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def produto_pagina(request, produto_id):
+    """
+    Página de produto em uma única chamada: produto, galeria, 1ª página de avaliações,
+    estatísticas, relacionados e total do carrinho (payload em cache por versão + gzip)
+    """
+    pagina = pagina_produto.pagina_produto(produto_id)
+    if pagina is None:
+        return Response({'error': 'Produto não encontrado'}, status=404)
+    destaque_service.registrar_visualizacao(produto_id)
+    return Response({**pagina, 'carrinho': {'total_itens': pagina_produto.total_itens_carrinho(request)}})
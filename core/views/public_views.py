@@ -4,40 +4,98 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_protect
 from django.contrib import messages
-from ..models import Produto
+from django.core.paginator import Page, Paginator
+from ..models import Produto, Avaliacao
+from ..search import facetas
+from ..services.relacionados_service import produtos_relacionados as relacionados_por_compra
+from ..services import catalogo, destaque_service, fragmentos, pagina_produto
 import logging
 
 logger = logging.getLogger(__name__)
 
+PRODUTOS_POR_PAGINA = 24
+
+
+def _anexar_stats_avaliacoes(produtos):
+    """
+    Cópias dos registros do catálogo com `stats_avaliacao` (badge de estrelas),
+    com uma única busca em lote; os registros compartilhados não são alterados.
+    """
+    produtos = list(produtos)
+    stats = Avaliacao.objects.stats_for_products([p.pk for p in produtos])
+    return [produto.com_stats(stats[produto.pk]) for produto in produtos]
+
 def home(request):
     return HttpResponse("Bem-vindo ao especialista de carros!")
 
 def index(request):
     # ✅ APENAS produtos ATIVOS na home
-    produtos = Produto.objects.filter(status='Ativo')[:8]
-    return render(request, 'core/front-end/index.html', {'produtos': produtos})
+    produtos = destaque_service.produtos_em_destaque(8)
+    return render(request, 'core/front-end/index.html', {
+        # Cards em fragmento por versão: as estrelas só são buscadas se o fragmento faltar
+        'produtos': fragmentos.preguicoso(lambda: _anexar_stats_avaliacoes(produtos)),
+        'produtos_ids': [p.pk for p in produtos],
+        'fragmentos': fragmentos.versoes_listagem(),
+    })
 
 def produtos_listagem(request):
-    # ✅ APENAS produtos ATIVOS na listagem
-    produtos = Produto.objects.filter(status='Ativo')
-    return render(request, 'core/front-end/produtos_listagem.html', {'produtos': produtos})
+    # ✅ APENAS produtos ATIVOS na listagem (mesmo motor de facetas da API de busca)
+    query = request.GET.get('q', '').strip()
+    filtros = facetas.filtros_da_requisicao(request.GET)
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        pagina = 1
+
+    resultado = facetas.busca_facetada(query, filtros, pagina=pagina, por_pagina=PRODUTOS_POR_PAGINA)
+    produtos = catalogo.produtos_por_ids(resultado['ids'])
+
+    # O motor já devolve só a página pedida; o Paginator serve apenas para a navegação do template
+    paginator = Paginator(range(resultado['total']), PRODUTOS_POR_PAGINA)
+    return render(request, 'core/front-end/produtos_listagem.html', {
+        'produtos': Page(produtos, pagina, paginator),
+        # Cards em fragmento por versão: as estrelas só são buscadas se o fragmento faltar
+        'cards': fragmentos.preguicoso(lambda: _anexar_stats_avaliacoes(produtos)),
+        'produtos_ids': resultado['ids'],
+        'fragmentos': fragmentos.versoes_listagem(),
+        'total_produtos': resultado['total'],
+        'facetas': resultado['facetas'],
+        'filtros': filtros,
+        'query': query,
+    })
 
 def detalhes_produto(request, produto_id):
     """View para página de detalhes do produto com galeria"""
-    # ✅ Permite ver detalhes mesmo de produtos inativos (para links compartilhados)
-    produto = get_object_or_404(Produto, id=produto_id)
-    
-    # ✅ Produtos relacionados só os ATIVOS
-    produtos_relacionados = Produto.objects.filter(
-        categoria=produto.categoria,
-        status='Ativo'
-    ).exclude(id=produto.id)[:4]
-    
+    # Produto ativo vem do snapshot do catálogo (sem query). Galeria, descrição,
+    # avaliações e relacionados são fragmentos em cache por versão; o contexto
+    # deles é preguiçoso e só chega ao banco quando o fragmento falta.
+    encontrados = catalogo.produtos_por_ids([produto_id])
+    if encontrados:
+        produto = encontrados[0]
+        produto_completo = fragmentos.preguicoso(
+            lambda: Produto.objects.prefetch_related('imagens').get(pk=produto_id)
+        )
+    else:
+        # ✅ Permite ver detalhes mesmo de produtos inativos (para links compartilhados)
+        produto = produto_completo = get_object_or_404(Produto.objects.prefetch_related('imagens'), id=produto_id)
+    destaque_service.registrar_visualizacao(produto.id)
+
+    versoes_fragmentos = fragmentos.versoes_produto(produto.id)
+    avaliacoes = fragmentos.preguicoso(
+        lambda: pagina_produto.contexto_avaliacoes(produto.id)
+    )
+
     context = {
         'produto': produto,
-        'produtos_relacionados': produtos_relacionados,
+        'produto_completo': produto_completo,
+        # ✅ Produtos relacionados (co-compra; só os ATIVOS)
+        'produtos_relacionados': fragmentos.preguicoso(lambda: relacionados_por_compra(produto, limite=4)),
+        'avaliacoes': fragmentos.preguicoso(lambda: avaliacoes['avaliacoes']),
+        'estatisticas': fragmentos.preguicoso(lambda: avaliacoes['estatisticas']),
+        'midias_destaque': fragmentos.preguicoso(lambda: avaliacoes['midias_destaque']),
+        'fragmentos': versoes_fragmentos,
     }
-    
+
     return render(request, 'core/front-end/detalhes_produto.html', context)
 
 @require_http_methods(["POST"])
@@ -269,12 +269,82 @@ AVALIACOES_CONFIG = {
     'S3_MULTIPART_THRESHOLD': 100 * 1024 * 1024,  # 100MB
 }
 
+# =============================================================================
+# BUSCA DE PRODUTOS
+# =============================================================================
+
+BUSCA_CONFIG = {
+    'BM25_K1': 1.2,
+    'BM25_B': 0.75,
+    'PESOS_CAMPOS': {'nome': 3, 'sku': 3, 'categoria': 2, 'descricao': 1},
+    'PAGINACAO_ITEMS': 20,
+    'MAX_PAGINACAO_ITEMS': 60,
+    'BATCH_SIZE': 500,
+    'FAIXAS_PRECO': (50, 100, 200),  # limites (R$) das faixas de preço da navegação facetada
+    # 'SINONIMOS': (('shampoo', 'xampu'), ...),  # padrão em core.search.fuzzy.SINONIMOS_PADRAO
+    'RECONSTRUIR_EM_SEGUNDO_PLANO': True,  # vocabulário/autocomplete novos são montados fora do request
+}
+
+RELACIONADOS_CONFIG = {
+    'TOP_K': 12,              # vizinhos guardados por produto
+    'MAX_ITENS_CESTA': 50,    # ignora pedidos maiores (atacado)
+    'JANELA_DIAS': 365,       # pedidos considerados
+    'STATUS_IGNORADOS': ('Cancelado',),
+}
+
+DESTAQUE_CONFIG = {
+    'MEIA_VIDA_HORAS': 168,       # decaimento dos contadores de vendas/visualizações
+    'PESO_VENDA': 1.0,
+    'PESO_VISUALIZACAO': 0.05,
+    'TAMANHO_RANKING': 48,
+    'MARCO': '2025-01-01',        # marco do forward decay (não alterar com dados em produção)
+    'ARMAZENAMENTO_VISUALIZACOES': 'redis',  # 'redis' (hash, drenado de forma atômica) ou 'cache' (sem Redis)
+}
+
+API_CACHE_CONFIG = {
+    # Cache-Control das APIs de leitura com ETag/Last-Modified (core.views.condicional)
+    'MAX_AGE': 0,                   # navegador revalida sempre (304 barato)
+    'S_MAXAGE': 60,                 # CDN/proxy
+    'STALE_WHILE_REVALIDATE': 300,
+    'VERSAO': 1,                    # incrementar ao mudar o formato das respostas
+}
+
+IMAGENS_CONFIG = {
+    'LARGURAS': (320, 640, 960, 1280),          # derivados responsivos (srcset); nunca amplia o original
+    'FORMATOS': ('avif', 'webp', 'jpeg'),       # AVIF só é gerado se o Pillow tiver suporte
+    'QUALIDADE': {'avif': 50, 'webp': 75, 'jpeg': 80},
+    'PASTA': 'derivados',
+    'UPLOAD_THREADS': 4,                        # upload da galeria: gravações simultâneas no storage
+    'MAX_ARQUIVOS_UPLOAD': 20,
+}
+
+CARRINHO_CONFIG = {
+    # Carrinho de visitante fora do banco (core.services.carrinho_store); vira linha no login
+    'ARMAZENAMENTO_ANONIMO': 'redis',           # 'redis' (hash com TTL) ou 'cache' (sem Redis)
+}
+
+RASTREIO_CONFIG = {
+    # Spans dos caminhos quentes (core.services.rastreio); desligado não custa nada.
+    # Lido na importação: mudar exige reiniciar os workers.
+    'ATIVO': os.getenv("RASTREIO_ATIVO", "False") == "True",
+    'TAMANHO_BUFFER': 500,                      # spans guardados por processo
+}
+
+CACHE_SWR_CONFIG = {
+    # Expiração suave dos caches quentes (core.services.cache_swr)
+    'FATOR_OBSOLETO': 4,        # após o ttl, o valor antigo ainda é servido por ttl * fator
+    'BETA': 1.0,                # recálculo antecipado probabilístico (0 desliga)
+    'TRAVA_TIMEOUT': 30,
+    'ESPERA_MAX': 2.0,          # miss com recálculo em andamento: espera em vez de recalcular junto
+    'TTL_NEGATIVO': 60,         # produto inexistente/inativo (None) fica em cache por no máximo N s
+}
+
 # =============================================================================
 # RATE LIMITING
 # =============================================================================
 
 RATELIMIT_ENABLE = True
-RATELIMIT_USE_CACHE = 'default'
+RATELIMIT_USE_CACHE = 'ratelimit'  # Redis direto, sem a camada local do 'default'
 RATELIMIT_VIEW = 'core.views.avaliacao_views.rate_limit_exceeded'
 
 # =============================================================================
@@ -283,7 +353,8 @@ RATELIMIT_VIEW = 'core.views.avaliacao_views.rate_limit_exceeded'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        # django_redis com uma camada LRU local para as chaves quentes (ver CACHE_LOCAL_CONFIG)
+        'BACKEND': 'core.services.cache_local.CacheDuasCamadas',
         'LOCATION': 'redis://127.0.0.1:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -299,6 +370,24 @@ CACHES = {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         }
     },
+    # Mesmo banco do 'default', sem camada local (contadores do django_ratelimit)
+    'ratelimit': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SOCKET_CONNECT_TIMEOUT': 5,
+            'SOCKET_TIMEOUT': 5,
+        }
+    },
+}
+
+CACHE_LOCAL_CONFIG = {
+    # Camada local (por processo) do cache default; invalidada via pub/sub do Redis.
+    # Chaves elegíveis: as declaradas com local=True em core.services.chaves
+    'MAX_ITENS': 5000,
+    'TTL_LOCAL': 10,            # segundos; teto de atraso se uma invalidação se perder
+    'CANAL': 'cache_local_invalidacao',
 }
 
 # =============================================================================
@@ -319,6 +408,16 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': 86400.0,  # Diário
         'options': {'queue': 'periodic'},
     },
+    'recalcular-produtos-relacionados': {
+        'task': 'core.tasks.recomendacao_tasks.recalcular_produtos_relacionados',
+        'schedule': 86400.0,  # Diário
+        'options': {'queue': 'periodic'},
+    },
+    'materializar-ranking-destaque': {
+        'task': 'core.tasks.recomendacao_tasks.materializar_ranking_destaque',
+        'schedule': 300.0,  # A cada 5 minutos
+        'options': {'queue': 'periodic'},
+    },
     'processar-pendentes-moderacao': {
         'task': 'core.tasks.avaliacao_tasks.processar_moderacao_avaliacao',
         'schedule': 3600.0,  # A cada hora